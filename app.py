@@ -1,13 +1,72 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, request, jsonify, g
+import re
 import uuid
 import html
+import json
+import base64
 from datetime import datetime, timezone
+from note_store import (create_note_store, note_store_backend, open_partitions_max, partition_exists,
+                        migrate_unpartitioned_notes, PartitionedNoteStore, EMPTY_NOTES)
+from change_feed import ChangeFeed, format_sse
+from search_index import SearchIndex
+from html_sanitizer import SanitizerCache
+from metrics import MetricsRegistry, instrument_app, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from json_provider import FastJSONProvider, stream_json_array, read_lines, NDJSON_MIMETYPE
+from compression import enable_compression
+from static_assets import StaticAssets
 
 app = Flask(__name__)
+# orjson-backed JSON when installed, and gzip/brotli for clients that accept it
+app.json = FastJSONProvider(app)
+enable_compression(app)
+# Fingerprinted assets built by `python static_assets.py`, and the index page
+# rendered once per process
+assets = StaticAssets(app)
 
-# In-memory "database"
-notes_db = []
-MAX_NOTES = 5
+# Note storage, partitioned by user (see note_store.py and open_user_notes).
+# Each visitor is identified by a random key in the USER_COOKIE cookie and
+# gets their own MAX_NOTES quota and oldest-note eviction. The log backend
+# (default) keeps a user's notes under NOTES_DATA_DIR/users/<key>/; use
+# NOTES_STORE_BACKEND=sqlite when running more than one worker process.
+# Partitions are only created by a user's first write, and at most
+# OPEN_PARTITIONS_MAX of them are kept open per process, fewer if the
+# open-file limit can't hold that many (see open_partitions_max).
+MAX_NOTES = 5  # Per user
+OPEN_PARTITIONS_MAX = 1024
+USER_COOKIE = 'quicknote_user'
+USER_COOKIE_MAX_AGE = 400 * 24 * 3600  # The longest lifetime browsers accept
+USER_KEY_RE = re.compile(r'[0-9a-f]{32}')
+NOTES_PAGE_SIZE = 10  # Default page size when paginating /api/notes
+NOTES_PAGE_MAX = 100
+NOTES_STREAM_MIN = 100  # Unpaginated lists longer than this are streamed
+
+# Bulk NDJSON import and export (/api/notes/import, /api/notes/export)
+IMPORT_BATCH_SIZE = 500  # Valid notes stored per store write
+IMPORT_LINE_MAX = 256 * 1024  # Bytes; room for 20,000 characters of escaped HTML
+IMPORT_ERRORS_MAX = 100  # Line errors listed in the response; the rest are only counted
+EXPORT_PAGE_SIZE = 256  # Notes read from the store per chunk
+
+# Live note events for /api/notes/events (per process)
+change_feed = ChangeFeed()
+CHANGE_EVENTS = {'add': 'note-created', 'delete': 'note-deleted'}
+
+# Full-text search over titles and content, one index per user, kept up to
+# date by store changes
+search_indexes = {}  # user key -> SearchIndex
+SEARCH_RESULTS_MAX = 50
+
+# Sanitized note HTML, memoized by content digest
+content_sanitizer = SanitizerCache(maxsize=1024)
+
+# Request and note store metrics, served at /metrics (per process)
+metrics_registry = MetricsRegistry(prefix='quicknote_')
+instrument_app(app, metrics_registry)
+note_content_bytes = {}  # note id -> size of its content, kept up to date by store changes
+metrics_registry.gauge('notes', "Notes in the partitions open in this process.", lambda: len(note_content_bytes))
+metrics_registry.gauge('notes_content_bytes', "Total size of the stored notes' content.",
+                       lambda: sum(note_content_bytes.values()))
+note_evictions = metrics_registry.counter(
+    'note_evictions_total', "Oldest notes deleted by premium upgrade attempts.")
 
 # --- Helper Functions ---
 
@@ -21,74 +80,346 @@ def sanitize_input(input_string, max_length=10000):
 
 def is_safe_html_ish(content_from_editor, max_length=20000):
     """
-    This is a very basic check.
-    A proper solution would involve a robust HTML sanitizer library (like Bleach).
-    For this exercise, we're trusting the Quill editor to generate reasonable HTML
-    and just doing a length check and basic escape for non-editor fields.
-    The content from Quill is intended to be rendered as HTML.
+    Length-limits the HTML from the Quill editor and runs it through the
+    allowlist sanitizer in html_sanitizer.py, which keeps only the tags and
+    attributes Quill produces. The content is intended to be rendered as HTML.
     """
     if not isinstance(content_from_editor, str):
         return ""
-    # For content from a rich text editor, we expect HTML.
-    # We'll rely on frontend rendering to handle it.
-    # Basic length check is still good.
-    return content_from_editor[:max_length]
+    return content_sanitizer.sanitize(content_from_editor[:max_length])
+
+
+def build_note(data, timestamp=None):
+    """
+    Checks and sanitizes a submitted note (a dict with title and content).
+    Returns (note, None) with a new id, or (None, error message).
+    """
+    title = data.get('title')
+    content = data.get('content')  # This is HTML content from Quill
+
+    # --- Security Validations ---
+    if not title or not isinstance(title, str):
+        return None, "Title is required and must be a string"
+    if not content or not isinstance(content, str):
+        return None, "Content is required and must be a string"
+
+    # Sanitize title (plain text)
+    sanitized_title = sanitize_input(title, max_length=250)
+    if not sanitized_title:
+        return None, "Title cannot be empty after sanitization"
+
+    # Sanitize content (HTML from editor) against the Quill allowlist
+    validated_content = is_safe_html_ish(
+        content, max_length=20000)  # Generous limit for rich text
+    if not validated_content:
+        return None, "Content cannot be empty"
+
+    return {
+        "id": str(uuid.uuid4()),
+        "title": sanitized_title,  # Store sanitized title
+        "content": validated_content,  # Store sanitized HTML content
+        "timestamp": timestamp or datetime.now(timezone.utc).isoformat()
+    }, None
+
+
+def parse_timestamp(value):
+    """UTC isoformat of an ISO 8601 timestamp with a timezone, or None if `value` isn't one."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return None
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def encode_cursor(note):
+    """Opaque keyset cursor pointing just past `note` in newest-first order."""
+    raw = json.dumps([note['timestamp'], note['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns the (timestamp, id) key encoded in a cursor, or None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, note_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(timestamp, str) or not isinstance(note_id, str):
+        return None
+    return timestamp, note_id
+
+
+def current_user_key():
+    """Key of the requesting user's note partition; a new key is issued when the cookie is missing."""
+    user_key = g.get('user_key')
+    if user_key is None:
+        user_key = request.cookies.get(USER_COOKIE, '')
+        if not USER_KEY_RE.fullmatch(user_key):
+            user_key = g.new_user_key = uuid.uuid4().hex
+        g.user_key = user_key
+    return user_key
+
+
+def user_notes(create=False):
+    """
+    The requesting user's note store, kept open until the request ends. Until
+    their first write (`create`) a new user gets an empty read-only view.
+    """
+    store = g.get('user_notes')
+    if store is None or (create and store is EMPTY_NOTES):
+        store = g.user_notes = note_stores.acquire(current_user_key(), create)
+    return store
+
+
+def note_change_event(store, change):
+    """(event, data, id) of the event stream message for a store change record."""
+    generation = store.generation
+    return CHANGE_EVENTS[change['op']], dict(change, generation=generation), f"{generation}.{change['seq']}"
+
+
+def index_note_change(index, change):
+    """Store listener: keep a search index in step with added and deleted notes."""
+    if change['op'] == 'add':
+        index.add(change['note'])
+    elif change['op'] == 'delete':
+        index.remove(change['id'])
+
+
+def track_note_size(change):
+    """Store listener: keep note_content_bytes in step with added and deleted notes."""
+    if change['op'] == 'add':
+        note_content_bytes[change['note']['id']] = len(change['note']['content'].encode('utf-8'))
+    elif change['op'] == 'delete':
+        note_content_bytes.pop(change['id'], None)
+
+
+def open_user_notes(user_key):
+    """
+    Opens a user's partition on first use: their store, a search index built
+    from it, and the listeners that keep the index, the user's event streams
+    and the size metrics up to date.
+    """
+    store = create_note_store(partition=user_key)
+    index = search_indexes[user_key] = SearchIndex()
+    for existing_note in store.newest_first():
+        index.add(existing_note)
+        track_note_size({'op': 'add', 'note': existing_note})
+    store.add_listener(lambda change: change_feed.publish(*note_change_event(store, change), topic=user_key))
+    store.add_listener(lambda change: index_note_change(index, change))
+    store.add_listener(track_note_size)
+    return store
+
+
+def close_user_notes(user_key, store):
+    """Closes a partition that hasn't been used for a while, and forgets its index and sizes."""
+    search_indexes.pop(user_key, None)
+    for note in store.newest_first():
+        track_note_size({'op': 'delete', 'id': note['id']})
+    store.close()
+
+
+if note_store_backend() == 'memory':
+    # Memory partitions only exist while open, so they are never closed
+    note_stores = PartitionedNoteStore(open_user_notes)
+else:
+    note_stores = PartitionedNoteStore(open_user_notes, exists=partition_exists,
+                                       close_partition=close_user_notes,
+                                       max_open=open_partitions_max(cap=OPEN_PARTITIONS_MAX))
+    # Notes from before partitioning are shared by nobody; give them a key of their own
+    migrated_key = migrate_unpartitioned_notes()
+    if migrated_key:
+        app.logger.warning(f"Moved the notes stored by an earlier version to partition {migrated_key}. "
+                           f"Set the {USER_COOKIE} cookie to that key to see them.")
+
+
+@app.teardown_request
+def release_user_notes(exc=None):
+    store = g.pop('user_notes', None)
+    if store is not None:
+        note_stores.release(g.user_key, store)
+
+
+@app.after_request
+def issue_user_cookie(response):
+    if 'user_key' in g:
+        response.vary.add('Cookie')  # The response belongs to this user
+    new_user_key = g.pop('new_user_key', None)
+    if new_user_key:
+        response.set_cookie(USER_COOKIE, new_user_key, max_age=USER_COOKIE_MAX_AGE,
+                            secure=request.is_secure, httponly=True, samesite='Lax')
+    return response
 
 
 # --- Routes ---
 @app.route('/')
 def index():
-    return render_template('index.html')
+    current_user_key()  # Issue the cookie with the page, so its parallel API calls share one key
+    return assets.page('index.html')
 
 
 @app.route('/api/notes', methods=['GET'])
 def get_notes():
-    # Return notes sorted by timestamp, newest first for blog-like display
-    sorted_notes = sorted(notes_db, key=lambda x: x['timestamp'], reverse=True)
-    return jsonify(sorted_notes)
+    # The ETag only depends on the collection version, so an unchanged list is
+    # answered with 304 before anything is serialized. The version is read
+    # before the notes so the tag can never claim newer data than the body.
+    # Compressed responses carry the tag as a weak ETag, hence contains_weak.
+    note_store = user_notes()
+    generation, version = note_store.generation, note_store.version
+    etag = f"{generation}-{version}"
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    limit_arg = request.args.get('limit')
+    cursor_arg = request.args.get('cursor')
+    if limit_arg is None and cursor_arg is None:
+        # Unpaginated: every note, newest first for blog-like display. Long
+        # lists are encoded a chunk at a time as the body is sent.
+        notes = note_store.newest_first()
+        if len(notes) > NOTES_STREAM_MIN:
+            response = app.response_class(stream_json_array(app.json, notes), mimetype=app.json.mimetype)
+        else:
+            response = jsonify(notes)
+    else:
+        try:
+            limit = int(limit_arg) if limit_arg else NOTES_PAGE_SIZE
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        if limit < 1:
+            return jsonify({"error": "limit must be at least 1"}), 400
+        limit = min(limit, NOTES_PAGE_MAX)
+
+        before = None
+        if cursor_arg:
+            before = decode_cursor(cursor_arg)
+            if before is None:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        # Fetch one extra note to know whether another page follows
+        page = note_store.page(limit + 1, before)
+        next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+        response = jsonify({
+            "notes": page[:limit],
+            "next_cursor": next_cursor,
+            # Starting point for /api/notes/changes
+            "generation": generation,
+            "version": version,
+        })
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/notes/changes', methods=['GET'])
+def get_note_changes():
+    # Delta sync: notes added and tombstones for notes deleted after `since`
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({"error": "since must be a non-negative integer"}), 400
+    note_store = user_notes()
+
+    generation = request.args.get('generation')
+    changes = None
+    if not generation or generation == note_store.generation:
+        changes = note_store.changes_since(since)
+    if changes is None:
+        # The store restarted, the changes fell out of the change log or
+        # `since` is from the future: the client has to reload the full list.
+        return jsonify({"reset": True, "generation": note_store.generation, "version": note_store.version})
+
+    return jsonify({
+        "reset": False,
+        "generation": note_store.generation,
+        "version": changes[-1]['seq'] if changes else since,
+        "changes": changes,
+    })
+
+
+@app.route('/api/notes/events', methods=['GET'])
+def note_events():
+    # Server-Sent Events stream of note-created / note-deleted events.
+    # Subscribe before reading the backlog so no change falls in between;
+    # clients ignore events with a sequence number they have already applied.
+    note_store = user_notes()
+    subscription = change_feed.subscribe(topic=current_user_key())
+    if subscription is None:
+        return jsonify({"error": "Too many open event streams, try again later"}), 503
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            yield from backlog
+            yield from subscription.messages()
+        finally:
+            subscription.close()
+
+    # Until the response owns the generator, a failure here must close the
+    # subscription itself or it stays in the feed
+    try:
+        backlog = []
+        last_event_id = request.headers.get('Last-Event-ID')
+        if last_event_id:
+            # Reconnecting client: replay what it missed, or ask it to resync
+            generation, _, seq = last_event_id.partition('.')
+            changes = None
+            if generation == note_store.generation and seq.isdigit():
+                changes = note_store.changes_since(int(seq))
+            if changes is None:
+                backlog.append(format_sse('resync', {}))
+            else:
+                backlog.extend(format_sse(*note_change_event(note_store, change)) for change in changes)
+
+        response = app.response_class(stream(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # Don't let reverse proxies buffer the stream
+        })
+        # Also when the body is never iterated, whose finally would not run
+        response.call_on_close(subscription.close)
+        return response
+    except BaseException:
+        subscription.close()
+        raise
+
+
+@app.route('/api/notes/search', methods=['GET'])
+def search_notes():
+    # BM25-ranked search; the last word also matches as a prefix
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    limit = request.args.get('limit', default=10, type=int)
+    limit = max(1, min(limit, SEARCH_RESULTS_MAX))
+
+    note_store = user_notes()
+    results = []
+    index = search_indexes.get(current_user_key())  # None: no notes yet
+    for note_id, score in index.search(query[:250], k=limit) if index else []:
+        note = note_store.get(note_id)
+        if note is not None:  # Deleted between search and lookup
+            results.append(dict(note, score=round(score, 4)))
+    return jsonify({"query": query, "results": results})
 
 
 @app.route('/api/notes', methods=['POST'])
 def add_note():
-    global notes_db
     try:
         data = request.get_json()
         if not data:
             return jsonify({"error": "Invalid JSON payload"}), 400
 
-        title = data.get('title')
-        content = data.get('content')  # This is HTML content from Quill
-
-        # --- Security Validations ---
-        if not title or not isinstance(title, str):
-            return jsonify({"error": "Title is required and must be a string"}), 400
-        if not content or not isinstance(content, str):
-            return jsonify({"error": "Content is required and must be a string"}), 400
-
-        # Sanitize title (plain text)
-        sanitized_title = sanitize_input(title, max_length=250)
-        if not sanitized_title:
-            return jsonify({"error": "Title cannot be empty after sanitization"}), 400
-
-        # "Sanitize" content (HTML from editor) - mostly length check here
-        # Trusting Quill for well-formed HTML, but still, length limit.
-        # A production system would use a robust HTML sanitizer like Bleach.
-        validated_content = is_safe_html_ish(
-            content, max_length=20000)  # Generous limit for rich text
-        if not validated_content:
-            return jsonify({"error": "Content cannot be empty"}), 400
-
-        if len(notes_db) >= MAX_NOTES:
+        new_note, error = build_note(data)
+        if error:
+            return jsonify({"error": error}), 400
+        # The limit is checked and the note stored in one atomic step
+        if user_notes(create=True).add(new_note, limit=MAX_NOTES) is None:
             # 403 Forbidden
             return jsonify({"error": f"Maximum of {MAX_NOTES} notes reached. Consider upgrading to premium to add more."}), 403
-
-        new_note = {
-            "id": str(uuid.uuid4()),
-            "title": sanitized_title,  # Store sanitized title
-            "content": validated_content,  # Store "validated" HTML content
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        notes_db.append(new_note)
         return jsonify(new_note), 201
 
     except Exception as e:
@@ -96,31 +427,126 @@ def add_note():
         return jsonify({"error": "An internal error occurred"}), 500
 
 
+@app.route('/api/notes/import', methods=['POST'])
+def import_notes():
+    # Bulk import: one JSON note per line (NDJSON), read from the body as it
+    # arrives. Each line gets add_note's checks (a "timestamp" with a timezone
+    # is kept, so exports restore in order); valid notes are stored
+    # IMPORT_BATCH_SIZE at a time and still count towards MAX_NOTES.
+    if request.mimetype != NDJSON_MIMETYPE:
+        return jsonify({"error": f"Send the notes as {NDJSON_MIMETYPE}, one JSON object per line"}), 415
+    note_store = user_notes(create=True)
+    result = {"imported": 0, "failed": 0, "errors": []}
+
+    def fail(line_no, error):
+        result["failed"] += 1
+        if len(result["errors"]) < IMPORT_ERRORS_MAX:
+            result["errors"].append({"line": line_no, "error": error})
+
+    def store(batch):
+        stored = note_store.add_many([note for _, note in batch], limit=MAX_NOTES)
+        result["imported"] += len(stored)
+        for line_no, _ in batch[len(stored):]:
+            fail(line_no, f"Maximum of {MAX_NOTES} notes reached")
+
+    batch = []
+    for line_no, line in enumerate(read_lines(request.stream, IMPORT_LINE_MAX), 1):
+        if line is None:
+            fail(line_no, f"Line is longer than {IMPORT_LINE_MAX} bytes")
+            continue
+        if not line.strip():
+            continue  # Blank lines (e.g. a trailing newline) are allowed
+        try:
+            data = app.json.loads(line)
+        except ValueError:
+            fail(line_no, "Invalid JSON")
+            continue
+        if not isinstance(data, dict) or not data:
+            fail(line_no, "Invalid JSON payload")
+            continue
+
+        timestamp = None
+        if data.get('timestamp') is not None:
+            timestamp = parse_timestamp(data['timestamp'])
+            if timestamp is None:
+                fail(line_no, "timestamp must be an ISO 8601 date and time with a timezone")
+                continue
+        note, error = build_note(data, timestamp)
+        if error:
+            fail(line_no, error)
+            continue
+        batch.append((line_no, note))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            store(batch)
+            batch = []
+    if batch:
+        store(batch)
+
+    result["errors_truncated"] = result["failed"] > len(result["errors"])
+    return jsonify(result)
+
+
+@app.route('/api/notes/export', methods=['GET'])
+def export_notes():
+    # NDJSON backup of the user's notes, newest first. The store is read and
+    # encoded a page at a time as the body is sent, so memory use doesn't
+    # grow with the number of notes. The body is sent after the request ends,
+    # so it pins the store itself until the response is closed.
+    user_key = current_user_key()
+    note_store = note_stores.acquire(user_key)
+
+    def pages():
+        before = None
+        while True:
+            page = note_store.page(EXPORT_PAGE_SIZE, before)
+            if page:
+                yield app.json.dumps_lines(page)
+            if len(page) < EXPORT_PAGE_SIZE:
+                return
+            before = (page[-1]['timestamp'], page[-1]['id'])
+
+    response = app.response_class(pages(), mimetype=NDJSON_MIMETYPE, headers={
+        'Content-Disposition': 'attachment; filename="notes.ndjson"',
+        'Cache-Control': 'no-cache',
+    })
+    response.call_on_close(lambda: note_stores.release(user_key, note_store))
+    return response
+
+
 @app.route('/api/notes/premium-upgrade', methods=['POST'])
 def premium_upgrade_attempt():
-    global notes_db
-    if not notes_db:
-        return jsonify({"message": "No notes to delete. Add some notes first!", "deleted": False}), 200
-
-    if len(notes_db) < MAX_NOTES:
-        return jsonify({"message": f"You currently have {len(notes_db)} notes. Premium benefits apply when you reach the {MAX_NOTES} notes limit. No action taken.", "deleted": False}), 200
+    # Delete the user's earliest note (oldest timestamp), but only at their
+    # notes limit. The count check and the delete happen atomically in the store.
+    note_store = user_notes()
+    deleted_note = note_store.remove_oldest(min_count=MAX_NOTES)
+    if deleted_note is None:
+        note_count = len(note_store)
+        if not note_count:
+            return jsonify({"message": "No notes to delete. Add some notes first!", "deleted": False}), 200
+        return jsonify({"message": f"You currently have {note_count} notes. Premium benefits apply when you reach the {MAX_NOTES} notes limit. No action taken.", "deleted": False}), 200
 
-    # Delete the earliest note (oldest timestamp)
-    notes_db.sort(key=lambda x: x['timestamp'])  # Sort by oldest first
-    deleted_note = notes_db.pop(0)  # Remove the oldest
+    note_evictions.inc()
     return jsonify({
         "message": "Premium features are not yet enabled. As a temporary measure, the oldest note has been deleted to make space.",
         "deleted_note_title": deleted_note.get('title'),
+        "deleted_note_id": deleted_note.get('id'),
         "deleted": True
     }), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition format
+    return app.response_class(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route('/<path:path>')  # Catch-all for nav links
 def catch_all(path):
     # For now, all other nav links redirect to home
     # In a real app, these would go to 'about.html', 'contact.html' etc.
     app.logger.info(f"Path '{path}' requested, redirecting to home.")
-    return render_template('index.html')
+    current_user_key()
+    return assets.page('index.html')
 
 
 if __name__ == '__main__':
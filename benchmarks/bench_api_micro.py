@@ -0,0 +1,134 @@
+"""
+Micro-benchmarks for the QuickNote request helpers and the doc generator's Markdown conversion.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_api_micro [--notes 1000] [--json results.json]
+
+Reports the median time per call (microseconds) for:
+  - sanitize_input on a title
+  - is_safe_html_ish on unseen content (sanitizer) and on repeated content (cache)
+  - markdown_to_confluence_html on generated documentation (skipped when the
+    doc generator's dependencies are not installed)
+  - GET /api/notes: the full newest-first list, the first page, a later page,
+    and a conditional request answered with 304
+The app runs on the in-memory note store filled with --notes notes.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.results import write_results
+
+DOCUMENTATION_MARKDOWN = (
+    "**File Overview:**\nHelpers for the note store.\n\n"
+    "**Functions:**\n" + "\n\n".join(
+        f"**Function:** `helper_{n}(note: dict, limit: int) -> list`\n"
+        f"**Purpose:** Does step {n} of the pipeline.\n"
+        "**Parameters:**\n- `note` (dict): The note.\n- `limit` (int): Maximum notes.\n"
+        "**Returns:**\n- (list): The result.\n\n```python\nhelper(note, 5)\n```" for n in range(20))
+)
+CONTENT = ''.join(f'<p>Paragraph {n} with <strong>bold</strong> and <a href="https://example.com/{n}">a link</a>.</p>'
+                  for n in range(40))
+BENCH_USER = 'be' * 16  # Note partition the benchmarks fill and read (any 32 hex digits)
+
+
+def median_us(func, repeat, number):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return round(statistics.median(timings) * 1e6, 2)
+
+
+def load_app(note_count):
+    os.environ['NOTES_STORE_BACKEND'] = 'memory'
+    import app as quicknote
+
+    store = quicknote.note_stores.acquire(BENCH_USER, create=True)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(note_count):
+        store.add({
+            "id": str(uuid.uuid4()),
+            "title": f"Note {i}",
+            "content": f"<p>Note body {i}</p>",
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+        })
+    return quicknote
+
+
+def bench_client(quicknote):
+    """Test client that sends BENCH_USER's cookie."""
+    client = quicknote.app.test_client()
+    client.set_cookie(quicknote.USER_COOKIE, BENCH_USER)
+    return client
+
+
+def load_markdown_converter():
+    scripts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+    sys.path.insert(0, scripts_dir)
+    try:
+        from doc_generator import markdown_to_confluence_html
+    except (ImportError, SystemExit):  # doc_generator exits when openai/markdown2 are missing
+        return None
+    return markdown_to_confluence_html
+
+
+def run(note_count=1000, repeat=7):
+    quicknote = load_app(note_count)
+    client = bench_client(quicknote)
+    results = {}
+
+    results["sanitize_input_us"] = median_us(
+        lambda: quicknote.sanitize_input("A <b>title</b> & more " * 5, max_length=250), repeat, 2000)
+    counter = iter(range(10 ** 9))
+    results["is_safe_html_ish_miss_us"] = median_us(
+        lambda: quicknote.is_safe_html_ish(CONTENT + str(next(counter))), repeat, 50)
+    results["is_safe_html_ish_hit_us"] = median_us(lambda: quicknote.is_safe_html_ish(CONTENT), repeat, 500)
+
+    markdown_to_confluence_html = load_markdown_converter()
+    if markdown_to_confluence_html is None:
+        print("doc_generator dependencies missing, skipping markdown_to_confluence_html")
+    else:
+        results["markdown_to_confluence_html_us"] = median_us(
+            lambda: markdown_to_confluence_html(DOCUMENTATION_MARKDOWN), repeat, 20)
+
+    first_page = client.get('/api/notes?limit=20').get_json()
+    etag = client.get('/api/notes').headers['ETag']
+    results["get_notes"] = {
+        "notes": note_count,
+        "full_list_us": median_us(lambda: client.get('/api/notes'), repeat, 20),
+        "first_page_us": median_us(lambda: client.get('/api/notes?limit=20'), repeat, 100),
+        "next_page_us": median_us(
+            lambda: client.get(f"/api/notes?limit=20&cursor={first_page['next_cursor']}"), repeat, 100),
+        "not_modified_us": median_us(
+            lambda: client.get('/api/notes', headers={'If-None-Match': etag}), repeat, 200),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.notes, args.repeat)
+    for name, value in results.items():
+        if isinstance(value, dict):
+            for sub_name, sub_value in value.items():
+                print(f"{name}.{sub_name:<20} {sub_value:>12}")
+        else:
+            print(f"{name:<33} {value:>12}")
+    if args.json:
+        write_results(args.json, {"micro": results})
+
+
+if __name__ == '__main__':
+    main()
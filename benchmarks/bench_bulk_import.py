@@ -0,0 +1,123 @@
+"""
+Bulk NDJSON import and export against one POST /api/notes per note.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_bulk_import [--notes 5000] [--backend log] [--json results.json]
+
+Stores --notes notes of Quill HTML for a fresh user on the given backend
+(the log backend fsyncs each write), first with one POST /api/notes per note
+and then with one POST /api/notes/import, and reports notes per second and
+the memory the import needs on top of what the stored notes and their search
+index keep (peak minus retained, tracemalloc). Then reads them back with
+GET /api/notes/export and with the unpaginated GET /api/notes and reports
+the time and peak memory of each. Both memory figures for the NDJSON
+endpoints should stay flat as --notes grows.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_api_micro import load_app
+from benchmarks.bench_json_transport import WORDS, make_content
+from benchmarks.results import write_results
+
+
+def make_lines(note_count, seed=42):
+    rng = random.Random(seed)
+    return [json.dumps({"title": f"Note {i}: {rng.choice(WORDS)}",
+                        "content": make_content(rng, rng.randint(200, 2000))}) for i in range(note_count)]
+
+
+def timed(func):
+    """(seconds, peak traced KB, KB still held afterwards) of one call."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, round(peak / 1024), round(retained / 1024)
+
+
+def user_client(quicknote, user_no):
+    client = quicknote.app.test_client()
+    client.set_cookie(quicknote.USER_COOKIE, f"{0xb0 + user_no:032x}")
+    return client
+
+
+def run(note_count=5000, backend='log'):
+    quicknote = load_app(0)
+    data_dir = tempfile.mkdtemp(prefix='notes-bulk-')
+    previous = {name: os.environ.get(name) for name in ('NOTES_STORE_BACKEND', 'NOTES_DATA_DIR')}
+    os.environ.update(NOTES_STORE_BACKEND=backend, NOTES_DATA_DIR=data_dir)  # Read when a partition is opened
+    max_notes, quicknote.MAX_NOTES = quicknote.MAX_NOTES, note_count
+    lines = make_lines(note_count)
+    results = {"notes": note_count, "backend": backend}
+    try:
+        single = user_client(quicknote, 0)
+
+        def post_each():
+            for line in lines:
+                assert single.post('/api/notes', data=line, content_type='application/json').status_code == 201
+
+        elapsed = timed(post_each)[0]
+        results["single_posts"] = {"s": round(elapsed, 2), "notes_per_s": round(note_count / elapsed)}
+
+        bulk = user_client(quicknote, 1)
+        body = '\n'.join(lines).encode('utf-8')
+
+        def post_import():
+            assert bulk.post('/api/notes/import', data=body,
+                             content_type='application/x-ndjson').get_json()['imported'] == note_count
+
+        elapsed, peak, retained = timed(post_import)
+        results["import"] = {"s": round(elapsed, 2), "notes_per_s": round(note_count / elapsed),
+                             "body_kb": round(len(body) / 1024), "transient_kb": peak - retained}
+        results["import_speedup"] = round(results["import"]["notes_per_s"] / results["single_posts"]["notes_per_s"], 1)
+
+        def read(url):
+            response = bulk.get(url, buffered=False)
+            for _ in response.response:
+                pass
+            response.close()
+
+        for name, url in (('export', '/api/notes/export'), ('get_notes', '/api/notes')):
+            elapsed, peak, _ = timed(lambda: read(url))
+            results[name] = {"ms": round(elapsed * 1000, 1), "peak_kb": peak}
+    finally:
+        quicknote.MAX_NOTES = max_notes
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=5000)
+    parser.add_argument('--backend', choices=('memory', 'log', 'sqlite'), default='log')
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.notes, args.backend)
+    print(f"{args.notes} notes, {args.backend} backend")
+    print(f"one POST per note  {results['single_posts']['s']:>8} s  {results['single_posts']['notes_per_s']:>8} notes/s")
+    print(f"NDJSON import      {results['import']['s']:>8} s  {results['import']['notes_per_s']:>8} notes/s  "
+          f"({results['import_speedup']}x, {results['import']['transient_kb']} KB transient for a "
+          f"{results['import']['body_kb']} KB body)")
+    for name in ('export', 'get_notes'):
+        print(f"{name:<18} {results[name]['ms']:>8} ms  peak {results[name]['peak_kb']} KB")
+    if args.json:
+        write_results(args.json, {"bulk_import": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Load test for the note event feed (change_feed.ChangeFeed).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_change_feed [--subscribers 1000] [--events 200]
+
+Starts N idle subscribers, each drained by its own thread the way a streaming
+response would be, then publishes events and reports:
+  - memory held by the subscriptions (tracemalloc, excluding thread stacks)
+  - time spent in publish() (what a writer pays)
+  - fan-out latency from publish to delivery, across all subscribers
+  - that a subscriber which never reads stays bounded and gets a resync
+
+Every delivery wakes one thread, so latency grows with subscribers x event
+rate; the defaults model a busy but realistic note rate.
+"""
+import argparse
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+
+from benchmarks.results import percentile
+from change_feed import ChangeFeed, RESYNC_MESSAGE
+
+
+def consume(subscription, expected, sent_at, latencies, done):
+    received = 0
+    for message in subscription.messages(heartbeat=60):
+        if message.startswith('id: '):
+            event_no = int(message[4:message.index('\n')])
+            latencies.append(time.perf_counter() - sent_at[event_no])
+            received += 1
+            if received == expected:
+                break
+    subscription.close()
+    done.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=0.1, help="seconds between published events")
+    args = parser.parse_args()
+
+    threading.stack_size(256 * 1024)
+    feed = ChangeFeed(max_pending=100, max_subscribers=args.subscribers + 1)
+    payload = {"op": "add", "note": {"id": "x" * 36, "title": "Title", "content": "<p>" + "x" * 500 + "</p>"}}
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    subscriptions = [feed.subscribe() for _ in range(args.subscribers)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stalled = feed.subscribe()  # Never read from
+
+    sent_at = {}
+    latencies = []
+    done = threading.Semaphore(0)
+    for subscription in subscriptions:
+        threading.Thread(target=consume, daemon=True,
+                         args=(subscription, args.events, sent_at, latencies, done)).start()
+    time.sleep(0.5)  # Let every consumer block on its queue
+
+    publish_times = []
+    for event_no in range(args.events):
+        sent_at[event_no] = time.perf_counter()
+        feed.publish("note-created", payload, event_id=event_no)
+        publish_times.append(time.perf_counter() - sent_at[event_no])
+        time.sleep(args.interval)
+    for _ in subscriptions:
+        done.acquire()
+
+    # Push the never-read subscriber past its queue bound
+    for event_no in range(feed.max_pending + 1):
+        feed.publish("note-created", payload, event_id=event_no)
+    time.sleep(0.5)
+    stalled_messages = list(_take(stalled.messages(heartbeat=0.01), 2))
+
+    print(f"subscribers:               {args.subscribers}")
+    print(f"subscription memory:       {(after - before) / 1024:.0f} KiB "
+          f"({(after - before) / args.subscribers:.0f} B per subscriber)")
+    print(f"process max RSS:           {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+    print(f"publish() per event:       median {statistics.median(publish_times) * 1e3:.3f} ms, "
+          f"max {max(publish_times) * 1e3:.3f} ms")
+    ordered = sorted(latencies)
+    print(f"fan-out latency:           p50 {percentile(ordered, 0.5) * 1e3:.2f} ms, "
+          f"p95 {percentile(ordered, 0.95) * 1e3:.2f} ms, p99 {percentile(ordered, 0.99) * 1e3:.2f} ms")
+    print(f"stalled subscriber:        first message after overflow is resync: "
+          f"{stalled_messages[0] == RESYNC_MESSAGE}")
+
+
+def _take(iterator, count):
+    for _ in range(count):
+        yield next(iterator)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Round-trip benchmark for the pooled Confluence client (scripts/confluence_client.py).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_confluence_client [--pages 200] [--changed 0.1]
+
+Publishes --pages child pages to a local Confluence stub (confluence_stub.py)
+three times: a first run that creates every page, a rerun with identical
+content, and a rerun where a --changed fraction of pages differ. Each run is
+measured for:
+  - the previous flow: a new connection per call, a title lookup then a PUT/POST
+  - ConfluenceClient: one pooled session, bulk CQL lookup, fingerprint skipping
+and reports wall time, requests, writes and new connections.
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from confluence_client import ConfluenceClient  # noqa: E402
+from benchmarks.confluence_stub import ConfluenceStub  # noqa: E402
+
+SPACE_KEY = "DOCS"
+
+
+def legacy_publish(base_url, title, storage_html, parent_id):
+    # What doc_generator.py did before: requests.get/put/post with no Session
+    rest_url = f"{base_url}/rest/api/content"
+    found = requests.get(rest_url, params={"spaceKey": SPACE_KEY, "title": title, "expand": "version", "limit": 1},
+                         timeout=10).json()['results']
+    page_data = {"type": "page", "title": title, "space": {"key": SPACE_KEY},
+                 "ancestors": [{"id": parent_id}],
+                 "body": {"storage": {"value": storage_html, "representation": "storage"}}}
+    if found:
+        page_data["version"] = {"number": found[0]['version']['number'] + 1}
+        response = requests.put(f"{rest_url}/{found[0]['id']}", json=page_data, timeout=20)
+    else:
+        response = requests.post(rest_url, json=page_data, timeout=20)
+    response.raise_for_status()
+
+
+def page_bodies(count, changed, run):
+    bodies = {}
+    for n in range(count):
+        revision = run if n < int(count * changed) else 0
+        bodies[f"Doc: module_{n}.py"] = f"<p>Documentation for module {n}, revision {revision}.</p>" * 20
+    return bodies
+
+
+def measure(stub, label, publish_all):
+    stub.reset_counters()
+    started = time.perf_counter()
+    publish_all()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<30} {elapsed:7.2f}s  {stub.requests:5} requests  {stub.writes:5} writes  "
+          f"{stub.connections:5} connections")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--changed', type=float, default=0.1)
+    parser.add_argument('--connect-latency', type=float, default=0.03, help="per new connection (handshake)")
+    parser.add_argument('--latency', type=float, default=0.005, help="per request")
+    args = parser.parse_args()
+
+    runs = [("first run (create)", page_bodies(args.pages, 0, 0)),
+            ("rerun, unchanged", page_bodies(args.pages, 0, 0)),
+            (f"rerun, {args.changed:.0%} changed", page_bodies(args.pages, args.changed, 2))]
+
+    for name, use_client in (("previous flow", False), ("ConfluenceClient", True)):
+        stub = ConfluenceStub(connect_latency=args.connect_latency, latency=args.latency).start()
+        _, root = stub.create({"title": "Project Docs", "body": {"storage": {"value": ""}}})
+        print(f"{name}:")
+        for label, bodies in runs:
+            if use_client:
+                def publish_all():
+                    client = ConfluenceClient(stub.url, None, SPACE_KEY)
+                    client.load_children(root['id'])
+                    for title, body in bodies.items():
+                        client.publish(title, body, parent_id=root['id'])
+                    client.close()
+            else:
+                def publish_all():
+                    for title, body in bodies.items():
+                        legacy_publish(stub.url, title, body, root['id'])
+            measure(stub, label, publish_all)
+        stub.shutdown()
+        stub.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Rerun time of the GraphRAG Team Dashboard (pages/dashboard.py) with thousands of CRs, against the eager version it replaced.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_dashboard [--crs 5000] [--runs 5] [--json results.json]
+
+Writes --crs CRs for one sprint and team (so every one matches the
+filters) to a JSON Lines file and runs the page headlessly with Streamlit's
+AppTest. "before" is the previous page: it read the CRs on every rerun and
+built every tile with all its sections. For the current page it reports the
+first run (reading the file), a plain rerun, a rerun after switching page,
+after switching team (a filter combination not cached yet) and after opening
+one tile. Times are medians over --runs and include AppTest's own handling
+of the elements, which grows with their number as the browser's would.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.results import write_results
+
+STATUSES = ["Pending", "In Review", "Approved", "Scheduled", "Done"]
+OWNERS = ["Alice", "Bob", "Charlie", "Dana", "Eve", "Frank"]
+
+# The page before the data layer, reading the CRs as it would have on each rerun
+BEFORE_SCRIPT = """
+import pandas as pd
+import streamlit as st
+from dashboard_data import CRS_PATH
+from graph_view import current_graph, show_graph, show_linked_content
+
+st.header("Team Dashboard")
+with st.sidebar:
+    st.subheader("Filters")
+    sprint = st.selectbox("Sprint", ["Sprint 1", "Sprint 2"])
+    team = st.selectbox("Team", ["Team Alpha", "Team Beta"])
+    task_view = st.radio("View", ["My Tasks", "Team Tasks"])
+data = pd.read_json(CRS_PATH, lines=True, dtype=False).to_dict('records')
+graph = current_graph()
+for cr in data:
+    with st.expander(f"{cr['ID']} — {cr['Title']}", expanded=False):
+        st.markdown(f"**Status:** {cr['Status']}")
+        st.markdown(f"**Owner:** {cr['Owner']}")
+        st.markdown(f"**Scheduled Date:** {cr['Scheduled Date']}")
+        st.subheader("AI Summary")
+        st.info(f"This is an AI-generated summary for {cr['ID']}.")
+        st.subheader("Linked Content")
+        show_linked_content(graph, f"CRs:{cr['ID']}", ["Confluence", "Outlook", "JIRA", "CRs"])
+        st.subheader("Timeline")
+        st.write("Timeline for this CR would appear here.")
+        st.subheader("Graph View")
+        show_graph(graph, f"CRs:{cr['ID']}")
+"""
+AFTER_SCRIPT = """
+from pages import dashboard
+dashboard.show()
+"""
+
+
+def write_crs(path, count, seed=42):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for n in range(count):
+            f.write(json.dumps({
+                "ID": f"CR-{10000 + n}", "Title": f"Change request {n}", "Status": rng.choice(STATUSES),
+                "Owner": rng.choice(OWNERS), "Scheduled Date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "Sprint": "Sprint 1", "Team": rng.choice(["Team Alpha"] * 9 + ["Team Beta"]),
+            }) + '\n')
+
+
+def timed_ms(func):
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def median_ms(timings):
+    return round(statistics.median(timings), 1)
+
+
+def run(cr_count=5000, runs=5):
+    data_dir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    path = os.path.join(data_dir, 'crs.jsonl')
+    write_crs(path, cr_count)
+    os.environ['GRAPHRAG_CRS_PATH'] = path  # Read when dashboard_data is imported
+    os.environ.pop('GRAPHRAG_USER', None)
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    from streamlit import config, logger
+    # AppTest runs without a server, which Streamlit warns about
+    logger.set_log_level('error')
+    config.set_option('logger.level', 'error')
+    results = {"crs": cr_count}
+    try:
+        before = AppTest.from_string(BEFORE_SCRIPT, default_timeout=600)
+        results["before"] = {"first_run_ms": round(timed_ms(before.run), 1),
+                             "rerun_ms": median_ms([timed_ms(before.run) for _ in range(runs)]),
+                             "expanders": len(before.expander)}
+
+        timings = {name: [] for name in ("first_run_ms", "rerun_ms", "page_change_ms", "team_change_ms",
+                                         "open_tile_ms")}
+        for _ in range(runs):
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            after = AppTest.from_string(AFTER_SCRIPT, default_timeout=600)
+            timings["first_run_ms"].append(timed_ms(after.run))
+            timings["rerun_ms"].append(timed_ms(after.run))
+            after.number_input[0].set_value(2)
+            timings["page_change_ms"].append(timed_ms(after.run))
+            [team] = [box for box in after.selectbox if box.label == "Team"]
+            team.select("Team Beta")
+            timings["team_change_ms"].append(timed_ms(after.run))
+            after.session_state[after.expander[0].key] = True
+            timings["open_tile_ms"].append(timed_ms(after.run))
+            assert after.info, "the opened tile shows its sections"
+        results["after"] = {name: median_ms(values) for name, values in timings.items()}
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--crs', type=int, default=5000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.crs, args.runs)
+    before, after = results["before"], results["after"]
+    print(f"{args.crs} CRs")
+    print(f"before: first run {before['first_run_ms']} ms, rerun {before['rerun_ms']} ms "
+          f"({before['expanders']} tiles built)")
+    print(f"after:  first run {after['first_run_ms']} ms, rerun {after['rerun_ms']} ms, "
+          f"page change {after['page_change_ms']} ms, team change {after['team_change_ms']} ms, "
+          f"open a tile {after['open_tile_ms']} ms")
+    print(f"rerun {before['rerun_ms'] / after['rerun_ms']:.0f}x faster")
+    if args.json:
+        write_results(args.json, {"dashboard": results})
+
+
+if __name__ == '__main__':
+    main()
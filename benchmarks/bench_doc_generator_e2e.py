@@ -0,0 +1,159 @@
+"""
+End-to-end benchmark of scripts/doc_generator.py against local OpenAI and Confluence stubs.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_doc_generator_e2e [--files 50] [--openai-latency 0.3] [--json results.json]
+
+Generates a git repository of --files Python modules (functions and a class
+each) and runs the real doc generator as a subprocess three times:
+  - cold: empty documentation cache and an empty Confluence space
+  - rerun: same commit again (nothing to do)
+  - one-file change: a commit that edits one function in one module
+Reports wall time, OpenAI requests and Confluence requests/writes per run.
+Latencies are injected by openai_stub.py and confluence_stub.py.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.confluence_stub import ConfluenceStub
+from benchmarks.openai_stub import OpenAIStub
+from benchmarks.results import write_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOC_GENERATOR = os.path.join(REPO_ROOT, 'scripts', 'doc_generator.py')
+
+MODULE_TEMPLATE = '''"""Module {n} of the generated benchmark project."""
+import json
+
+LIMIT = {n}
+
+
+def load_{n}(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_{n}(path: str, data: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+class Store{n}:
+    """Keeps up to LIMIT items."""
+
+    def __init__(self):
+        self.items = []
+
+    def add(self, item):
+        self.items.append(item)
+        del self.items[:-LIMIT]
+'''
+
+
+def git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+def make_project(directory, files):
+    package = os.path.join(directory, 'project')
+    os.makedirs(package)
+    for n in range(files):
+        with open(os.path.join(package, f'module_{n}.py'), 'w') as f:
+            f.write(MODULE_TEMPLATE.format(n=n))
+    git(directory, 'init', '-q')
+    git(directory, '-c', 'user.name=bench', '-c', 'user.email=bench@example.com', 'add', '-A')
+    git(directory, '-c', 'user.name=bench', '-c', 'user.email=bench@example.com', 'commit', '-qm', 'Initial')
+
+
+def run_generator(env):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, DOC_GENERATOR], env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        print(completed.stdout[-2000:], completed.stderr[-2000:])
+        raise SystemExit(f"doc_generator.py exited with {completed.returncode}")
+    return elapsed
+
+
+def run(files=50, openai_latency=0.3, confluence_latency=0.02, connect_latency=0.03, rate_limit_every=0):
+    work_dir = tempfile.mkdtemp(prefix='docgen-bench-')
+    openai_stub = OpenAIStub(latency=openai_latency, rate_limit_every=rate_limit_every).start()
+    confluence = ConfluenceStub(connect_latency=connect_latency, latency=confluence_latency).start()
+    try:
+        make_project(work_dir, files)
+        env = {key: value for key, value in os.environ.items() if key != 'GITHUB_SHA'}
+        env.update({
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_BASE_URL": openai_stub.url,
+            "OPENAI_REQUESTS_PER_MINUTE": "6000",
+            "CONFLUENCE_URL": confluence.url,
+            "CONFLUENCE_EMAIL": "bench@example.com",
+            "CONFLUENCE_API_TOKEN": "stub",
+            "CONFLUENCE_SPACE_KEY": "DOCS",
+            "CONFLUENCE_REQUESTS_PER_SECOND": "100",
+            "ROOT_DOC_TITLE": "Benchmark Docs",
+            "CODE_ROOT_PATH": work_dir,
+            "DOC_CACHE_DIR": os.path.join(work_dir, '.doc_cache'),
+        })
+
+        results = {"files": files, "openai_latency_s": openai_latency}
+        for name, prepare in (("cold", None), ("rerun", None), ("one_file_change", edit_one_file)):
+            if prepare:
+                prepare(work_dir)
+            openai_stub.reset_counters()
+            confluence.reset_counters()
+            elapsed = run_generator(env)
+            results[name] = {
+                "wall_s": round(elapsed, 2),
+                "openai_requests": openai_stub.requests,
+                "openai_rate_limited": openai_stub.rate_limited,
+                "openai_prompt_chars": openai_stub.prompt_chars,
+                "confluence_requests": confluence.requests,
+                "confluence_writes": confluence.writes,
+                "confluence_connections": confluence.connections,
+            }
+        return results
+    finally:
+        openai_stub.shutdown()
+        confluence.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def edit_one_file(work_dir):
+    path = os.path.join(work_dir, 'project', 'module_0.py')
+    with open(path) as f:
+        source = f.read()
+    with open(path, 'w') as f:
+        f.write(source.replace('json.dump(data, f)', 'json.dump(data, f, indent=2)'))
+    git(work_dir, '-c', 'user.name=bench', '-c', 'user.email=bench@example.com', 'commit', '-qam', 'Edit')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--openai-latency', type=float, default=0.3)
+    parser.add_argument('--confluence-latency', type=float, default=0.02)
+    parser.add_argument('--connect-latency', type=float, default=0.03)
+    parser.add_argument('--rate-limit-every', type=int, default=0)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.files, args.openai_latency, args.confluence_latency, args.connect_latency,
+                  args.rate_limit_every)
+    print(f"{args.files} files, OpenAI latency {args.openai_latency}s")
+    print(f"{'':<16} {'wall s':>8} {'OpenAI':>8} {'Conf req':>9} {'writes':>7}")
+    for name in ("cold", "rerun", "one_file_change"):
+        row = results[name]
+        print(f"{name:<16} {row['wall_s']:>8} {row['openai_requests']:>8} "
+              f"{row['confluence_requests']:>9} {row['confluence_writes']:>7}")
+    if args.json:
+        write_results(args.json, {"doc_generator_e2e": results})
+
+
+if __name__ == '__main__':
+    main()
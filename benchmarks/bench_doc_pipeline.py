@@ -0,0 +1,99 @@
+"""
+Wall-clock benchmark for the documentation pipeline (scripts/doc_pipeline.py).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_doc_pipeline [--files 200] [--generate-latency 0.2]
+
+Simulates OpenAI and Confluence with sleeps (no network) and compares:
+  - the old serial loop: generate, upload, then a fixed --sleep per file
+  - run_pipeline with token buckets at the given quotas
+The pipeline should finish in about files / quota, whichever quota is tighter,
+instead of files * (generate latency + upload latency + sleep). Every
+--rate-limit-every'th OpenAI call answers 429 with Retry-After to check that
+the pause is honoured without stalling the run.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from doc_pipeline import TokenBucket, backoff_delay, run_pipeline  # noqa: E402
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"429, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--generate-latency', type=float, default=0.2)
+    parser.add_argument('--publish-latency', type=float, default=0.05)
+    parser.add_argument('--sleep', type=float, default=3.0, help="fixed sleep of the old loop (estimated, not run)")
+    parser.add_argument('--openai-rps', type=float, default=40.0)
+    parser.add_argument('--confluence-rps', type=float, default=20.0)
+    parser.add_argument('--generate-workers', type=int, default=8)
+    parser.add_argument('--publish-workers', type=int, default=4)
+    parser.add_argument('--rate-limit-every', type=int, default=50)
+    args = parser.parse_args()
+
+    serial = args.files * (args.generate_latency + 2 * args.publish_latency + args.sleep)
+    print(f"serial loop (estimated): {serial:8.1f}s")
+    serial_no_sleep = args.files * (args.generate_latency + 2 * args.publish_latency)
+    print(f"serial loop, no sleep:   {serial_no_sleep:8.1f}s")
+
+    openai_limiter = TokenBucket(args.openai_rps, capacity=args.generate_workers)
+    confluence_limiter = TokenBucket(args.confluence_rps)
+    calls = {'openai': 0, 'confluence': 0, 'rate_limited': 0}
+    calls_lock = threading.Lock()
+
+    def fake_openai():
+        with calls_lock:
+            calls['openai'] += 1
+            limited = args.rate_limit_every and calls['openai'] % args.rate_limit_every == 0
+        time.sleep(args.generate_latency)
+        if limited:
+            raise RateLimited(0.5)
+        return "documentation"
+
+    def generate(item):
+        for attempt in range(5):
+            openai_limiter.acquire()
+            try:
+                return fake_openai()
+            except RateLimited as e:
+                with calls_lock:
+                    calls['rate_limited'] += 1
+                openai_limiter.pause(backoff_delay(attempt, e.retry_after))
+        return None
+
+    def publish(item, result):
+        for _ in range(2):  # Page lookup, then create/update
+            confluence_limiter.acquire()
+            with calls_lock:
+                calls['confluence'] += 1
+            time.sleep(args.publish_latency)
+        return True
+
+    started = time.perf_counter()
+    published = run_pipeline(range(args.files), generate, publish,
+                             generate_workers=args.generate_workers, publish_workers=args.publish_workers)
+    elapsed = time.perf_counter() - started
+
+    # The buckets start full, so the first `capacity` calls are free
+    quota_bound = max((calls['openai'] - openai_limiter.capacity) / args.openai_rps,
+                      (calls['confluence'] - confluence_limiter.capacity) / args.confluence_rps)
+    print(f"pipeline:                {elapsed:8.1f}s  ({published}/{args.files} published, "
+          f"{calls['openai']} OpenAI calls incl. {calls['rate_limited']} rate-limited, "
+          f"{calls['confluence']} Confluence calls)")
+    print(f"quota lower bound:       {quota_bound:8.1f}s  (time spent beyond it: {elapsed - quota_bound:.1f}s)")
+    print(f"speedup vs serial:       {serial / elapsed:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
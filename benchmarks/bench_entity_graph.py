@@ -0,0 +1,139 @@
+"""
+Build time, load time and neighbourhood query latency of the entity-link graph (entity_graph.py) at 10M links.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_entity_graph [--links 10000000] [--queries 2000] [--json results.json]
+
+Adds --links random typed links between 3.3M CRs, JIRA issues, Confluence
+pages and Outlook threads (by name, 1M links per add_links call, as an
+ingest would), saves the graph and reloads it from its memory-mapped files.
+Reports p50/p95 latency over --queries random nodes of 1-hop and 2-hop
+queries on node ids, with and without an edge-type filter, and of the
+name-based calls the Streamlit panels make (neighbours, subgraph), before
+and after 1,000 links are added to the in-memory delta.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.results import write_results
+from entity_graph import EntityGraph
+
+BATCH_LINKS = 1000000
+KINDS = {"CRs": 1000000, "JIRA": 1500000, "Confluence": 500000, "Outlook": 300000}
+# (source kind, target kind, edge type, share of the links)
+LINK_TYPES = [
+    ("CRs", "JIRA", "implements", 0.35),
+    ("CRs", "Confluence", "documents", 0.15),
+    ("JIRA", "JIRA", "blocks", 0.2),
+    ("JIRA", "Confluence", "documents", 0.1),
+    ("JIRA", "Outlook", "discussed", 0.1),
+    ("CRs", "Outlook", "discussed", 0.1),
+]
+KEY_FORMATS = {"CRs": "CR-{}", "JIRA": "PROJ-{}", "Confluence": "{}", "Outlook": "thread-{}"}
+
+
+def node_names(kind, numbers):
+    key_format = KEY_FORMATS[kind]
+    return [f"{kind}:{key_format.format(number)}" for number in numbers.tolist()]
+
+
+def make_links(rng, count):
+    links = []
+    shares = np.array([share for _, _, _, share in LINK_TYPES])
+    counts = rng.multinomial(count, shares / shares.sum())
+    for (source_kind, target_kind, edge_type, _), type_count in zip(LINK_TYPES, counts):
+        sources = node_names(source_kind, rng.integers(0, KINDS[source_kind], size=type_count))
+        targets = node_names(target_kind, rng.integers(0, KINDS[target_kind], size=type_count))
+        links.extend(zip(sources, targets, [edge_type] * type_count))
+    return links
+
+
+def percentiles(func, arguments):
+    timings = []
+    for argument in arguments:
+        started = time.perf_counter()
+        func(argument)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {"p50_us": round(statistics.median(timings) * 1e6, 1),
+            "p95_us": round(timings[int(len(timings) * 0.95) - 1] * 1e6, 1)}
+
+
+def query_latencies(graph, nodes, names):
+    implements = graph.type_codes(["implements"])
+    return {
+        "1hop": percentiles(graph.neighbour_ids, nodes),
+        "1hop_typed": percentiles(lambda node: graph.neighbour_ids(node, implements), nodes),
+        "2hop": percentiles(graph.expand_ids, nodes),
+        "2hop_typed": percentiles(lambda node: graph.expand_ids(node, 2, implements), nodes),
+        "neighbours_by_name": percentiles(graph.neighbours, names),
+        "subgraph_by_name": percentiles(graph.subgraph, names),
+    }
+
+
+def run(link_count=10000000, query_count=2000, seed=42):
+    rng = np.random.default_rng(seed)
+    graph_dir = os.path.join(tempfile.mkdtemp(prefix='entity-graph-bench-'), 'graph')
+    results = {"links": link_count}
+    try:
+        graph = EntityGraph(graph_dir)
+        build_s = 0.0
+        for start in range(0, link_count, BATCH_LINKS):
+            links = make_links(rng, min(BATCH_LINKS, link_count - start))
+            started = time.perf_counter()
+            graph.add_links(links)
+            build_s += time.perf_counter() - started
+        started = time.perf_counter()
+        graph.save()
+        results["add_links_s"] = round(build_s, 1)
+        results["save_s"] = round(time.perf_counter() - started, 1)
+        results["links_per_s"] = round(link_count / build_s)
+        del graph
+
+        started = time.perf_counter()
+        graph = EntityGraph(graph_dir)
+        results["load_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        results["nodes"] = graph.node_count
+        results["stored_links"] = graph.link_count  # Less than --links: random links repeat
+        results["graph_mb"] = round(sum(entry.stat().st_size for entry in os.scandir(graph_dir)) / 2 ** 20)
+
+        nodes = rng.integers(0, graph.node_count, size=query_count).tolist()
+        names = [graph.node_name(node) for node in nodes]
+        query_latencies(graph, nodes[:500], names[:500])  # Warm-up: page the arrays in
+        results["mean_2hop_nodes"] = round(float(np.mean([len(graph.expand_ids(node)[0]) for node in nodes])), 1)
+        results["saved"] = query_latencies(graph, nodes, names)
+        graph.add_links(make_links(rng, 1000))
+        results["with_delta"] = query_latencies(graph, nodes, names)
+    finally:
+        shutil.rmtree(os.path.dirname(graph_dir), ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--links', type=int, default=10000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.links, args.queries)
+    print(f"{args.links} links added in {results['add_links_s']} s ({results['links_per_s']} links/s), "
+          f"saved in {results['save_s']} s: {results['stored_links']} distinct links, {results['nodes']} nodes, "
+          f"{results['graph_mb']} MB on disk")
+    print(f"loaded in {results['load_ms']} ms; {results['mean_2hop_nodes']} nodes within 2 hops on average")
+    print(f"\n{'':<20} {'saved p50/p95 us':>18} {'with delta p50/p95 us':>24}")
+    for name, row in results["saved"].items():
+        delta = results["with_delta"][name]
+        print(f"{name:<20} {row['p50_us']:>9}/{row['p95_us']:<8} {delta['p50_us']:>12}/{delta['p95_us']:<8}")
+    if args.json:
+        write_results(args.json, {"entity_graph": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Throughput benchmark for the note HTML sanitizer (html_sanitizer.py).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_html_sanitizer [--documents 200] [--size 20000]
+
+Generates Quill-style documents of about --size characters (paragraphs with
+inline formatting, lists, links, code blocks) and reports MB/s for:
+  - the original is_safe_html_ish (a length check only, no sanitizing)
+  - sanitize_input (html.escape, used for titles)
+  - sanitize_html on every document (cache misses)
+  - SanitizerCache on documents it has already seen (cache hits)
+"""
+import argparse
+import html
+import random
+import time
+
+from html_sanitizer import SanitizerCache, sanitize_html
+
+SNIPPETS = [
+    '<p>Plain paragraph with <strong>bold</strong>, <em>italic</em> and <u>underlined</u> text.</p>',
+    '<h2>Heading number {n}</h2>',
+    '<ul><li>First item</li><li class="ql-indent-1">Nested item {n}</li></ul>',
+    '<ol><li>Step one</li><li>Step two &amp; three</li></ol>',
+    '<p class="ql-align-center"><a href="https://example.com/{n}" rel="noopener noreferrer" target="_blank">a link</a></p>',
+    '<pre class="ql-syntax" spellcheck="false"><span class="hljs-keyword">def</span> '
+    '<span class="hljs-title">f{n}</span>(x):\n    <span class="hljs-keyword">return</span> x &lt; {n}\n</pre>',
+    '<p><span style="color: rgb(230, 0, 0);">red</span> and <span class="ql-font-serif">serif</span></p>',
+    '<blockquote>Quoted text {n}</blockquote>',
+]
+
+
+def make_document(rng, size):
+    parts, length, n = [], 0, 0
+    while length < size:
+        snippet = rng.choice(SNIPPETS).format(n=n)
+        parts.append(snippet)
+        length += len(snippet)
+        n += 1
+    return ''.join(parts)[:size]
+
+
+def original_is_safe_html_ish(content_from_editor, max_length=20000):
+    if not isinstance(content_from_editor, str):
+        return ""
+    return content_from_editor[:max_length]
+
+
+def original_sanitize_input(input_string, max_length=10000):
+    if not isinstance(input_string, str):
+        return ""
+    return html.escape(input_string[:max_length])
+
+
+def throughput(func, documents, rounds=3):
+    total_mb = sum(len(doc.encode('utf-8')) for doc in documents) / 1e6
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for doc in documents:
+            func(doc)
+        best = min(best, time.perf_counter() - started)
+    return total_mb / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--documents', type=int, default=200)
+    parser.add_argument('--size', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    documents = [make_document(rng, args.size) for _ in range(args.documents)]
+    cache = SanitizerCache(maxsize=args.documents)
+    for doc in documents:
+        cache.sanitize(doc)
+
+    print(f"{args.documents} documents of {args.size} chars")
+    print(f"{'is_safe_html_ish (original, no sanitizing)':<44} {throughput(original_is_safe_html_ish, documents):>10.1f} MB/s")
+    print(f"{'sanitize_input (html.escape)':<44} {throughput(original_sanitize_input, documents):>10.1f} MB/s")
+    print(f"{'sanitize_html (uncached)':<44} {throughput(sanitize_html, documents):>10.1f} MB/s")
+    print(f"{'SanitizerCache (cache hits)':<44} {throughput(cache.sanitize, documents):>10.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Serialization time and bytes on the wire for GET /api/notes, before and after the JSON provider and compression.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_json_transport [--notes 1000] [--json results.json]
+
+The app runs on the in-memory note store filled with --notes notes of Quill
+HTML (paragraphs of 200 to 20,000 characters). Reports:
+  - encoding the full note list with Flask's stdlib provider and with
+    FastJSONProvider (orjson when installed), buffered and streamed
+  - peak memory while encoding, buffered vs streamed (tracemalloc)
+  - the unpaginated GET /api/notes as before (stdlib provider, no
+    compression) and with identity, gzip and br encodings: bytes on the
+    wire and median request time
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.bench_api_micro import BENCH_USER, bench_client, load_app
+from benchmarks.results import write_results
+from json_provider import orjson, stream_json_array
+from compression import brotli
+
+WORDS = ("note meeting draft idea release review budget deadline design customer server deploy "
+         "metrics search editor quill highlight premium upgrade oldest newest sync cursor page").split()
+
+
+def make_content(rng, target_chars):
+    paragraphs = []
+    size = 0
+    while size < target_chars:
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+        paragraph = f'<p>{words} <strong>{rng.choice(WORDS)}</strong> <em>{rng.choice(WORDS)}</em></p>'
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    return ''.join(paragraphs)[:target_chars]
+
+
+def fill_store(quicknote, note_count):
+    rng = random.Random(42)
+    store = quicknote.note_stores.acquire(BENCH_USER, create=True)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(note_count):
+        store.add({
+            "id": str(uuid.uuid4()),
+            "title": f"Note {i}: {rng.choice(WORDS)}",
+            "content": make_content(rng, rng.randint(200, 20000)),
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+        })
+
+
+def median_ms(func, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def peak_kb(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024)
+
+
+def run(note_count=1000, repeat=7):
+    quicknote = load_app(0)
+    fill_store(quicknote, note_count)
+    app = quicknote.app
+    notes = quicknote.note_stores.acquire(BENCH_USER, create=True).newest_first()
+    stdlib_provider, fast_provider = DefaultJSONProvider(app), app.json
+
+    def consume_stream():
+        for _ in stream_json_array(fast_provider, notes):
+            pass
+
+    results = {
+        "notes": len(notes),
+        "orjson": orjson is not None,
+        "brotli": brotli is not None,
+        "encode_stdlib_ms": median_ms(lambda: stdlib_provider.dumps(notes, separators=(',', ':')), repeat),
+        "encode_fast_ms": median_ms(lambda: fast_provider.dumps_items(notes), repeat),
+        "encode_fast_streamed_ms": median_ms(consume_stream, repeat),
+        "encode_stdlib_peak_kb": peak_kb(lambda: stdlib_provider.dumps(notes, separators=(',', ':'))),
+        "encode_fast_streamed_peak_kb": peak_kb(consume_stream),
+    }
+
+    client = bench_client(quicknote)
+
+    def get_notes(headers):
+        response = client.get('/api/notes', headers=headers)
+        return response.get_data()
+
+    # Before: Flask's default provider, one buffered body, no compression
+    app.json, stream_min = stdlib_provider, quicknote.NOTES_STREAM_MIN
+    quicknote.NOTES_STREAM_MIN = len(notes)
+    try:
+        results["before"] = {"bytes": len(get_notes({})), "request_ms": median_ms(lambda: get_notes({}), repeat)}
+    finally:
+        app.json, quicknote.NOTES_STREAM_MIN = fast_provider, stream_min
+
+    for encoding in ('identity', 'gzip', 'br'):
+        if encoding == 'br' and brotli is None:
+            continue
+        headers = {'Accept-Encoding': encoding}
+        results[encoding] = {"bytes": len(get_notes(headers)), "request_ms": median_ms(lambda: get_notes(headers), repeat)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.notes)
+    print(f"{args.notes} notes, orjson: {results['orjson']}, brotli: {results['brotli']}")
+    for name in ('encode_stdlib_ms', 'encode_fast_ms', 'encode_fast_streamed_ms',
+                 'encode_stdlib_peak_kb', 'encode_fast_streamed_peak_kb'):
+        print(f"{name:<30} {results[name]:>10}")
+    print(f"\n{'GET /api/notes':<16} {'bytes':>10} {'ms':>8}")
+    for name in ('before', 'identity', 'gzip', 'br'):
+        if name in results:
+            print(f"{name:<16} {results[name]['bytes']:>10} {results[name]['request_ms']:>8}")
+    if args.json:
+        write_results(args.json, {"json_transport": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-request overhead of the request instrumentation in metrics.py.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_metrics [--iterations 200000] [--json results.json]
+
+Reports, in microseconds per call:
+  - RequestMetrics.record and Counter.inc on their own
+  - the WSGI middleware around a do-nothing app and the after_request hook
+    inside a request context; their sum is the whole per-request cost of
+    instrument_app (the middleware includes the record call)
+  - a full request through a small Flask app, with and without
+    instrument_app, for scale (the difference is within run-to-run noise)
+  - rendering /metrics with the series a typical app has
+"""
+import argparse
+import time
+
+from flask import Flask
+
+from benchmarks.results import write_results
+from metrics import MetricsRegistry, RequestMetrics, _MetricsMiddleware, instrument_app
+
+ENVIRON = {
+    'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/notes', 'SERVER_NAME': 'bench', 'SERVER_PORT': '80',
+    'wsgi.url_scheme': 'http', 'CONTENT_LENGTH': '14', 'CONTENT_TYPE': 'application/json',
+}
+
+
+def per_call_us(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return round((time.perf_counter() - started) / iterations * 1e6, 3)
+
+
+def make_app(instrumented):
+    app = Flask(__name__)
+    if instrumented:
+        instrument_app(app, MetricsRegistry(prefix='bench_'))
+
+    @app.route('/api/notes', methods=['POST'])
+    def add_note():
+        return {"notes": []}
+
+    def request_once():
+        environ = dict(ENVIRON)
+        for _ in app.wsgi_app(environ, lambda status, headers, exc_info=None: None):
+            pass
+
+    return request_once
+
+
+def run(iterations=200000):
+    registry = MetricsRegistry(prefix='bench_')
+    request_metrics = registry.register(RequestMetrics(registry.prefix))
+    counter = registry.counter('evictions_total', "Evictions.")
+    results = {
+        "record_us": per_call_us(lambda: request_metrics.record('add_note', 'POST', 0.0042, 14, 120, 201),
+                                 iterations),
+        "counter_inc_us": per_call_us(counter.inc, iterations),
+    }
+
+    def bare_app(environ, start_response):
+        start_response('201 CREATED', [('Content-Type', 'application/json'), ('Content-Length', '14')])
+        return [b'{"notes": []}\n']
+
+    middleware = _MetricsMiddleware(bare_app, request_metrics)
+    environ = dict(ENVIRON)
+    start_response = lambda status, headers, exc_info=None: None  # noqa: E731
+    results["middleware_us"] = round(per_call_us(lambda: middleware(environ, start_response), iterations)
+                                     - per_call_us(lambda: bare_app(environ, start_response), iterations), 3)
+
+    hooked = Flask(__name__)
+    instrument_app(hooked, MetricsRegistry())
+    hook = hooked.after_request_funcs[None][-1]
+    with hooked.test_request_context('/api/notes', method='POST', data='{"title": "x"}'):
+        results["after_request_hook_us"] = per_call_us(lambda: hook(None), iterations)
+    results["instrumentation_overhead_us"] = round(results["middleware_us"] + results["after_request_hook_us"], 3)
+
+    # Interleave the two apps so drift in machine speed hits both equally
+    plain, instrumented = make_app(False), make_app(True)
+    plain_us = instrumented_us = 0.0
+    rounds = 5
+    for _ in range(rounds):
+        plain_us += per_call_us(plain, iterations // 50) / rounds
+        instrumented_us += per_call_us(instrumented, iterations // 50) / rounds
+    results["request_plain_us"] = round(plain_us, 3)
+    results["request_instrumented_us"] = round(instrumented_us, 3)
+
+    for endpoint in ('index', 'get_notes', 'add_note', 'search_notes', 'get_note_changes', 'metrics'):
+        for status in (200, 400):
+            request_metrics.record(endpoint, 'GET', 0.01, 0, 512, status)
+    results["render_us"] = per_call_us(registry.render, 200)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for name, value in results.items():
+        print(f"{name:<30} {value:>10} us")
+    if args.json:
+        write_results(args.json, {"metrics": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: sorting a plain list on every request vs the timestamp index.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_note_index [--sizes 1000 10000 100000]
+
+"list" is the original notes_db path: `sorted(...)` for each newest-first
+read and `sort()` + `pop(0)` for each oldest-note eviction. "index" is
+MemoryNoteStore from note_store.py.
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from note_store import MemoryNoteStore
+
+
+def make_notes(count):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": str(uuid.uuid4()),
+        "title": f"Note {i}",
+        "content": "<p>x</p>",
+        "timestamp": (start + timedelta(seconds=i)).isoformat(),
+    } for i in range(count)]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def bench_list(notes, evictions):
+    notes_db = list(notes)
+    read = best_of(lambda: sorted(notes_db, key=lambda x: x['timestamp'], reverse=True), 5)
+
+    def evict():
+        for _ in range(evictions):
+            notes_db.sort(key=lambda x: x['timestamp'])
+            notes_db.pop(0)
+    return read, best_of(evict, 1) / evictions
+
+
+def bench_index(notes, evictions):
+    store = MemoryNoteStore()
+    for note in notes:
+        store.add(note)
+    read = best_of(store.newest_first, 5)
+
+    def evict():
+        for _ in range(evictions):
+            store.remove_oldest()
+    return read, best_of(evict, 1) / evictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--evictions', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'notes':>8} | {'read: list (ms)':>15} {'index (ms)':>11} | {'evict: list (us)':>16} {'index (us)':>11}")
+    for count in args.sizes:
+        notes = make_notes(count)
+        list_read, list_evict = bench_list(notes, args.evictions)
+        index_read, index_evict = bench_index(notes, args.evictions)
+        print(f"{count:>8} | {list_read * 1e3:>15.2f} {index_read * 1e3:>11.2f} | "
+              f"{list_evict * 1e6:>16.1f} {index_evict * 1e6:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Memory held by the in-memory note store, plain dicts vs NoteRecords, measured with tracemalloc.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_note_memory [--notes 100000] [--json results.json]
+
+Fills a MemoryNoteStore with --notes notes (uuid4 ids, UTC isoformat
+timestamps, Quill HTML content: 70% of 100-1,000 characters, 25% of
+1,000-5,000 and 5% of 5,000-20,000) once with compact_records=False and
+once with the default NoteRecords, and reports for each:
+  - memory held after filling (total and per note) and the fill time
+  - time to read a page of 10 notes, a single note and the full list, since
+    compact records are turned back into dicts on every read
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_json_transport import make_content
+from benchmarks.results import write_results
+from note_store import MemoryNoteStore
+
+CONTENT_POOL_SIZE = 500
+
+
+def content_lengths(rng):
+    bucket = rng.random()
+    if bucket < 0.70:
+        return rng.randint(100, 1000)
+    if bucket < 0.95:
+        return rng.randint(1000, 5000)
+    return rng.randint(5000, 20000)
+
+
+def generate_notes(note_count, seed=42):
+    # Content comes from a pool, with a per-note prefix so that every note
+    # holds its own string (shared strings would hide the dict layout's cost)
+    rng = random.Random(seed)
+    pool = [make_content(rng, content_lengths(rng)) for _ in range(CONTENT_POOL_SIZE)]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(note_count):
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "title": f"Note {i}",
+            "content": f"<p>Note {i}</p>" + pool[i % CONTENT_POOL_SIZE],
+            "timestamp": (start + timedelta(seconds=i, microseconds=rng.randrange(1000000))).isoformat(),
+        }
+
+
+def median_us(func, repeat=7, number=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return round(statistics.median(timings) * 1e6, 1)
+
+
+def measure(note_count, compact_records):
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    store = MemoryNoteStore(compact_records=compact_records)
+    for note in generate_notes(note_count):
+        store.add(note)
+    fill_s = time.perf_counter() - started
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    held -= baseline
+    middle_id = store.page(note_count // 2)[-1]['id']
+    return {
+        "held_mb": round(held / 2 ** 20, 1),
+        "bytes_per_note": round(held / note_count),
+        "fill_s": round(fill_s, 2),
+        "page_10_us": median_us(lambda: store.page(10)),
+        "get_us": median_us(lambda: store.get(middle_id)),
+        "newest_first_ms": round(median_us(store.newest_first, repeat=3, number=1) / 1000, 1),
+    }
+
+
+def run(note_count=100000):
+    results = {"notes": note_count, "dicts": measure(note_count, False)}
+    results["records"] = measure(note_count, True)
+    results["saved_pct"] = round(100 * (1 - results["records"]["held_mb"] / results["dicts"]["held_mb"]), 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=100000)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.notes)
+    print(f"{args.notes} notes")
+    print(f"{'':<8} {'held MB':>8} {'B/note':>8} {'fill s':>7} {'page10 us':>10} {'get us':>8} {'all ms':>8}")
+    for name in ('dicts', 'records'):
+        row = results[name]
+        print(f"{name:<8} {row['held_mb']:>8} {row['bytes_per_note']:>8} {row['fill_s']:>7} "
+              f"{row['page_10_us']:>10} {row['get_us']:>8} {row['newest_first_ms']:>8}")
+    print(f"NoteRecords hold {results['saved_pct']}% less memory")
+    if args.json:
+        write_results(args.json, {"note_memory": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Cold-start replay benchmark for the log-backed note store.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_note_store [--sizes 10000 100000 1000000]
+
+For each size it writes a log of N notes, then measures how long a fresh
+LogNoteStore takes to open it: once replaying the raw log and once after the
+log has been compacted into a snapshot.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from note_store import LogNoteStore
+
+
+def write_log(data_dir, count):
+    # Write records directly (no fsync per line) so setup doesn't dominate the run
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, LogNoteStore.LOG_NAME), 'w', encoding='utf-8') as f:
+        for seq in range(1, count + 1):
+            note = {
+                "id": str(uuid.uuid4()),
+                "title": f"Note {seq}",
+                "content": f"<p>Benchmark note body number {seq}.</p>",
+                "timestamp": (start + timedelta(seconds=seq)).isoformat(),
+            }
+            f.write(json.dumps({"op": "add", "note": note, "seq": seq}, separators=(',', ':')) + '\n')
+
+
+def time_open(data_dir):
+    started = time.perf_counter()
+    store = LogNoteStore(data_dir, compact_every=0)
+    elapsed = time.perf_counter() - started
+    count = len(store)
+    store.close()
+    return elapsed, count
+
+
+def run(count):
+    data_dir = tempfile.mkdtemp(prefix='notes-bench-')
+    try:
+        write_log(data_dir, count)
+        log_seconds, loaded = time_open(data_dir)
+        assert loaded == count, f"expected {count} notes, replayed {loaded}"
+
+        store = LogNoteStore(data_dir, compact_every=0)
+        store.compact()
+        store.close()
+        snapshot_seconds, loaded = time_open(data_dir)
+        assert loaded == count, f"expected {count} notes, loaded {loaded}"
+        return log_seconds, snapshot_seconds
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'notes':>10} {'log replay (s)':>16} {'snapshot load (s)':>18}")
+    for count in args.sizes:
+        log_seconds, snapshot_seconds = run(count)
+        print(f"{count:>10} {log_seconds:>16.3f} {snapshot_seconds:>18.3f}")
+
+
+if __name__ == '__main__':
+    main()
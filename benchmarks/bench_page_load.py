@@ -0,0 +1,136 @@
+"""
+Bytes and requests for first and repeat page loads, before and after the static asset build.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_page_load [--json results.json]
+
+Builds the assets into a temporary directory and loads the page the way a
+browser with an HTTP cache would:
+  - before: index.html rendered per request and sent uncompressed, assets
+    from /static/ revalidated with If-Modified-Since on every load
+  - after: the cached, brotli/gzip index revalidated by ETag, hashed
+    /assets/ URLs fetched once and then served from the browser cache
+Also reports the median server time for GET / (template render vs cached page).
+"""
+import argparse
+import re
+import shutil
+import statistics
+import tempfile
+import time
+
+from flask import render_template
+
+from benchmarks.bench_api_micro import load_app
+from benchmarks.results import write_results
+from compression import supported_encodings
+from static_assets import build_assets
+
+ASSET_RE = re.compile(r'(?:href|src)="(/(?:static|assets)/[^"]+)"')
+
+
+def median_us(func, repeat=7, number=200):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return round(statistics.median(timings) * 1e6, 1)
+
+
+def fetch(client, url, headers):
+    response = client.get(url, headers=headers)
+    body = response.get_data()
+    response.close()
+    return response, len(body)
+
+
+def asset_urls(app):
+    with app.test_request_context('/'):
+        return ASSET_RE.findall(render_template('index.html'))
+
+
+def page_load(client, headers, urls, cache, index_bytes=None):
+    """
+    Loads / and the asset `urls` like a browser; `cache` holds the validators
+    from earlier loads. Returns {"requests", "bytes"} (response bodies).
+    `index_bytes` stands in for the old index route, which re-rendered the
+    page in full on every request.
+    """
+    requests = 1
+    if index_bytes is not None:
+        total = index_bytes
+    else:
+        index_headers = dict(headers)
+        if '/' in cache:
+            index_headers['If-None-Match'] = cache['/']
+        response, total = fetch(client, '/', index_headers)
+        if response.headers.get('ETag'):
+            cache['/'] = response.headers['ETag']
+    for url in urls:
+        if cache.get(url) == 'immutable':
+            continue  # Fresh in the browser cache, no request at all
+        asset_headers = dict(headers)
+        if url in cache:
+            asset_headers['If-Modified-Since'] = cache[url]
+        response, size = fetch(client, url, asset_headers)
+        requests += 1
+        total += size
+        if response.cache_control.immutable:
+            cache[url] = 'immutable'
+        elif response.headers.get('Last-Modified'):
+            cache[url] = response.headers['Last-Modified']
+    return {"requests": requests, "bytes": total}
+
+
+def run(repeat=7):
+    quicknote = load_app(0)
+    app, assets = quicknote.app, quicknote.assets
+    client = app.test_client()
+    original_build_dir = assets.build_dir
+    build_dir = tempfile.mkdtemp(prefix='assets-bench-')
+    results = {}
+    try:
+        # Before: no build, no compression, template rendered each time
+        assets.load(build_dir)  # Empty directory: plain /static/ URLs
+        with app.test_request_context('/'):
+            results["render_template_us"] = median_us(lambda: render_template('index.html'), repeat)
+            index_bytes = len(render_template('index.html').encode('utf-8'))
+        urls, cache = asset_urls(app), {}
+        results["before"] = {"first_load": page_load(client, {}, urls, cache, index_bytes),
+                             "repeat_load": page_load(client, {}, urls, cache, index_bytes)}
+
+        build_assets(app.static_folder, build_dir)
+        assets.load(build_dir)
+        headers = {'Accept-Encoding': ', '.join(supported_encodings())}
+        with app.test_request_context('/', headers=headers):
+            results["cached_page_us"] = median_us(lambda: assets.page('index.html'), repeat)
+        urls, cache = asset_urls(app), {}
+        results["after"] = {"first_load": page_load(client, headers, urls, cache),
+                            "repeat_load": page_load(client, headers, urls, cache)}
+    finally:
+        assets.load(original_build_dir)
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run()
+    print(f"GET / server time: render_template {results['render_template_us']} us, "
+          f"cached page {results['cached_page_us']} us")
+    print(f"\n{'':<8} {'first load':>22} {'repeat load':>22}")
+    for name in ('before', 'after'):
+        first, again = results[name]['first_load'], results[name]['repeat_load']
+        print(f"{name:<8} {first['requests']:>4} req {first['bytes']:>9} B    "
+              f"{again['requests']:>4} req {again['bytes']:>9} B")
+    if args.json:
+        write_results(args.json, {"page_load": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Write throughput and lock waits against thread count, one shared note store vs per-user partitions.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_partitioned_store [--tenants 1000] [--writes 400] [--threads 1 2 4 8]
+        [--content-chars 4000] [--backend log] [--dir /path/on/disk] [--json results.json]
+
+Every thread makes --writes writes for random users out of --tenants, the
+way POST /api/notes and the premium upgrade do: add the note with the
+per-user limit of 5 and evict the oldest note when the user is at the limit.
+  - shared: one store (and one lock) for everybody, as before partitioning
+  - partitioned: a PartitionedNoteStore with a store per user
+The log backend appends and fsyncs every write while holding the store's
+lock, so with one shared store every writer queues behind the fsync of the
+one before it. Reports writes per second, the speedup over one thread, and
+the time spent waiting for store locks: per write, and as a share of the
+threads' time. The fsync time, and so the effect of partitioning, depends
+on the disk --dir is on (default: the system temp dir); the memory backend
+shows the cost of the partition lookup itself.
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.results import write_results
+from note_store import PartitionedNoteStore, create_note_store
+
+NOTE_LIMIT = 5
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class TimedLock:
+    """A store lock that records how long each acquire waited."""
+
+    def __init__(self, lock, waits):
+        self._lock = lock
+        self._waits = waits
+
+    def __enter__(self):
+        started = time.perf_counter()
+        self._lock.acquire()
+        self._waits.append(time.perf_counter() - started)  # list.append is atomic
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+def timed(store, waits):
+    store._lock = TimedLock(store._lock, waits)
+    return store
+
+
+def write_notes(store_for, tenant_keys, writes, content, seed):
+    rng = random.Random(seed)
+    for i in range(writes):
+        store = store_for(rng.choice(tenant_keys))
+        note = {"id": str(uuid.uuid4()), "title": f"Note {seed}-{i}", "content": content,
+                "timestamp": (START + timedelta(seconds=seed * writes + i)).isoformat()}
+        if store.add(note, limit=NOTE_LIMIT) is None:
+            store.remove_oldest(min_count=NOTE_LIMIT)
+
+
+def measure(make_store_for, tenants, writes, content, thread_count, base_dir):
+    tenant_keys = [f"{n:032x}" for n in range(tenants)]
+    data_dir = tempfile.mkdtemp(prefix='notes-partitions-', dir=base_dir)
+    waits = []
+    try:
+        store_for = make_store_for(data_dir, waits)
+        for key in tenant_keys:
+            store_for(key)  # Open every partition up front; only the writes are timed
+        threads = [threading.Thread(target=write_notes, args=(store_for, tenant_keys, writes, content, seed))
+                   for seed in range(thread_count)]
+        waits.clear()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    total_writes = thread_count * writes
+    return {
+        "writes_per_s": round(total_writes / elapsed),
+        "lock_wait_us_per_write": round(sum(waits) / total_writes * 1e6, 1),
+        "lock_wait_share": round(sum(waits) / (thread_count * elapsed), 3),
+    }
+
+
+def run(tenants=1000, writes=400, thread_counts=(1, 2, 4, 8), content_chars=4000, backend='log', base_dir=None):
+    content = "<p>" + "bench " * (content_chars // 6) + "</p>"
+
+    def options(data_dir):
+        return {'data_dir': data_dir} if backend != 'memory' else {}
+
+    def shared(data_dir, waits):
+        store = timed(create_note_store(backend, **options(data_dir)), waits)
+        return lambda key: store
+
+    def partitioned(data_dir, waits):
+        stores = PartitionedNoteStore(
+            lambda key: timed(create_note_store(backend, partition=key, **options(data_dir)), waits))
+        return lambda key: stores.acquire(key, create=True)  # Never released; nothing is evicted
+
+    results = {"backend": backend, "tenants": tenants, "writes_per_thread": writes, "content_chars": content_chars}
+    for name, make_store_for in (('shared', shared), ('partitioned', partitioned)):
+        runs = {str(count): measure(make_store_for, tenants, writes, content, count, base_dir)
+                for count in thread_counts}
+        baseline = runs[str(thread_counts[0])]["writes_per_s"]
+        for result in runs.values():
+            result["speedup"] = round(result["writes_per_s"] / baseline, 2)
+        results[name] = runs
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--writes', type=int, default=400, help="writes per thread")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--content-chars', type=int, default=4000, help="size of each note's content")
+    parser.add_argument('--backend', choices=('log', 'memory'), default='log')
+    parser.add_argument('--dir', help="where to keep the stores' files (default: the system temp dir)")
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.tenants, args.writes, args.threads, args.content_chars, args.backend, args.dir)
+    print(f"{args.backend} backend, {args.tenants} users, {args.writes} writes per thread, "
+          f"{args.content_chars} characters per note")
+    print(f"{'':>8} {'shared':>36}   {'partitioned':>36}")
+    print((f"{'threads':>8}" + f" {'w/s':>8} {'speedup':>8} {'wait µs/w':>10} {'wait %':>7}  " * 2).rstrip())
+    for count in map(str, args.threads):
+        line = f"{count:>8}"
+        for name in ('shared', 'partitioned'):
+            result = results[name][count]
+            line += (f" {result['writes_per_s']:>8} {result['speedup']:>8} "
+                     f"{result['lock_wait_us_per_write']:>10} {result['lock_wait_share'] * 100:>6.1f}%  ")
+        print(line.rstrip())
+    if args.json:
+        write_results(args.json, {"partitioned_store": results})
+
+
+if __name__ == '__main__':
+    main()
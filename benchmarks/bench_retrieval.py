@@ -0,0 +1,163 @@
+"""
+Query latency of the hybrid BM25 + vector search index (retrieval.py) at a million chunks.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_retrieval [--chunks 1000000] [--queries 200] [--index-dir DIR] [--json results.json]
+
+Builds an index of --chunks synthetic chunks (about 40 words each from a
+Zipf-distributed vocabulary of 50,000 words, 4 sources, 8 teams) with the
+default feature-hashing embedder, unless --index-dir already holds one of
+that size. Reports the build time, the time to open the index, and p50/p95
+latency of BM25, vector and hybrid (fused, with the chunks read back)
+queries of 1-3 words for each kind of filter the Search page sends: Global
+or one team, all sources or one. Latencies are measured with the index in
+the OS page cache (after one warm-up pass). Also reports vector queries per
+second when 32 queries share each matrix product.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.results import write_results
+from retrieval import SOURCES, HybridIndex, build_index
+
+VOCABULARY_SIZE = 50000
+TEAMS = [f"Team {n}" for n in range(8)]
+POOL_SIZES = (20011, 19997)  # Coprime, so (pool a, pool b) pairs only repeat after 400M chunks
+WORDS_PER_PART = 20
+FILTERS = {
+    "global_all": (None, False),
+    "global_source": ('JIRA', False),
+    "team_all": (None, True),
+    "team_source": ('Confluence', True),
+}
+
+
+def make_words(rng):
+    # 2-5 of 12 syllables: ~271k possible words. Shuffled, so word rank isn't alphabetical
+    syllables = ['ka', 'lo', 'mi', 'ra', 'tu', 'ne', 'so', 'vi', 'de', 'pa', 'gu', 'xo']
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rng.choice(syllables, size=rng.integers(2, 6))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+class SyntheticCorpus:
+    """Chunk dicts made on demand from two pools of word runs, so a million chunks don't sit in memory."""
+
+    def __init__(self, count, seed=42):
+        rng = np.random.default_rng(seed)
+        self.count = count
+        self.words = make_words(rng)
+        self.pools = [[' '.join(self.zipf_words(rng, WORDS_PER_PART)) for _ in range(size)] for size in POOL_SIZES]
+
+    def zipf_words(self, rng, count):
+        ranks = np.minimum(rng.zipf(1.2, size=count), VOCABULARY_SIZE) - 1
+        return [self.words[rank] for rank in ranks]
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return map(self.__getitem__, range(self.count))
+
+    def __getitem__(self, n):
+        first, second = self.pools
+        return {
+            "id": f"chunk-{n}",
+            "source": SOURCES[n // len(TEAMS) % len(SOURCES)],
+            "team": TEAMS[n % len(TEAMS)],
+            "title": f"Chunk {n}",
+            "text": f"{first[n % len(first)]} {second[n % len(second)]}",
+            "url": f"https://example.com/chunks/{n}",
+        }
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return {"p50_ms": round(statistics.median(timings) * 1000, 2),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 2)}
+
+
+def run(chunk_count=1000000, query_count=200, index_dir=None, seed=7):
+    corpus = SyntheticCorpus(chunk_count)
+    temporary = index_dir is None
+    index_dir = index_dir or os.path.join(tempfile.mkdtemp(prefix='retrieval-bench-'), 'index')
+    results = {"chunks": chunk_count}
+    try:
+        existing = None
+        if os.path.exists(index_dir):
+            existing = HybridIndex(index_dir)
+        if existing is None or len(existing) != chunk_count:
+            started = time.perf_counter()
+            build_index(index_dir, corpus)
+            results["build_s"] = round(time.perf_counter() - started, 1)
+
+        started = time.perf_counter()
+        index = HybridIndex(index_dir)
+        results["open_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        results["index_mb"] = round(sum(entry.stat().st_size for entry in os.scandir(index_dir)) / 2 ** 20)
+
+        rng = np.random.default_rng(seed)
+        queries = [' '.join(corpus.zipf_words(rng, int(rng.integers(1, 4)))) for _ in range(query_count)]
+        teams = [TEAMS[int(n)] for n in rng.integers(0, len(TEAMS), size=query_count)]
+        for query in queries[:20]:  # Warm-up: page the index in
+            index.search(query)
+
+        for name, (source, per_team) in FILTERS.items():
+            timings = {"bm25": [], "vector": [], "hybrid": []}
+            for query, team in zip(queries, teams):
+                ranges = index.row_ranges(source, team if per_team else None)
+                started = time.perf_counter()
+                index.bm25_top_k(query, ranges, 100)
+                timings["bm25"].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                index.vector_top_k(index.embedder.embed([query]), ranges, 100)
+                timings["vector"].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                index.search(query, 10, source, team if per_team else None)
+                timings["hybrid"].append(time.perf_counter() - started)
+            results[name] = {kind: percentiles(values) for kind, values in timings.items()}
+
+        vectors = index.embedder.embed(queries[:32])
+        ranges = index.row_ranges()
+        started = time.perf_counter()
+        index.vector_top_k(vectors, ranges, 100)
+        results["vector_batch_32_qps"] = round(32 / (time.perf_counter() - started), 1)
+    finally:
+        if temporary:
+            shutil.rmtree(os.path.dirname(index_dir), ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chunks', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--index-dir', help="build the index here and keep it (reused when the size matches)")
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.chunks, args.queries, args.index_dir)
+    print(f"{args.chunks} chunks, {results['index_mb']} MB on disk"
+          + (f", built in {results['build_s']} s" if 'build_s' in results else '')
+          + f", opened in {results['open_ms']} ms")
+    print(f"\n{'':<15} {'bm25 p50/p95 ms':>18} {'vector p50/p95 ms':>20} {'hybrid p50/p95 ms':>20}")
+    for name in FILTERS:
+        row = results[name]
+        print(f"{name:<15} " + " ".join(f"{row[kind]['p50_ms']:>9}/{row[kind]['p95_ms']:<9}"
+                                        for kind in ('bm25', 'vector', 'hybrid')))
+    print(f"\nvector search, 32 queries per matrix product: {results['vector_batch_32_qps']} queries/s")
+    if args.json:
+        write_results(args.json, {"retrieval": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Query latency benchmark for the note search index (search_index.SearchIndex).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_search_index [--notes 100000] [--queries 2000]
+
+Builds an index over synthetic Quill notes whose words follow a Zipf
+distribution (a few very common words, a long tail of rare ones), then times
+top-10 queries by kind. Incremental add/remove cost is reported as well.
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from benchmarks.results import percentile
+from search_index import SearchIndex
+
+
+def make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))))
+    return sorted(words, key=lambda _: rng.random())
+
+
+def make_note(rng, vocabulary, weights, note_no):
+    words = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(20, 100))
+    title = ' '.join(words[:4]).title()
+    body = ''.join(f"<p>{' '.join(words[i:i + 12])}</p>" for i in range(0, len(words), 12))
+    return {"id": f"note-{note_no}", "title": title, "content": body, "timestamp": ""}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--vocabulary', type=int, default=50_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    cumulative, total = [], 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        cumulative.append(total)
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    for note_no in range(args.notes):
+        index.add(make_note(rng, vocabulary, cumulative, note_no))
+    build_seconds = time.perf_counter() - started
+
+    # Vocabulary ranks: head = the 100 most common words, tail = the rest
+    head, body, tail = vocabulary[:100], vocabulary[100:5000], vocabulary[5000:]
+    query_kinds = {
+        "1 rare term": lambda: rng.choice(tail),
+        "2 mid terms": lambda: f"{rng.choice(body)} {rng.choice(body)}",
+        "3 mixed terms": lambda: f"{rng.choice(head)} {rng.choice(body)} {rng.choice(tail)}",
+        "prefix (3 chars)": lambda: f"{rng.choice(body)} {rng.choice(body)[:3]}",
+        "1 common term": lambda: rng.choice(head),
+    }
+
+    print(f"indexed {len(index)} notes in {build_seconds:.1f} s "
+          f"({build_seconds / args.notes * 1e6:.0f} us per note)")
+    print(f"{'query':<18} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for kind, make_query in query_kinds.items():
+        timings = []
+        for _ in range(args.queries // len(query_kinds)):
+            query = make_query()
+            started = time.perf_counter()
+            index.search(query, k=10)
+            timings.append(time.perf_counter() - started)
+        ordered = sorted(timings)
+        print(f"{kind:<18} {percentile(ordered, 0.5) * 1e3:>9.3f} {percentile(ordered, 0.95) * 1e3:>9.3f} "
+              f"{percentile(ordered, 0.99) * 1e3:>9.3f}")
+
+    timings = []
+    for note_no in range(args.notes, args.notes + 1000):
+        note = make_note(rng, vocabulary, cumulative, note_no)
+        started = time.perf_counter()
+        index.add(note)
+        index.remove(f"note-{note_no - args.notes}")
+        timings.append(time.perf_counter() - started)
+    print(f"incremental add + remove: median {statistics.median(timings) * 1e6:.0f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Cold start and cards per second for the Teams Adaptive Card function (function_app.py).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_teams_cards [--cold-runs 7] [--json results.json]
+
+Needs azure-functions (in requirements.txt). Reports:
+  - cold start, median over --cold-runs fresh interpreters: importing
+    azure.functions (the Functions worker has done this before loading the
+    function), importing function_app on top of it, and the first request
+  - events per second for batches of 1, 10 and 100 doc_generator events,
+    sent as one request per event (the only option before batching) and as
+    one request per batch in "cards" and "digest" mode
+  - rendering one card from the template vs building the nested dict and
+    json.dumps-ing it, as the function did before
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import azure.functions as func
+
+import function_app
+from benchmarks.results import write_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLD_START_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import azure.functions as func
+sdk_loaded = time.perf_counter()
+import function_app
+app_loaded = time.perf_counter()
+request = func.HttpRequest('POST', '/api/teams', headers={}, params={}, body=b'{"repository_name": "r"}')
+function_app.main(request).get_body()
+served = time.perf_counter()
+print(json.dumps([sdk_loaded - started, app_loaded - sdk_loaded, served - app_loaded]))
+"""
+
+
+def make_event(n):
+    return {
+        "repository_name": "adhithyashivan/notes-app",
+        "commit_message": f"Update docs for module {n}",
+        "commit_url": f"https://github.com/adhithyashivan/notes-app/commit/{n:040x}",
+        "confluence_page_title": f"Module {n} reference",
+        "confluence_page_url": f"https://example.atlassian.net/wiki/spaces/DOC/pages/{100000 + n}",
+        "status": "Updated",
+    }
+
+
+def make_request(body, params=None):
+    return func.HttpRequest('POST', '/api/teams', headers={'Content-Type': 'application/json'},
+                            params=params or {}, body=json.dumps(body).encode('utf-8'))
+
+
+def dict_card(event):
+    # The card as the function built it before templates: a new nested dict per request
+    page_url = event.get('confluence_page_url', '#')
+    page_title = event.get('confluence_page_title', 'N/A')
+    return json.dumps({
+        "type": "AdaptiveCard",
+        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+        "version": "1.5",
+        "body": [
+            {"type": "TextBlock", "text": f"Confluence Documentation {event.get('status', 'Updated')}",
+             "weight": "Bolder", "size": "Medium"},
+            {"type": "FactSet", "facts": [
+                {"title": "Repository:", "value": event.get('repository_name', 'N/A')},
+                {"title": "Confluence Page:",
+                 "value": f"[{page_title}]({page_url})" if page_url != '#' else page_title},
+                {"title": "Commit:", "value": event.get('commit_message', 'N/A')},
+            ]},
+        ],
+        "actions": [
+            {"type": "Action.OpenUrl", "title": "View Commit", "url": event.get('commit_url', '#')},
+            {"type": "Action.OpenUrl", "title": "View Confluence Page", "url": page_url},
+        ],
+    })
+
+
+def cold_start(runs):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(json.loads(output))
+    sdk, app, first = (round(statistics.median(column) * 1000, 2) for column in zip(*timings))
+    return {"azure_functions_import_ms": sdk, "function_app_import_ms": app, "first_request_ms": first}
+
+
+def events_per_s(requests, events, repeat=5):
+    # Requests are built up front: each HttpRequest caches its parsed body
+    best = None
+    for _ in range(repeat):
+        batch = [make_request(*request) for request in requests]
+        started = time.perf_counter()
+        for request in batch:
+            function_app.main(request).get_body()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(events / best)
+
+
+def median_us(func_, number=2000, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func_()
+        timings.append((time.perf_counter() - started) / number)
+    return round(statistics.median(timings) * 1e6, 2)
+
+
+def run(cold_runs=7, batch_sizes=(1, 10, 100)):
+    results = {"cold_start": cold_start(cold_runs), "events_per_s": {}}
+    for size in batch_sizes:
+        events = [make_event(n) for n in range(size)]
+        results["events_per_s"][str(size)] = {
+            "request_per_event": events_per_s([(event,) for event in events], size),
+            "batch_cards": events_per_s([(events, {'mode': 'cards'})], size),
+            "batch_digest": events_per_s([(events,)], size),
+        }
+    event = make_event(0)
+    results["dict_card_us"] = median_us(lambda: dict_card(event))
+    results["template_card_us"] = median_us(lambda: function_app.event_card(event))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--cold-runs', type=int, default=7)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.cold_runs)
+    cold = results["cold_start"]
+    print(f"cold start: azure.functions {cold['azure_functions_import_ms']} ms, "
+          f"function_app {cold['function_app_import_ms']} ms, first request {cold['first_request_ms']} ms")
+    print(f"\n{'events/s':<10} {'request per event':>18} {'batch cards':>12} {'batch digest':>13}")
+    for size, row in results["events_per_s"].items():
+        print(f"{size:<10} {row['request_per_event']:>18} {row['batch_cards']:>12} {row['batch_digest']:>13}")
+    print(f"\none card: dict + json.dumps {results['dict_card_us']} us, template {results['template_card_us']} us")
+    if args.json:
+        write_results(args.json, {"teams_cards": results})
+
+
+if __name__ == '__main__':
+    main()
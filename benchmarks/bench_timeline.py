@@ -0,0 +1,156 @@
+"""
+Append time, load time and range plus aggregate query latency of the timeline event index (timeline_index.py) at 50M events.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_timeline [--events 50000000] [--queries 1000] [--json results.json]
+
+Appends --events events (5M per append_ids call, as a bulk ingest would)
+spread over three years and 1M CRs, JIRA issues, Confluence pages and
+Outlook threads, skewed so the busiest entity has about 1% of them, saves
+the index and reloads it from its memory-mapped files. Entities are picked
+per query the way events are spread, so busy ones come up more often.
+Reports p50/p95 latency over --queries of:
+  range: the events of an entity in a 90-day window (binary search + slice)
+  day_buckets / hour_buckets: the same window counted per day and source
+    (from the daily counts) and per 6 hours (from the events)
+  zoomed_out: the whole three years per week, for the entity and for the
+    busiest one, summed from the daily counts
+  linked: what a Timeline section does for an entity and 20 linked ones:
+    time span, weekly counts over the whole span and its latest 20 events
+before and after 10,000 single events are appended to the in-memory delta.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.results import write_results
+from timeline_index import DAY, TimelineIndex
+
+BATCH_EVENTS = 5000000
+ENTITIES = 1000000
+KINDS = ["CRs", "JIRA", "Confluence", "Outlook"]
+EVENT_NAMES = ["created", "updated", "commented", "status changed", "linked", "email sent"]
+START = 1640995200  # 2022-01-01
+SPAN_DAYS = 3 * 365
+WINDOW_DAYS = 90
+LINKED = 20
+
+
+def entity_picks(rng, count):
+    """Entity ids spread like the events: id n gets ((n + 1) / ENTITIES) ** (1/3) - (n / ENTITIES) ** (1/3)."""
+    return (ENTITIES * rng.random(count) ** 3).astype(np.int64)
+
+
+def add_events(timeline, rng, count, ids, sources, events):
+    entities = ids[entity_picks(rng, count)]
+    times = rng.integers(START, START + SPAN_DAYS * DAY, size=count)
+    timeline.append_ids(entities, times, rng.choice(sources, count), rng.choice(events, count))
+
+
+def percentiles(func, arguments):
+    timings = []
+    for argument in arguments:
+        started = time.perf_counter()
+        func(argument)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings) * 1000, 3),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 3)}
+
+
+def timeline_section(timeline, entities):
+    """The queries of show_timeline in timeline_view.py."""
+    first, last = timeline.time_span(entities)
+    start, end = first // DAY * DAY, (last // DAY + 1) * DAY
+    timeline.bucket_counts(entities, start, end, 7 * DAY)
+    return timeline.event_rows(entities, start, end, latest=20)
+
+
+def query_latencies(timeline, queries, busiest):
+    end = START + SPAN_DAYS * DAY
+    return {
+        "range": percentiles(lambda query: timeline.event_rows([query[0]], query[1], query[1] + WINDOW_DAYS * DAY),
+                             queries),
+        "day_buckets": percentiles(lambda query: timeline.bucket_counts([query[0]], query[1],
+                                                                        query[1] + WINDOW_DAYS * DAY, DAY), queries),
+        "hour_buckets": percentiles(lambda query: timeline.bucket_counts([query[0]], query[1],
+                                                                         query[1] + WINDOW_DAYS * DAY, 6 * 3600),
+                                    queries),
+        "zoomed_out": percentiles(lambda query: timeline.bucket_counts([query[0]], START, end, 7 * DAY), queries),
+        "zoomed_out_busiest": percentiles(lambda query: timeline.bucket_counts([busiest], START, end, 7 * DAY),
+                                          queries),
+        "linked": percentiles(lambda query: timeline_section(timeline, [query[0], *query[2]]), queries),
+    }
+
+
+def run(event_count=50000000, query_count=1000, seed=42):
+    rng = np.random.default_rng(seed)
+    timeline_dir = os.path.join(tempfile.mkdtemp(prefix='timeline-bench-'), 'timeline')
+    results = {"events": event_count}
+    try:
+        timeline = TimelineIndex(timeline_dir)
+        names = [f"{KINDS[n % len(KINDS)]}:{n}" for n in range(ENTITIES)]
+        ids = timeline.entity_ids(names, add=True)
+        sources, events = timeline.codes(KINDS, EVENT_NAMES)
+        append_s = 0.0
+        for start in range(0, event_count, BATCH_EVENTS):
+            started = time.perf_counter()
+            add_events(timeline, rng, min(BATCH_EVENTS, event_count - start), ids, sources, events)
+            append_s += time.perf_counter() - started
+        started = time.perf_counter()
+        timeline.save()
+        results["append_s"] = round(append_s, 1)
+        results["save_s"] = round(time.perf_counter() - started, 1)
+        results["events_per_s"] = round(event_count / append_s)
+        del timeline
+
+        started = time.perf_counter()
+        timeline = TimelineIndex(timeline_dir)
+        results["load_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        results["index_mb"] = round(sum(entry.stat().st_size for entry in os.scandir(timeline_dir)) / 2 ** 20)
+        busiest = int(ids[0])
+        results["busiest_entity_events"] = len(timeline.event_rows([busiest])[0])
+
+        picked = ids[entity_picks(rng, query_count * (LINKED + 1))].reshape(query_count, LINKED + 1).tolist()
+        window_starts = (START + rng.integers(0, SPAN_DAYS - WINDOW_DAYS, size=query_count) * DAY).tolist()
+        queries = [(entities[0], window_start, entities[1:]) for entities, window_start in zip(picked, window_starts)]
+        results["mean_window_events"] = round(float(np.mean(
+            [len(timeline.event_rows([entity], window_start, window_start + WINDOW_DAYS * DAY)[0])
+             for entity, window_start, _ in queries])), 1)
+        query_latencies(timeline, queries[:200], busiest)  # Warm-up: page the arrays in
+        results["saved"] = query_latencies(timeline, queries, busiest)
+        for _ in range(10000):
+            add_events(timeline, rng, 1, ids, sources, events)
+        results["with_delta"] = query_latencies(timeline, queries, busiest)
+    finally:
+        shutil.rmtree(os.path.dirname(timeline_dir), ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--events', type=int, default=50000000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.events, args.queries)
+    print(f"{args.events} events appended in {results['append_s']} s ({results['events_per_s']} events/s), "
+          f"saved in {results['save_s']} s: {results['index_mb']} MB on disk")
+    print(f"loaded in {results['load_ms']} ms; {results['mean_window_events']} events in a {WINDOW_DAYS}-day "
+          f"window on average, {results['busiest_entity_events']} for the busiest entity")
+    print(f"\n{'':<20} {'saved p50/p95 ms':>18} {'with delta p50/p95 ms':>24}")
+    for name, row in results["saved"].items():
+        delta = results["with_delta"][name]
+        print(f"{name:<20} {row['p50_ms']:>9}/{row['p95_ms']:<8} {delta['p50_ms']:>12}/{delta['p95_ms']:<8}")
+    if args.json:
+        write_results(args.json, {"timeline": results})
+
+
+if __name__ == '__main__':
+    main()
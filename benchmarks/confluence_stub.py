@@ -0,0 +1,233 @@
+"""
+Local stand-in for the parts of the Confluence REST API used by scripts/doc_generator.py.
+
+Usage (from the repo root):
+    python -m benchmarks.confluence_stub [--port 8090] [--connect-latency 0.03] [--latency 0.01]
+
+Keeps pages in memory and implements content lookup by title, CQL
+`ancestor = <id>` search with pagination, page create/update with version
+checks, archiving, and content properties (also set through
+metadata.properties on create). --connect-latency is paid once per new TCP connection to stand in
+for the TCP/TLS handshake, --latency on every request. It also counts
+connections and requests so benchmarks can compare clients.
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ANCESTOR_RE = re.compile(r'ancestor\s*=\s*(\d+)')
+
+
+class ConfluenceStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), connect_latency=0.03, latency=0.01):
+        super().__init__(address, StubHandler)
+        self.connect_latency = connect_latency
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.pages = {}  # id -> page dict
+        self.archived = {}
+        self._ids = itertools.count(1000)
+        self.reset_counters()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        self.connections = 0
+        self.requests = 0
+        self.writes = 0
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='confluence-stub', daemon=True).start()
+        return self
+
+    # --- Content model ---
+
+    def create(self, data):
+        with self.lock:
+            if any(p['title'] == data['title'] for p in self.pages.values()):
+                return 400, {"message": "A page with this title already exists"}
+            page_id = str(next(self._ids))
+            ancestors = []
+            if data.get('ancestors'):
+                parent = self.pages.get(str(data['ancestors'][-1]['id']))
+                if parent is None:
+                    return 400, {"message": "Parent page not found"}
+                ancestors = parent['ancestors'] + [parent['id']]
+            properties = data.get('metadata', {}).get('properties', {})
+            self.pages[page_id] = {
+                'id': page_id, 'title': data['title'], 'version': 1,
+                'body': data['body']['storage']['value'], 'ancestors': ancestors,
+                'properties': {key: {'value': prop['value'], 'version': 1} for key, prop in properties.items()},
+            }
+            return 200, self.render(self.pages[page_id], 'version')
+
+    def update(self, page_id, data):
+        with self.lock:
+            page = self.pages.get(page_id)
+            if page is None:
+                return 404, {"message": "Page not found"}
+            if data.get('version', {}).get('number') != page['version'] + 1:
+                return 409, {"message": "Version conflict"}
+            page['version'] += 1
+            page['title'] = data['title']
+            page['body'] = data['body']['storage']['value']
+            return 200, self.render(page, 'version')
+
+    def set_property(self, page_id, key, data, create):
+        with self.lock:
+            page = self.pages.get(page_id)
+            if page is None:
+                return 404, {"message": "Page not found"}
+            current = page['properties'].get(key)
+            if create and current is not None:
+                return 409, {"message": "Property already exists"}
+            if not create and (current is None or data.get('version', {}).get('number') != current['version'] + 1):
+                return 409, {"message": "Property version conflict"}
+            version = 1 if current is None else current['version'] + 1
+            page['properties'][key] = {'value': data['value'], 'version': version}
+            return 200, {'key': key, 'value': data['value'], 'version': {'number': version}}
+
+    def archive(self, page_ids):
+        with self.lock:
+            for page_id in page_ids:
+                if page_id not in self.pages:
+                    return 404, {"message": f"Page {page_id} not found"}
+            for page_id in page_ids:
+                self.archived[page_id] = self.pages.pop(page_id)
+            return 202, {"id": "archive-task", "links": {"status": "/rest/api/longtask/archive-task"}}
+
+    def render(self, page, expand=''):
+        content = {
+            'id': page['id'], 'type': 'page', 'title': page['title'],
+            '_links': {'webui': f"/spaces/DOCS/pages/{page['id']}"},
+        }
+        if 'version' in expand:
+            content['version'] = {'number': page['version']}
+        if 'body.storage' in expand:
+            content['body'] = {'storage': {'value': page['body'], 'representation': 'storage'}}
+        for key, prop in page['properties'].items():
+            if f'metadata.properties.{key}' in expand:
+                content.setdefault('metadata', {}).setdefault('properties', {})[key] = {
+                    'key': key, 'value': prop['value'], 'version': {'number': prop['version']}}
+        return content
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so pooled clients can reuse connections
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def _handle(self, method):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            if method != 'GET':
+                server.writes += 1
+        time.sleep(server.latency)
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        path = parts.path.rstrip('/').split('/')[1:]  # ['rest', 'api', 'content', ...]
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length)) if length else {}
+
+        status, body = 404, {"message": "Not found"}
+        if path[:3] == ['rest', 'api', 'content']:
+            rest = path[3:]
+            if method == 'GET' and not rest:
+                status, body = 200, self._by_title(query)
+            elif method == 'GET' and rest == ['search']:
+                status, body = 200, self._search(query)
+            elif method == 'GET' and len(rest) == 1:
+                status, body = self._page(rest[0], query)
+            elif method == 'GET' and len(rest) == 3 and rest[1] == 'property':
+                status, body = self._property(rest[0], rest[2])
+            elif method == 'POST' and rest == ['archive']:
+                status, body = server.archive([str(p['id']) for p in data.get('pages', [])])
+            elif method == 'POST' and not rest:
+                status, body = server.create(data)
+            elif method == 'PUT' and len(rest) == 1:
+                status, body = server.update(rest[0], data)
+            elif method == 'POST' and len(rest) == 2 and rest[1] == 'property':
+                status, body = server.set_property(rest[0], data.get('key'), data, create=True)
+            elif method == 'PUT' and len(rest) == 3 and rest[1] == 'property':
+                status, body = server.set_property(rest[0], rest[2], data, create=False)
+
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _page(self, page_id, query):
+        with self.server.lock:
+            page = self.server.pages.get(page_id)
+            if page is None:
+                return 404, {"message": "Page not found"}
+            return 200, self.server.render(page, query.get('expand', ''))
+
+    def _property(self, page_id, key):
+        with self.server.lock:
+            prop = self.server.pages.get(page_id, {}).get('properties', {}).get(key)
+            if prop is None:
+                return 404, {"message": "Property not found"}
+            return 200, {'key': key, 'value': prop['value'], 'version': {'number': prop['version']}}
+
+    def _by_title(self, query):
+        with self.server.lock:
+            matches = [self.server.render(p, query.get('expand', ''))
+                       for p in self.server.pages.values() if p['title'] == query.get('title')]
+        return {'results': matches[:int(query.get('limit', 25))], 'size': len(matches[:1])}
+
+    def _search(self, query):
+        match = ANCESTOR_RE.search(query.get('cql', ''))
+        start, limit = int(query.get('start', 0)), int(query.get('limit', 25))
+        with self.server.lock:
+            pages = [p for p in self.server.pages.values() if match and match.group(1) in p['ancestors']]
+            results = [self.server.render(p, query.get('expand', '')) for p in pages[start:start + limit]]
+        body = {'results': results, 'start': start, 'limit': limit, 'size': len(results), '_links': {}}
+        if start + limit < len(pages):
+            body['_links']['next'] = f"/rest/api/content/search?start={start + limit}"
+        return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--connect-latency', type=float, default=0.03)
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args()
+    server = ConfluenceStub(('127.0.0.1', args.port), args.connect_latency, args.latency)
+    print(f"Confluence stub listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
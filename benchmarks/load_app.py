@@ -0,0 +1,149 @@
+"""
+In-process HTTP load generator for the QuickNote API.
+
+Usage (from the repo root):
+    python -m benchmarks.load_app [--clients 8] [--duration 10] [--mix get=70,post=20,upgrade=10] [--json results.json]
+
+Serves `app` on a local port with werkzeug's threaded server and runs
+--clients keep-alive HTTP clients for --duration seconds, each acting as its
+own user (note partition) and picking requests by the --mix weights:
+  get      GET /api/notes (every other one paginated with ?limit=10)
+  post     POST /api/notes
+  upgrade  POST /api/notes/premium-upgrade
+Reports requests per second and p50/p95/p99 latency per request type and
+overall. Uses the store selected by NOTES_STORE_BACKEND in a temporary
+data directory; --max-notes raises MAX_NOTES so posts aren't mostly 403s.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.results import percentile, write_results
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {'get', 'post', 'upgrade'}
+    if unknown:
+        raise SystemExit(f"Unknown request types in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def client_loop(port, mix, deadline, seed, cookie, latencies, statuses):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    request_no = 0
+    while time.perf_counter() < deadline:
+        kind = rng.choices(names, weights)[0]
+        request_no += 1
+        if kind == 'get':
+            method, path, body = 'GET', '/api/notes' + ('?limit=10' if request_no % 2 else ''), None
+        elif kind == 'post':
+            method, path = 'POST', '/api/notes'
+            body = json.dumps({"title": f"Load {seed}-{request_no}", "content": f"<p>Load test note {request_no}</p>"})
+        else:
+            method, path, body = 'POST', '/api/notes/premium-upgrade', None
+        headers = {'Content-Type': 'application/json', 'Cookie': cookie} if body else {'Cookie': cookie}
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            status = 'error'
+        latencies[kind].append(time.perf_counter() - started)
+        statuses[f"{kind} {status}"] += 1
+    connection.close()
+
+
+def summarize(samples, duration):
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / duration, 1),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3) if samples else None,
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3) if samples else None,
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3) if samples else None,
+    }
+
+
+def run(clients=8, duration=10.0, mix=None, max_notes=1000, seed=1):
+    mix = mix or {'get': 70, 'post': 20, 'upgrade': 10}
+    os.environ.setdefault('NOTES_DATA_DIR', tempfile.mkdtemp(prefix='quicknote-load-'))
+    from werkzeug.serving import make_server
+    import app as quicknote
+
+    quicknote.MAX_NOTES = max_notes
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No access log per request
+    server = make_server('127.0.0.1', 0, quicknote.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-server', daemon=True).start()
+
+    per_client = [(defaultdict(list), defaultdict(int)) for _ in range(clients)]
+    deadline = time.perf_counter() + duration
+    cookies = [f"{quicknote.USER_COOKIE}={random.Random(seed + n).getrandbits(128):032x}" for n in range(clients)]
+    threads = [threading.Thread(target=client_loop,
+                                args=(server.port, mix, deadline, seed + n, cookies[n], *per_client[n]))
+               for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies, statuses = defaultdict(list), defaultdict(int)
+    for client_latencies, client_statuses in per_client:
+        for kind, samples in client_latencies.items():
+            latencies[kind].extend(samples)
+        for key, count in client_statuses.items():
+            statuses[key] += count
+    results = {
+        "backend": os.getenv('NOTES_STORE_BACKEND', 'log'),
+        "clients": clients,
+        "duration_s": round(elapsed, 2),
+        "overall": summarize([s for samples in latencies.values() for s in samples], elapsed),
+        "statuses": dict(statuses),
+    }
+    for kind in mix:
+        results[kind] = summarize(latencies[kind], elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--mix', default='get=70,post=20,upgrade=10')
+    parser.add_argument('--max-notes', type=int, default=1000)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.clients, args.duration, parse_mix(args.mix), args.max_notes)
+    print(f"{results['clients']} clients, {results['duration_s']}s, backend {results['backend']}")
+    print(f"{'':<10} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for kind in ['overall'] + [k for k in ('get', 'post', 'upgrade') if k in results]:
+        row = results[kind]
+        print(f"{kind:<10} {row['requests']:>9} {row['rps']:>9} {row['p50_ms']!s:>9} "
+              f"{row['p95_ms']!s:>9} {row['p99_ms']!s:>9}")
+    print("statuses:", ", ".join(f"{key}: {count}" for key, count in sorted(results['statuses'].items())))
+    if args.json:
+        write_results(args.json, {"load": results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint used by scripts/doc_generator.py.
+
+Usage (from the repo root):
+    python -m benchmarks.openai_stub [--port 8091] [--latency 0.5] [--rate-limit-every 0]
+
+Answers POST /v1/chat/completions after --latency seconds with Markdown in
+the shape the prompt asks for (the first **Section:** line of the requested
+format plus a Purpose line), so the generator's merging runs as usual. Every
+--rate-limit-every'th request gets a 429 with Retry-After instead. Point the
+openai client at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECTION_RE = re.compile(r'(\*\*(?:File Overview|Function|Class|Method):\*\*[^\n]*)')
+
+
+class OpenAIStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.5, rate_limit_every=0, retry_after=1):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.reset_counters()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def reset_counters(self):
+        self.requests = 0
+        self.rate_limited = 0
+        self.prompt_chars = 0
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='openai-stub', daemon=True).start()
+        return self
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length)) if length else {}
+        prompt = request.get('messages', [{}])[-1].get('content', '')
+        with server.lock:
+            server.requests += 1
+            server.prompt_chars += sum(len(m.get('content', '')) for m in request.get('messages', []))
+            limited = server.rate_limit_every and server.requests % server.rate_limit_every == 0
+            if limited:
+                server.rate_limited += 1
+        if limited:
+            self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        {'Retry-After': str(server.retry_after)})
+            return
+        time.sleep(server.latency)
+        match = SECTION_RE.search(prompt)
+        content = (match.group(1) if match else "**File Overview:**") + "\n**Purpose:** Generated by the stub."
+        self._reply(200, {
+            "id": f"chatcmpl-stub-{server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', 'stub'),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+    def _reply(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8091)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--rate-limit-every', type=int, default=0)
+    args = parser.parse_args()
+    server = OpenAIStub(('127.0.0.1', args.port), args.latency, args.rate_limit_every)
+    print(f"OpenAI stub listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Runs the benchmark suite (micro-benchmarks, HTTP load, doc generator end to end) and writes one JSON file.
+
+Usage (from the repo root):
+    python -m benchmarks.run_suite [--output bench-results/<commit>.json] [--compare OLD.json] [--quick]
+
+  micro             bench_api_micro: request helpers and GET /api/notes paths
+  json_transport    bench_json_transport: GET /api/notes encoding time and bytes on the wire
+  note_memory       bench_note_memory: memory held by the note store, dicts vs compact records
+  page_load         bench_page_load: bytes and requests for first and repeat page loads
+  bulk_import       bench_bulk_import: NDJSON import/export vs one POST per note
+  partitions        bench_partitioned_store: write throughput by thread count, shared vs per-user stores
+  load              load_app: mixed GET/POST/premium-upgrade traffic over HTTP
+  doc_generator_e2e bench_doc_generator_e2e: doc_generator.py against local stubs
+--skip drops parts (e.g. --skip doc_generator_e2e). --compare prints every
+numeric result next to the same one in an earlier results file, so runs on
+two commits can be compared directly.
+"""
+import argparse
+import os
+
+from benchmarks import (bench_api_micro, bench_bulk_import, bench_doc_generator_e2e, bench_json_transport,
+                        bench_note_memory, bench_page_load, bench_partitioned_store, load_app)
+from benchmarks.results import flatten, load_results, run_metadata, write_results
+
+PARTS = ('micro', 'json_transport', 'note_memory', 'page_load', 'bulk_import', 'partitions', 'load', 'doc_generator_e2e')
+
+
+def compare(old, new):
+    old_flat, new_flat = flatten(old['results']), flatten(new)
+    old_commit = (old.get('meta', {}).get('commit') or '?')[:12]
+    print(f"\n{'metric':<55} {old_commit:>12} {'this run':>12} {'change':>8}")
+    for name in sorted(set(old_flat) | set(new_flat)):
+        before, after = old_flat.get(name), new_flat.get(name)
+        change = f"{(after - before) / before:+.0%}" if before and after is not None else ''
+        print(f"{name:<55} {before if before is not None else '-':>12} "
+              f"{after if after is not None else '-':>12} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--output', help="results file (default: bench-results/<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--skip', nargs='*', default=[], choices=PARTS)
+    parser.add_argument('--quick', action='store_true', help="smaller sizes and shorter runs")
+    args = parser.parse_args()
+
+    results = {}
+    if 'micro' not in args.skip:
+        print("Running micro-benchmarks...")
+        results['micro'] = bench_api_micro.run(note_count=200 if args.quick else 1000)
+    if 'json_transport' not in args.skip:
+        print("Running JSON transport benchmark...")
+        results['json_transport'] = bench_json_transport.run(note_count=200 if args.quick else 1000)
+    if 'note_memory' not in args.skip:
+        print("Running note memory benchmark...")
+        results['note_memory'] = bench_note_memory.run(note_count=20000 if args.quick else 100000)
+    if 'page_load' not in args.skip:
+        print("Running page load benchmark...")
+        results['page_load'] = bench_page_load.run()
+    if 'bulk_import' not in args.skip:
+        print("Running bulk import benchmark...")
+        results['bulk_import'] = bench_bulk_import.run(note_count=500 if args.quick else 2000)
+    if 'partitions' not in args.skip:
+        print("Running partitioned store benchmark...")
+        results['partitions'] = bench_partitioned_store.run(writes=100 if args.quick else 400)
+    if 'load' not in args.skip:
+        print("Running HTTP load test...")
+        results['load'] = load_app.run(clients=4 if args.quick else 8, duration=3 if args.quick else 10)
+    if 'doc_generator_e2e' not in args.skip:
+        print("Running doc generator end to end...")
+        results['doc_generator_e2e'] = bench_doc_generator_e2e.run(files=10 if args.quick else 50)
+
+    output = args.output or os.path.join('bench-results', f"{(run_metadata()['commit'] or 'unknown')[:12]}.json")
+    write_results(output, results)
+    if args.compare:
+        compare(load_results(args.compare), results)
+
+
+if __name__ == '__main__':
+    main()
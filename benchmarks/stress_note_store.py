@@ -0,0 +1,127 @@
+"""
+Multi-process stress test for the shared (sqlite) note store.
+
+Usage (from the repo root):
+    python -m benchmarks.stress_note_store [--processes 8] [--requests 300] [--max-notes 5]
+
+Each process imports the Flask app on its own (like a gunicorn worker) and
+hammers POST /api/notes and POST /api/notes/premium-upgrade as the same user,
+so every process works on the same partition database. Afterwards the change
+log is replayed to check that:
+  - the number of stored notes never went above MAX_NOTES
+  - every eviction removed the oldest note stored at that moment
+  - every 201 / deleted=True response matches exactly one committed change
+  - the stored count matches what the responses add up to
+The full history must fit in the store's change log (10,000 changes).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+
+STRESS_USER = '5e' * 16  # Note partition every process writes to
+
+
+def worker(data_dir, requests, max_notes, seed):
+    os.environ['NOTES_STORE_BACKEND'] = 'sqlite'
+    os.environ['NOTES_DATA_DIR'] = data_dir
+    import app as quicknote
+
+    quicknote.MAX_NOTES = max_notes
+    client = quicknote.app.test_client()
+    client.set_cookie(quicknote.USER_COOKIE, STRESS_USER)
+    rng = random.Random(seed)
+    outcome = Counter()
+    for request_no in range(requests):
+        if rng.random() < 0.6:
+            response = client.post('/api/notes', json={
+                "title": f"Stress {seed}-{request_no}", "content": "<p>stress</p>"})
+            outcome[f"POST {response.status_code}"] += 1
+        else:
+            response = client.post('/api/notes/premium-upgrade')
+            outcome[f"upgrade {response.status_code}"] += 1
+            if response.status_code == 200 and response.get_json()['deleted']:
+                outcome["evicted"] += 1
+    return outcome
+
+
+def check_invariants(data_dir, outcome, max_notes):
+    db = sqlite3.connect(os.path.join(data_dir, 'users', STRESS_USER, 'notes.sqlite3'))
+    changes = db.execute("SELECT seq, op, note_id, note FROM changes ORDER BY seq").fetchall()
+    notes = {row[0]: row[1] for row in db.execute("SELECT id, timestamp FROM notes")}
+    stored_count = db.execute("SELECT value FROM meta WHERE key = 'note_count'").fetchone()[0]
+
+    if changes and changes[0][0] != 1:
+        return ["the change log was trimmed; use fewer requests to check the full history"], None
+
+    problems = []
+    live = {}
+    peak = 0
+    for seq, op, note_id, note in changes:
+        if op == 'add':
+            live[note_id] = json.loads(note)['timestamp']
+            peak = max(peak, len(live))
+        else:
+            oldest = min(live.items(), key=lambda item: (item[1], item[0]))[0]
+            if note_id != oldest:
+                problems.append(f"change {seq}: evicted {note_id} but the oldest was {oldest}")
+            del live[note_id]
+
+    adds = sum(1 for change in changes if change[1] == 'add')
+    deletes = len(changes) - adds
+    if peak > max_notes:
+        problems.append(f"{peak} notes were stored at once (limit {max_notes})")
+    if live != notes:
+        problems.append("replaying the change log does not give the stored notes")
+    if adds != outcome["POST 201"]:
+        problems.append(f"{outcome['POST 201']} notes acknowledged but {adds} committed")
+    if deletes != outcome["evicted"]:
+        problems.append(f"{outcome['evicted']} evictions acknowledged but {deletes} committed")
+    if stored_count != len(notes) or len(notes) != adds - deletes:
+        problems.append(f"note count {stored_count}, rows {len(notes)}, adds - deletes {adds - deletes}")
+    for key in outcome:
+        if key.endswith(' 500'):
+            problems.append(f"{outcome[key]} x {key}")
+    return problems, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=300, help="requests per process")
+    parser.add_argument('--max-notes', type=int, default=5)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='notes-stress-')
+    try:
+        started = time.perf_counter()
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            results = pool.starmap(worker, [
+                (data_dir, args.requests, args.max_notes, seed) for seed in range(args.processes)])
+        elapsed = time.perf_counter() - started
+
+        outcome = sum(results, Counter())
+        problems, peak = check_invariants(data_dir, outcome, args.max_notes)
+        total = args.processes * args.requests
+        print(f"{total} requests from {args.processes} processes in {elapsed:.1f} s ({total / elapsed:.0f} req/s)")
+        for key, count in sorted(outcome.items()):
+            print(f"  {key:<14} {count}")
+        print(f"peak notes stored: {peak} (limit {args.max_notes})")
+        if problems:
+            print("FAILED:")
+            for problem in problems:
+                print(f"  - {problem}")
+            raise SystemExit(1)
+        print("all invariants hold")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Multi-thread stress test for opening and closing note partitions under a small open-file limit.
+
+Usage (from the repo root):
+    python -m benchmarks.stress_partitions [--backend sqlite] [--threads 8] [--users 400] [--requests 400] [--fd-limit 256]
+
+Lowers this process's open-file limit to --fd-limit, imports the Flask app
+(which sizes its open-partition cap from that limit) and has every thread
+send --requests requests as random users out of --users, far more than fit
+open at once: adding notes, listing, searching, exporting and fetching
+changes. Afterwards it checks that:
+  - no request failed (a 500, or an error such as EMFILE "too many open files")
+  - open partitions never went above the cap, plus one per thread in flight
+  - open files stayed below the limit
+  - every user's stored notes are the ones their 201 responses acknowledged
+Linux only (open files are counted in /proc/self/fd).
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+def open_files():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def worker(quicknote, user_keys, requests, seed, outcome, acknowledged, failures, lock):
+    rng = random.Random(seed)
+    clients = {}
+    for request_no in range(requests):
+        user_key = rng.choice(user_keys)
+        client = clients.get(user_key)
+        if client is None:
+            client = clients[user_key] = quicknote.app.test_client()
+            client.set_cookie(quicknote.USER_COOKIE, user_key)
+        action = rng.choice(('add', 'add', 'list', 'search', 'export', 'changes'))
+        try:
+            if action == 'add':
+                title = f"Stress {seed}-{request_no}"
+                response = client.post('/api/notes', json={"title": title, "content": "<p>stress note</p>"})
+                if response.status_code == 201:
+                    with lock:
+                        acknowledged[user_key].add(title)
+            elif action == 'list':
+                response = client.get('/api/notes')
+            elif action == 'search':
+                response = client.get('/api/notes/search?q=stress')
+            elif action == 'export':
+                response = client.get('/api/notes/export')
+                response.get_data()  # Stream the body, then close it
+                response.close()
+            else:
+                response = client.get('/api/notes/changes?since=0&generation=x')
+            with lock:
+                outcome[f"{action} {response.status_code}"] += 1
+        except Exception as e:
+            with lock:
+                failures.append(f"{action} for {user_key}: {e!r}")
+
+
+def run(backend='sqlite', threads=8, users=400, requests=400, fd_limit=256):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (fd_limit, hard))
+    data_dir = tempfile.mkdtemp(prefix='notes-partitions-stress-')
+    os.environ.update(NOTES_STORE_BACKEND=backend, NOTES_DATA_DIR=data_dir)
+    import app as quicknote
+
+    user_keys = [f"{n:032x}" for n in range(users)]
+    outcome, acknowledged, failures, lock = Counter(), defaultdict(set), [], threading.Lock()
+    peaks = {"partitions": 0, "files": 0}
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peaks["partitions"] = max(peaks["partitions"], len(quicknote.search_indexes))
+            peaks["files"] = max(peaks["files"], open_files())
+            time.sleep(0.005)
+
+    sampler = threading.Thread(target=sample)
+    workers = [threading.Thread(target=worker, args=(quicknote, user_keys, requests, seed,
+                                                     outcome, acknowledged, failures, lock))
+               for seed in range(threads)]
+    try:
+        started = time.perf_counter()
+        sampler.start()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        sampler.join()
+
+        problems = list(failures[:20])
+        for key, count in outcome.items():
+            if key.endswith(' 500'):
+                problems.append(f"{count} x {key}")
+        max_open = quicknote.note_stores._shard_max * len(quicknote.note_stores._shards)
+        if peaks["partitions"] > max_open + threads:
+            problems.append(f"{peaks['partitions']} partitions open at once (cap {max_open})")
+        if peaks["files"] >= fd_limit:
+            problems.append(f"{peaks['files']} files open at once (limit {fd_limit})")
+        for user_key in user_keys:
+            client = quicknote.app.test_client()
+            client.set_cookie(quicknote.USER_COOKIE, user_key)
+            stored = {note['title'] for note in client.get('/api/notes').get_json()}
+            if stored != acknowledged[user_key]:
+                problems.append(f"user {user_key}: stored {sorted(stored)}, "
+                                f"acknowledged {sorted(acknowledged[user_key])}")
+        return {"elapsed": elapsed, "outcome": outcome, "max_open": max_open, "peaks": peaks,
+                "problems": problems}
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backend', choices=('log', 'sqlite'), default='sqlite')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=400)
+    parser.add_argument('--requests', type=int, default=400, help="requests per thread")
+    parser.add_argument('--fd-limit', type=int, default=256, help="open-file limit to run under")
+    args = parser.parse_args()
+
+    result = run(args.backend, args.threads, args.users, args.requests, args.fd_limit)
+    total = args.threads * args.requests
+    print(f"{total} requests from {args.threads} threads for {args.users} users in {result['elapsed']:.1f} s, "
+          f"{args.backend} backend, open-file limit {args.fd_limit}")
+    for key, count in sorted(result['outcome'].items()):
+        print(f"  {key:<14} {count}")
+    print(f"peak open partitions: {result['peaks']['partitions']} (cap {result['max_open']})")
+    print(f"peak open files: {result['peaks']['files']} (limit {args.fd_limit})")
+    if result['problems']:
+        print("FAILED:")
+        for problem in result['problems']:
+            print(f"  - {problem}")
+        raise SystemExit(1)
+    print("all invariants hold")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import json
+import queue
+import threading
+
+
+def format_sse(event, data, event_id=None):
+    """Encode one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+# Sent instead of the missed events when a subscriber's queue overflowed
+RESYNC_MESSAGE = format_sse("resync", {})
+HEARTBEAT_MESSAGE = ": keepalive\n\n"
+
+
+class Subscription:
+    """One connected client. Holds at most `max_pending` undelivered messages."""
+
+    def __init__(self, feed, max_pending, topic=None):
+        self._feed = feed
+        self.topic = topic
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._overflowed = False
+
+    def offer(self, message):
+        # Called by writers; never blocks. A full queue means the client is
+        # too slow, so its backlog is dropped and it is told to resync.
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._overflowed = True
+
+    def messages(self, heartbeat=15.0):
+        """Yield messages as they arrive, with a keepalive comment when idle."""
+        while True:
+            if self._overflowed:
+                self._drain()
+                self._overflowed = False
+                yield RESYNC_MESSAGE
+                continue
+            try:
+                yield self._queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield HEARTBEAT_MESSAGE
+
+    def close(self):
+        self._feed.unsubscribe(self)
+
+    def _drain(self):
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+class ChangeFeed:
+    """
+    In-process fan-out of note events to streaming clients.
+
+    publish() formats the message once and hands it to a dispatcher thread, so
+    writers pay O(1) no matter how many clients are connected. The dispatcher
+    offers it to every subscriber's bounded queue without ever blocking, so a
+    slow client can only lose its own backlog.
+
+    Subscribers and messages can have a topic (e.g. a user key); a message
+    only goes to the subscribers of its topic.
+    """
+
+    def __init__(self, max_pending=100, max_subscribers=5000):
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        # topic -> subscribers. The tuples are replaced (not mutated) on
+        # subscribe/unsubscribe so dispatch needs no lock.
+        self._subscribers = {}
+        self._count = 0
+        self._outbox = queue.SimpleQueue()
+        self._dispatcher = None
+
+    def __len__(self):
+        return self._count
+
+    def subscribe(self, topic=None):
+        """Returns a new Subscription, or None when the subscriber limit is reached."""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(self, self.max_pending, topic)
+            self._subscribers[topic] = self._subscribers.get(topic, ()) + (subscription,)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic, ())
+            remaining = tuple(s for s in subscribers if s is not subscription)
+            if len(remaining) == len(subscribers):
+                return
+            self._count -= 1
+            if remaining:
+                self._subscribers[subscription.topic] = remaining
+            else:
+                del self._subscribers[subscription.topic]
+
+    def publish(self, event, data, event_id=None, topic=None):
+        if topic not in self._subscribers:
+            return
+        self._outbox.put((topic, format_sse(event, data, event_id)))
+        if self._dispatcher is None:
+            self._start_dispatcher()
+
+    def _start_dispatcher(self):
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch, name='change-feed-dispatch', daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            topic, message = self._outbox.get()
+            for subscription in self._subscribers.get(topic, ()):
+                subscription.offer(message)
@@ -0,0 +1,84 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip is offered without it
+    brotli = None
+
+# Bodies smaller than this are sent as they are; compression wouldn't pay
+# for the extra CPU and headers
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4  # Higher qualities cost several times the CPU for a few percent smaller bodies
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+}
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding):
+    """Compresses a whole body with 'br' or 'gzip'."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Compresses an iterable of body chunks as they are produced."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        finish = compressor.flush
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        compressed = compressor.process(chunk) if encoding == 'br' else compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield finish()
+
+
+def compress_response(response):
+    """
+    Compresses `response` in place with the best encoding the client accepts
+    (quality values are honoured). Buffered bodies under MIN_COMPRESS_BYTES
+    are left alone; streamed bodies are compressed as they are sent. A strong
+    ETag becomes weak, as the bytes no longer match the identity body.
+    """
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.status_code in (204, 206, 304)
+            or response.status_code < 200):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_BYTES:
+            return response
+        response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def enable_compression(app):
+    """Compresses compressible responses of `app` for clients that accept it."""
+    app.after_request(compress_response)
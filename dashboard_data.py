@@ -0,0 +1,74 @@
+"""
+CR data behind the GraphRAG Team Dashboard: loaded once per version of the file and filtered with pandas.
+
+CRs come from a CSV or JSON Lines file (GRAPHRAG_CRS_PATH, default
+data/crs.jsonl) with the columns of COLUMNS; missing columns are left empty.
+Without a file the dashboard shows SAMPLE_CRS. "My Tasks" are the CRs whose
+Owner is GRAPHRAG_USER.
+"""
+import os
+
+import pandas as pd
+import streamlit as st
+
+CRS_PATH = os.environ.get('GRAPHRAG_CRS_PATH', os.path.join('data', 'crs.jsonl'))
+CURRENT_USER = os.environ.get('GRAPHRAG_USER')
+COLUMNS = ["ID", "Title", "Status", "Owner", "Scheduled Date", "Sprint", "Team"]
+CATEGORY_COLUMNS = ["Status", "Owner", "Sprint", "Team"]  # Few distinct values: compared as integer codes
+SORT_COLUMNS = ["Scheduled Date", "ID"]
+
+SAMPLE_CRS = [
+    {"ID": "CR-123", "Title": "Fix API", "Status": "In Review", "Owner": "Alice", "Scheduled Date": "2024-06-01",
+     "Sprint": "Sprint 1", "Team": "Team Alpha"},
+    {"ID": "CR-124", "Title": "Migrate DB", "Status": "Pending", "Owner": "Bob", "Scheduled Date": "2024-06-02",
+     "Sprint": "Sprint 1", "Team": "Team Alpha"},
+    {"ID": "CR-125", "Title": "Implement OAuth", "Status": "Approved", "Owner": "Charlie",
+     "Scheduled Date": "2024-06-03", "Sprint": "Sprint 1", "Team": "Team Alpha"},
+]
+
+
+def data_version(path):
+    """Changes whenever the CR file does (None: no file, the sample data is used)."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_crs(path, version):
+    """
+    Every CR, sorted by SORT_COLUMNS. Shared by all sessions and reruns
+    without copying, so callers must not modify it.
+    """
+    if version is None:
+        frame = pd.DataFrame(SAMPLE_CRS)
+    elif path.endswith('.csv'):
+        frame = pd.read_csv(path, dtype=str)
+    else:
+        frame = pd.read_json(path, lines=True, dtype=False)
+    frame = frame.reindex(columns=COLUMNS)
+    frame["Scheduled Date"] = pd.to_datetime(frame["Scheduled Date"], errors='coerce')
+    for column in CATEGORY_COLUMNS:
+        frame[column] = frame[column].astype('category')
+    return frame.sort_values(SORT_COLUMNS, ignore_index=True, na_position='last')
+
+
+def filter_options(frame, column):
+    """The values of a category column that appear in `frame`, sorted."""
+    return sorted(frame[column].cat.categories)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def filter_crs(path, version, sprint, team, owner=None):
+    """The CRs of `sprint` and `team` (None: any), and of `owner` if given, in the order of load_crs."""
+    frame = load_crs(path, version)
+    mask = pd.Series(True, index=frame.index)
+    for column, value in (("Sprint", sprint), ("Team", team), ("Owner", owner)):
+        if value is not None:
+            mask &= frame[column] == value
+    return frame[mask]
+
+
+def format_date(value):
+    return "—" if pd.isna(value) else value.strftime('%Y-%m-%d')
@@ -0,0 +1,452 @@
+"""
+Graph of the links between CRs, JIRA issues, Confluence pages and Outlook threads, for the GraphRAG Graph View and Linked Content panels.
+
+Nodes are named "<kind>:<key>" ("CRs:CR-123", "JIRA:PAY-42") and links are
+typed. Add links from a JSONL file of {"source", "target", "type"} records:
+    python entity_graph.py add links.jsonl [--graph-dir data/entity_graph]
+    python entity_graph.py show CRs:CR-123 [--hops 2] [--type implements]
+
+Names are interned to integer node ids and the links are compressed sparse
+rows: per-node offsets into neighbour and edge-type arrays, sorted by (type,
+neighbour) within a node. Every link is stored under both of its ends, so
+the graph is walked the same way from either side. A saved graph is a
+directory of .npy files opened with memory maps, so loading it takes
+milliseconds whatever its size; names are found by binary search over their
+sorted 64-bit hashes.
+
+Links added after loading go to a small in-memory delta that queries merge
+in; big batches, a full delta and `save` fold them into new CSR arrays.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_GRAPH_DIR = os.path.join('data', 'entity_graph')
+NODE_BITS = 28  # Node ids, edge types and neighbours are packed in one uint64 sort key when merging
+MAX_NODES = 1 << NODE_BITS
+MAX_CODES = 256  # Distinct edge types, and node kinds (both stored as uint8)
+DELTA_MAX_LINKS = 65536  # Links held in the delta before they are merged into the CSR arrays
+
+META_NAME = 'meta.json'
+ARRAY_NAMES = ('offsets', 'neighbours', 'edge_types', 'node_kinds', 'name_bytes', 'name_offsets', 'name_hashes',
+               'hash_nodes')
+
+
+def name_hash(name):
+    return int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def node_kind(name):
+    """"JIRA" for "JIRA:PAY-42"; "" for names without a kind."""
+    kind, separator, _ = name.partition(':')
+    return kind if separator else ''
+
+
+def link_keys(nodes, edge_types, neighbours):
+    """Sort keys of (node, edge type, neighbour) entries: nodes, then types, then neighbours ascending."""
+    return ((nodes.astype(np.uint64) << np.uint64(NODE_BITS + 8))
+            | (edge_types.astype(np.uint64) << np.uint64(NODE_BITS))
+            | neighbours.astype(np.uint64))
+
+
+class EntityGraph:
+    """
+    The graph saved in `graph_dir` (empty if there is none yet), plus the
+    links added since. Queries may run from several threads; adding links
+    and saving take a lock.
+    """
+
+    def __init__(self, graph_dir=DEFAULT_GRAPH_DIR):
+        self.graph_dir = graph_dir
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.graph_dir, META_NAME)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = None
+        if meta:
+            # Plain ndarray views of the maps: np.memmap slices cost several times more
+            arrays = {name: np.asarray(np.load(os.path.join(self.graph_dir, f'{name}.npy'), mmap_mode='r'))
+                      for name in ARRAY_NAMES}
+        else:
+            meta = {"edge_types": [], "kinds": [], "saved_at": None}
+            arrays = {
+                'offsets': np.zeros(1, dtype=np.int64),
+                'neighbours': np.empty(0, dtype=np.int32),
+                'edge_types': np.empty(0, dtype=np.uint8),
+                'node_kinds': np.empty(0, dtype=np.uint8),
+                'name_bytes': np.empty(0, dtype=np.uint8),
+                'name_offsets': np.zeros(1, dtype=np.int64),
+                'name_hashes': np.empty(0, dtype=np.uint64),
+                'hash_nodes': np.empty(0, dtype=np.int32),
+            }
+        self.edge_types = meta['edge_types']  # Type code -> name
+        self.kinds = meta['kinds']  # Kind code -> name
+        self.saved_at = meta['saved_at']
+        self._type_codes = {name: code for code, name in enumerate(self.edge_types)}
+        self._kind_codes = {name: code for code, name in enumerate(self.kinds)}
+        self._csr = (arrays['offsets'], arrays['neighbours'], arrays['edge_types'])
+        self._node_kinds = arrays['node_kinds']
+        self._name_bytes, self._name_offsets = arrays['name_bytes'], arrays['name_offsets']
+        self._name_hashes, self._hash_nodes = arrays['name_hashes'], arrays['hash_nodes']
+        self._saved_nodes = len(self._hash_nodes)
+        self._new_names = []  # Names of the nodes added since loading, by id - _saved_nodes
+        self._new_ids = {}
+        self._delta = {}  # Node id -> [(edge type, neighbour)] of the links not merged yet
+        self._pending = []  # Sort keys of the same links, both directions
+        self._pending_count = 0
+
+    @property
+    def node_count(self):
+        return self._saved_nodes + len(self._new_names)
+
+    @property
+    def link_count(self):
+        # A link added again since the last merge counts twice until the merge
+        return (len(self._csr[1]) + self._pending_count * 2) // 2
+
+    # --- Adding ---
+
+    def add_links(self, links):
+        """
+        Adds `links`, (source name, target name, edge type name) triples.
+        Batches of DELTA_MAX_LINKS links or more (and the batch that fills
+        the delta) are merged into the CSR arrays straight away; adding a
+        link that is already there changes nothing.
+        """
+        links = list(links)
+        if not links:
+            return
+        with self._lock:
+            sources = self._intern([source for source, _, _ in links])
+            targets = self._intern([target for _, target, _ in links])
+            types = np.array([self._code(self._type_codes, self.edge_types, edge_type, 'edge types')
+                              for _, _, edge_type in links], dtype=np.uint8)
+            self._pending.append(np.concatenate([link_keys(sources, types, targets),
+                                                 link_keys(targets, types, sources)]))
+            self._pending_count += len(links)
+            if self._pending_count >= DELTA_MAX_LINKS:
+                self._merge()
+                return
+            delta = self._delta
+            for source, target, edge_type in zip(sources.tolist(), targets.tolist(), types.tolist()):
+                # New lists rather than appends, so a query never sees one half-updated
+                delta[source] = delta.get(source, []) + [(edge_type, target)]
+                delta[target] = delta.get(target, []) + [(edge_type, source)]
+
+    def _intern(self, names):
+        """Node ids of `names`, adding the names not seen before."""
+        ids = np.empty(len(names), dtype=np.int64)
+        hashes = np.fromiter(map(name_hash, names), dtype=np.uint64, count=len(names))
+        saved = np.zeros(len(names), dtype=bool)
+        if self._saved_nodes:
+            positions = np.minimum(np.searchsorted(self._name_hashes, hashes), self._saved_nodes - 1)
+            saved = self._name_hashes[positions] == hashes
+            ids[saved] = self._hash_nodes[positions[saved]]
+        new_kinds = []
+        for position in np.flatnonzero(~saved).tolist():
+            name = names[position]
+            node = self._new_ids.get(name)
+            if node is None:
+                node = self._saved_nodes + len(self._new_names)
+                if node >= MAX_NODES:
+                    raise ValueError(f"The graph can have at most {MAX_NODES} nodes")
+                self._new_ids[name] = node
+                self._new_names.append(name)
+                new_kinds.append(self._code(self._kind_codes, self.kinds, node_kind(name), 'node kinds'))
+            ids[position] = node
+        if new_kinds:
+            self._node_kinds = np.concatenate([self._node_kinds, np.array(new_kinds, dtype=np.uint8)])
+        return ids
+
+    @staticmethod
+    def _code(codes, names, name, what):
+        code = codes.get(name)
+        if code is None:
+            if len(names) == MAX_CODES:
+                raise ValueError(f"The graph can have at most {MAX_CODES} {what}")
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _merge(self):
+        """Folds the delta into new CSR arrays covering every node."""
+        offsets, neighbours, edge_types = self._csr
+        nodes = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        pending = np.sort(np.concatenate(self._pending))
+        # Two sorted runs: the stable sort (timsort) merges them in linear time
+        keys = np.sort(np.concatenate([link_keys(nodes, edge_types, neighbours), pending]), kind='stable')
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        nodes = (keys >> np.uint64(NODE_BITS + 8)).astype(np.int64)
+        offsets = np.zeros(self.node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=self.node_count), out=offsets[1:])
+        self._csr = (offsets, (keys & np.uint64(MAX_NODES - 1)).astype(np.int32),
+                     ((keys >> np.uint64(NODE_BITS)) & np.uint64(0xff)).astype(np.uint8))
+        self._delta = {}  # After the new arrays: a query in between sees links twice, never not at all
+        self._pending = []
+        self._pending_count = 0
+
+    def save(self):
+        """
+        Merges the delta and writes the graph to `graph_dir`, through a new
+        directory that replaces the old one, so processes that have the old
+        graph open keep reading it undisturbed.
+        """
+        with self._lock:
+            if self._pending:
+                self._merge()
+            new_names = [name.encode('utf-8') for name in self._new_names]
+            lengths = np.fromiter(map(len, new_names), dtype=np.int64, count=len(new_names))
+            new_offsets = self._name_offsets[-1] + np.cumsum(lengths)
+            hashes = np.concatenate([self._name_hashes,
+                                     np.fromiter(map(name_hash, self._new_names), dtype=np.uint64,
+                                                 count=len(new_names))])
+            hash_nodes = np.concatenate([self._hash_nodes, np.arange(self._saved_nodes, self.node_count,
+                                                                      dtype=np.int32)])
+            by_hash = np.argsort(hashes, kind='stable')
+            offsets, neighbours, edge_types = self._csr
+            arrays = {
+                'offsets': offsets,
+                'neighbours': neighbours,
+                'edge_types': edge_types,
+                'node_kinds': self._node_kinds,
+                'name_bytes': np.concatenate([self._name_bytes, np.frombuffer(b''.join(new_names), dtype=np.uint8)]),
+                'name_offsets': np.concatenate([self._name_offsets, new_offsets]),
+                'name_hashes': hashes[by_hash],
+                'hash_nodes': hash_nodes[by_hash],
+            }
+            if len(hashes) > 1 and (arrays['name_hashes'][1:] == arrays['name_hashes'][:-1]).any():
+                raise ValueError("Two node names have the same 64-bit hash")
+
+            build_dir = self.graph_dir.rstrip(os.sep) + '.building'
+            shutil.rmtree(build_dir, ignore_errors=True)
+            os.makedirs(build_dir)
+            for name, array in arrays.items():
+                np.save(os.path.join(build_dir, f'{name}.npy'), array)
+            with open(os.path.join(build_dir, META_NAME), 'w') as f:
+                json.dump({"node_count": self.node_count, "link_count": self.link_count,
+                           "edge_types": self.edge_types, "kinds": self.kinds, "saved_at": time.time()}, f, indent=2)
+            old_dir = self.graph_dir.rstrip(os.sep) + '.old'
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(self.graph_dir):
+                os.replace(self.graph_dir, old_dir)
+            os.replace(build_dir, self.graph_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            self._load()
+
+    # --- Queries by node id ---
+
+    def node_id(self, name):
+        """The id of node `name`, or None."""
+        node = self._new_ids.get(name)
+        if node is None and self._saved_nodes:
+            wanted = np.uint64(name_hash(name))
+            position = int(np.searchsorted(self._name_hashes, wanted))
+            if position < self._saved_nodes and self._name_hashes[position] == wanted:
+                node = int(self._hash_nodes[position])
+        return node
+
+    def node_name(self, node):
+        if node >= self._saved_nodes:
+            return self._new_names[node - self._saved_nodes]
+        start, stop = int(self._name_offsets[node]), int(self._name_offsets[node + 1])
+        return self._name_bytes[start:stop].tobytes().decode('utf-8')
+
+    def type_codes(self, types):
+        """Codes of the edge type names in `types` (None: every type); unknown names match nothing."""
+        if types is None:
+            return None
+        return [self._type_codes[name] for name in types if name in self._type_codes]
+
+    def neighbour_ids(self, node, types=None):
+        """(neighbour ids, edge type codes) of node id `node`, sorted by (type, neighbour); `types` are type codes."""
+        delta = self._delta.get(node)  # Before the arrays: see _merge
+        offsets, neighbours, edge_types = self._csr
+        if node < len(offsets) - 1:
+            start, stop = int(offsets[node]), int(offsets[node + 1])
+            found, found_types = neighbours[start:stop], edge_types[start:stop]
+        else:
+            found, found_types = neighbours[:0], edge_types[:0]
+        if delta:
+            keys = np.unique(np.concatenate([
+                link_keys(np.zeros(len(found)), found_types, found),
+                link_keys(np.zeros(len(delta)), *np.array(delta, dtype=np.int64).T)]))
+            found = (keys & np.uint64(MAX_NODES - 1)).astype(np.int32)
+            found_types = (keys >> np.uint64(NODE_BITS)).astype(np.uint8)
+        if types is None or not len(found):
+            return found, found_types
+        if not types:
+            return found[:0], found_types[:0]
+        # Sorted by type, so each wanted type is one slice
+        parts = []
+        for code in sorted(types):
+            first, last = np.searchsorted(found_types, (code, code + 1))
+            parts.append(slice(first, last))
+        if len(parts) == 1:
+            return found[parts[0]], found_types[parts[0]]
+        return np.concatenate([found[part] for part in parts]), np.concatenate([found_types[part] for part in parts])
+
+    def expand_ids(self, node, hops=2, types=None):
+        """
+        (ids, distances) of every node within `hops` links of node id `node`,
+        itself excluded, following only links of the type codes `types`.
+        Ids are ascending within each distance.
+        """
+        delta = self._delta  # Before the arrays: see _merge
+        csr = self._csr
+        allowed = self._allowed(types)
+        visited = frontier = np.array([node], dtype=np.int64)
+        found, distances = [], []
+        for distance in range(1, hops + 1):
+            reached = np.unique(self._gather(frontier, allowed, delta, csr)[1])
+            positions = np.minimum(np.searchsorted(visited, reached), len(visited) - 1)
+            frontier = reached[visited[positions] != reached]
+            if not len(frontier):
+                break
+            found.append(frontier)
+            distances.append(np.full(len(frontier), distance))
+            visited = np.sort(np.concatenate([visited, frontier]))
+        if not found:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(found), np.concatenate(distances)
+
+    def _allowed(self, types):
+        """Lookup table of the type codes `types` (None: every type allowed)."""
+        if types is None:
+            return None
+        allowed = np.zeros(MAX_CODES, dtype=bool)
+        allowed[list(types)] = True
+        return allowed
+
+    @staticmethod
+    def _gather(nodes, allowed, delta, csr):
+        """(node, neighbour, edge type) arrays of every link of the ids `nodes` whose type is `allowed`."""
+        offsets, neighbours, edge_types = csr
+        stored = nodes[nodes < len(offsets) - 1]
+        starts, stops = offsets[stored], offsets[stored + 1]
+        lengths = stops - starts
+        # Positions of all their stored links, in one gather
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        links = [np.repeat(stored, lengths), neighbours[positions].astype(np.int64), edge_types[positions]]
+        if delta:
+            extra = [(node, neighbour, edge_type) for node in nodes.tolist()
+                     for edge_type, neighbour in delta.get(node, ())]
+            if extra:
+                links = [np.concatenate([part, added]) for part, added in zip(links, np.array(extra).T)]
+        if allowed is not None:
+            keep = allowed[links[2]]
+            links = [part[keep] for part in links]
+        return links
+
+    # --- Queries by name ---
+
+    def neighbours(self, name, types=None, kinds=None):
+        """[(neighbour name, edge type)] of node `name`, sorted by type; `kinds` limits the neighbours' kinds."""
+        node = self.node_id(name)
+        if node is None:
+            return []
+        found, found_types = self.neighbour_ids(node, self.type_codes(types))
+        mask = self._kind_mask(found, kinds)
+        found, found_types = found[mask], found_types[mask]
+        return [(self.node_name(neighbour), self.edge_types[code])
+                for neighbour, code in zip(found.tolist(), found_types.tolist())]
+
+    def neighbourhood(self, name, hops=2, types=None, kinds=None):
+        """[(name, distance)] of the nodes within `hops` links of node `name`, nearest first."""
+        node = self.node_id(name)
+        if node is None:
+            return []
+        found, distances = self.expand_ids(node, hops, self.type_codes(types))
+        mask = self._kind_mask(found, kinds)
+        return [(self.node_name(other), distance)
+                for other, distance in zip(found[mask].tolist(), distances[mask].tolist())]
+
+    def subgraph(self, name, hops=2, types=None, max_nodes=100):
+        """
+        (nodes, links) around node `name` to draw: [(name, distance)] of it
+        and up to `max_nodes` - 1 of the nearest nodes within `hops` links,
+        and [(name, name, edge type)] of the links between them, each once.
+        """
+        node = self.node_id(name)
+        if node is None:
+            return [], []
+        delta, csr = self._delta, self._csr
+        codes = self.type_codes(types)
+        found, distances = self.expand_ids(node, hops, codes)
+        ids = np.concatenate([[node], found[:max_nodes - 1]])
+        nodes = [(self.node_name(other), distance)
+                 for other, distance in zip(ids.tolist(), [0] + distances[:max_nodes - 1].tolist())]
+        names = dict(zip(ids.tolist(), (name for name, _ in nodes)))
+        # Every link of the drawn nodes that ends at another one, from its lower id
+        sources, targets, link_types = self._gather(ids, self._allowed(codes), delta, csr)
+        members = np.sort(ids)
+        positions = np.minimum(np.searchsorted(members, targets), len(members) - 1)
+        inside = (members[positions] == targets) & (targets > sources)
+        keys = np.unique(link_keys(sources[inside], link_types[inside], targets[inside]))  # The delta may repeat links
+        sources = (keys >> np.uint64(NODE_BITS + 8)).tolist()
+        link_types = ((keys >> np.uint64(NODE_BITS)) & np.uint64(0xff)).tolist()
+        targets = (keys & np.uint64(MAX_NODES - 1)).tolist()
+        links = [(names[source], names[target], self.edge_types[code])
+                 for source, target, code in zip(sources, targets, link_types)]
+        return nodes, links
+
+    def _kind_mask(self, nodes, kinds):
+        if kinds is None:
+            return np.ones(len(nodes), dtype=bool)
+        codes = [self._kind_codes[kind] for kind in kinds if kind in self._kind_codes]
+        return np.isin(self._node_kinds[nodes], codes)
+
+
+def read_links(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['source'], record['target'], record.get('type', 'linked')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="add the links in a JSONL file")
+    add.add_argument('links')
+    add.add_argument('--graph-dir', default=DEFAULT_GRAPH_DIR)
+    show = commands.add_parser('show', help="print the neighbourhood of a node")
+    show.add_argument('node')
+    show.add_argument('--graph-dir', default=DEFAULT_GRAPH_DIR)
+    show.add_argument('--hops', type=int, default=1)
+    show.add_argument('--type', action='append', dest='types', help="only follow links of this type (repeatable)")
+    args = parser.parse_args()
+
+    graph = EntityGraph(args.graph_dir)
+    if args.command == 'add':
+        started = time.perf_counter()
+        before = graph.link_count
+        links = read_links(args.links)
+        while True:
+            batch = [link for _, link in zip(range(DELTA_MAX_LINKS), links)]
+            if not batch:
+                break
+            graph.add_links(batch)
+        graph.save()
+        print(f"Added {graph.link_count - before} links ({graph.link_count} links, {graph.node_count} nodes) "
+              f"to {args.graph_dir} in {time.perf_counter() - started:.1f} s")
+    elif args.hops == 1:
+        for name, edge_type in graph.neighbours(args.node, args.types):
+            print(f"{edge_type:<16} {name}")
+    else:
+        for name, distance in graph.neighbourhood(args.node, args.hops, args.types):
+            print(f"{distance}  {name}")
+
+
+if __name__ == '__main__':
+    main()
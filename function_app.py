@@ -1,82 +1,206 @@
-# __init__.py for Azure Function (e.g., FormatTeamsNotification)
-import logging
-import json
-import azure.functions as func
-
-
-def main(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info('Python HTTP trigger function processed a request.')
-
-    try:
-        req_body = req.get_json()
-    except ValueError:
-        logging.error("Invalid JSON in request body.  ")
-        req_body = None
-
-    if not req_body:
-        try:
-            # Fallback for form data if not JSON (less likely from Power Automate)
-            req_body = dict(req.form)
-        except Exception:  # Broad exception if req.form also fails
-            return func.HttpResponse(
-                "Please pass data in the request body (JSON or form data)",
-                status_code=400
-            )
-
-    repo_name = req_body.get('repository_name', 'N/A')
-    commit_message = req_body.get('commit_message', 'N/A')
-    commit_url = req_body.get('commit_url', '#')
-    confluence_page_title = req_body.get('confluence_page_title', 'N/A')
-    confluence_page_url = req_body.get('confluence_page_url', '#')
-    status = req_body.get('status', 'Updated')  # e.g., "Updated", "Created"
-
-    # --- Construct Adaptive Card JSON ---
-    # You can design more complex cards at: https://adaptivecards.io/designer/
-    adaptive_card_payload = {
-        "type": "AdaptiveCard",
-        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-        "version": "1.5",  # Use a recent version
-        "body": [
-            {
-                "type": "TextBlock",
-                "text": f"Confluence Documentation {status}",
-                "weight": "Bolder",
-                "size": "Medium"
-            },
-            {
-                "type": "FactSet",
-                "facts": [
-                    {
-                        "title": "Repository:",
-                        "value": repo_name
-                    },
-                    {
-                        "title": "Confluence Page:",
-                        "value": f"[{confluence_page_title}]({confluence_page_url})" if confluence_page_url != '#' else confluence_page_title
-                    },
-                    {
-                        "title": "Commit:",
-                        "value": commit_message
-                    }
-                ]
-            }
-        ],
-        "actions": [
-            {
-                "type": "Action.OpenUrl",
-                "title": "View Commit",
-                "url": commit_url
-            },
-            {
-                "type": "Action.OpenUrl",
-                "title": "View Confluence Page",
-                "url": confluence_page_url
-            }
-        ]
-    }
-
-    return func.HttpResponse(
-        body=json.dumps(adaptive_card_payload),
-        mimetype="application/json",
-        status_code=200
-    )
+# __init__.py for Azure Function (e.g., FormatTeamsNotification)
+#
+# Formats doc_generator updates as Teams Adaptive Cards. The body is either
+# one event (an object, answered with one card) or a batch: a JSON array of
+# events, or {"events": [...], "mode": ...}. A batch is answered with one
+# digest card listing every page (mode "digest", the default) or with a JSON
+# array of one card per event (mode "cards"); ?mode= works too.
+#
+# Cards are rendered from templates serialized once per worker, with only the
+# changing fields encoded per request. Keep module-level work cheap: it runs
+# on every cold start.
+import logging
+import json
+import azure.functions as func
+
+BATCH_MODES = ('digest', 'cards')
+MAX_BATCH_EVENTS = 500
+DIGEST_MAX_EVENTS = 50  # Teams rejects cards over ~28 KB; the rest are counted in a last line
+CARD_SCHEMA = "http://adaptivecards.io/schemas/adaptive-card.json"
+CARD_VERSION = "1.5"
+
+
+# --- Card Templates ---
+
+
+class JsonText(str):
+    """Slot value that is already JSON and is inserted as it is."""
+
+
+def slot(name):
+    # Placeholder value; the NUL characters can't come from the card itself
+    return f"\0{name}\0"
+
+
+class CardTemplate:
+    """
+    JSON text of a card with named slots (`slot(name)` values), serialized
+    once. `render` only encodes the slot values and joins them with the fixed
+    text in between.
+    """
+
+    def __init__(self, card):
+        parts = json.dumps(card, separators=(',', ':')).split('"\\u0000')
+        self._text = [parts[0]]
+        self._slots = []
+        for part in parts[1:]:
+            name, _, text = part.partition('\\u0000"')
+            self._slots.append(name)
+            self._text.append(text)
+
+    def render(self, **values):
+        out = [self._text[0]]
+        for name, text in zip(self._slots, self._text[1:]):
+            value = values[name]
+            out.append(value if isinstance(value, JsonText) else json.dumps(value))
+            out.append(text)
+        return ''.join(out)
+
+
+# You can design more complex cards at: https://adaptivecards.io/designer/
+EVENT_CARD = CardTemplate({
+    "type": "AdaptiveCard",
+    "$schema": CARD_SCHEMA,
+    "version": CARD_VERSION,
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": slot('heading'),
+            "weight": "Bolder",
+            "size": "Medium"
+        },
+        {
+            "type": "FactSet",
+            "facts": [
+                {"title": "Repository:", "value": slot('repository')},
+                {"title": "Confluence Page:", "value": slot('page')},
+                {"title": "Commit:", "value": slot('commit_message')}
+            ]
+        }
+    ],
+    "actions": [
+        {"type": "Action.OpenUrl", "title": "View Commit", "url": slot('commit_url')},
+        {"type": "Action.OpenUrl", "title": "View Confluence Page", "url": slot('page_url')}
+    ]
+})
+
+DIGEST_CARD = CardTemplate({
+    "type": "AdaptiveCard",
+    "$schema": CARD_SCHEMA,
+    "version": CARD_VERSION,
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": slot('heading'),
+            "weight": "Bolder",
+            "size": "Medium",
+            "wrap": True
+        },
+        {
+            "type": "TextBlock",
+            "text": slot('repositories'),
+            "isSubtle": True,
+            "spacing": "None",
+            "wrap": True
+        },
+        {"type": "Container", "items": slot('lines')}
+    ]
+})
+
+DIGEST_LINE = CardTemplate({"type": "TextBlock", "text": slot('text'), "wrap": True, "spacing": "Small"})
+
+
+# --- Helper Functions ---
+
+
+def event_fields(event):
+    """The card fields of one event, with the defaults for missing ones."""
+    page_title = event.get('confluence_page_title', 'N/A')
+    page_url = event.get('confluence_page_url', '#')
+    return {
+        "repository": event.get('repository_name', 'N/A'),
+        "commit_message": event.get('commit_message', 'N/A'),
+        "commit_url": event.get('commit_url', '#'),
+        "page_title": page_title,
+        "page_url": page_url,
+        "page": f"[{page_title}]({page_url})" if page_url != '#' else page_title,
+        "status": event.get('status', 'Updated'),  # e.g., "Updated", "Created"
+    }
+
+
+def event_card(event):
+    fields = event_fields(event)
+    return EVENT_CARD.render(heading=f"Confluence Documentation {fields['status']}", repository=fields['repository'],
+                             page=fields['page'], commit_message=fields['commit_message'],
+                             commit_url=fields['commit_url'], page_url=fields['page_url'])
+
+
+def digest_card(events):
+    """One card listing the pages of every event (the first DIGEST_MAX_EVENTS of them)."""
+    lines = []
+    repositories = []
+    for event in events[:DIGEST_MAX_EVENTS]:
+        fields = event_fields(event)
+        if fields['repository'] not in repositories:
+            repositories.append(fields['repository'])
+        commit = fields['commit_message']
+        if fields['commit_url'] != '#':
+            commit = f"{commit} ([commit]({fields['commit_url']}))"
+        lines.append(DIGEST_LINE.render(text=f"**{fields['status']}** {fields['page']}: {commit}"))
+    if len(events) > DIGEST_MAX_EVENTS:
+        lines.append(DIGEST_LINE.render(text=f"...and {len(events) - DIGEST_MAX_EVENTS} more pages"))
+
+    pages = "1 page" if len(events) == 1 else f"{len(events)} pages"
+    return DIGEST_CARD.render(heading=f"Confluence Documentation: {pages} updated",
+                              repositories=f"Repository: {', '.join(repositories)}",
+                              lines=JsonText(f"[{','.join(lines)}]"))
+
+
+def json_response(body, status_code=200):
+    return func.HttpResponse(body=body, mimetype="application/json", status_code=status_code)
+
+
+def error_response(message):
+    return func.HttpResponse(message, status_code=400)
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a request.')
+
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        logging.error("Invalid JSON in request body.  ")
+        req_body = None
+
+    if not req_body:
+        try:
+            # Fallback for form data if not JSON (less likely from Power Automate)
+            req_body = dict(req.form)
+        except Exception:  # Broad exception if req.form also fails
+            req_body = None
+        if not req_body:
+            return error_response("Please pass data in the request body (JSON or form data)")
+
+    mode = req.params.get('mode')
+    if isinstance(req_body, dict) and 'events' in req_body:
+        mode = req_body.get('mode', mode)
+        req_body = req_body['events']
+    if isinstance(req_body, dict):
+        return json_response(event_card(req_body))
+
+    # --- Batch ---
+    mode = mode or 'digest'
+    if mode not in BATCH_MODES:
+        return error_response(f"mode must be one of: {', '.join(BATCH_MODES)}")
+    if not isinstance(req_body, list) or not req_body:
+        return error_response("events must be a non-empty array of event objects")
+    if len(req_body) > MAX_BATCH_EVENTS:
+        return error_response(f"A batch can have at most {MAX_BATCH_EVENTS} events")
+    for position, event in enumerate(req_body):
+        if not isinstance(event, dict):
+            return error_response(f"events[{position}] must be an object")
+
+    if mode == 'digest':
+        return json_response(digest_card(req_body))
+    return json_response(f"[{','.join(event_card(event) for event in req_body)}]")
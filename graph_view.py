@@ -0,0 +1,86 @@
+"""
+Linked Content and Graph View panels of the GraphRAG pages, drawn from the entity-link graph (entity_graph.py).
+
+Graph nodes are named "<source>:<id>" after the search index chunks they
+stand for ("CRs:CR-123", "JIRA:PAY-42"), so a search result or a dashboard
+CR leads straight to its node.
+"""
+import os
+
+import streamlit as st
+
+from entity_graph import DEFAULT_GRAPH_DIR, META_NAME, EntityGraph
+
+GRAPH_DIR = os.environ.get('GRAPHRAG_GRAPH_DIR', DEFAULT_GRAPH_DIR)
+GRAPH_HOPS = 2
+GRAPH_MAX_NODES = 60  # Beyond this a drawn graph is unreadable anyway
+LINKED_MAX = 50  # Linked items listed per tab
+KIND_COLOURS = {"CRs": "#f8cbad", "JIRA": "#bdd7ee", "Confluence": "#c5e0b4", "Outlook": "#ffe699"}
+
+
+def graph_version(graph_dir):
+    """Changes whenever the graph is saved again (None: not built yet)."""
+    try:
+        return os.stat(os.path.join(graph_dir, META_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(max_entries=1)
+def load_graph(graph_dir, version):
+    # Opening only maps the files, and the one instance is shared by every session
+    return EntityGraph(graph_dir)
+
+
+def current_graph():
+    """The saved entity graph, or None if none has been built."""
+    version = graph_version(GRAPH_DIR)
+    return None if version is None else load_graph(GRAPH_DIR, version)
+
+
+def node_key(name):
+    """"PAY-42" for "JIRA:PAY-42"."""
+    return name.partition(':')[2] or name
+
+
+def dot_quote(text):
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def find_node(graph, text):
+    """The node of an entity the user typed: its full name ("CRs:CR-123") or its id in any kind ("CR-123")."""
+    text = text.strip()
+    for name in (text, *(f"{kind}:{text}" for kind in graph.kinds)):
+        if graph.node_id(name) is not None:
+            return name
+    return None
+
+
+def show_linked_content(graph, node, kinds):
+    """One tab per kind in `kinds`, listing the nodes linked to `node` directly."""
+    for kind, tab in zip(kinds, st.tabs(list(kinds))):
+        with tab:
+            linked = graph.neighbours(node, kinds=[kind]) if graph else []
+            if not linked:
+                st.write("No linked items.")
+            for name, edge_type in linked[:LINKED_MAX]:
+                st.markdown(f"- **{node_key(name)}** ({edge_type})")
+            if len(linked) > LINKED_MAX:
+                st.caption(f"...and {len(linked) - LINKED_MAX} more")
+
+
+def show_graph(graph, node):
+    """The nodes within GRAPH_HOPS links of `node` and the links between them."""
+    nodes, links = graph.subgraph(node, GRAPH_HOPS, max_nodes=GRAPH_MAX_NODES) if graph else ([], [])
+    if len(nodes) < 2:
+        st.write("No linked entities.")
+        return
+    lines = ['graph {', '  node [shape=box, style="rounded,filled", fontsize=10];', '  edge [fontsize=8];']
+    for name, distance in nodes:
+        colour = KIND_COLOURS.get(name.partition(':')[0], "#e7e6e6")
+        lines.append(f'  {dot_quote(name)} [label={dot_quote(node_key(name))}, fillcolor="{colour}"'
+                     + (', penwidth=2' if distance == 0 else '') + '];')
+    for source, target, edge_type in links:
+        lines.append(f'  {dot_quote(source)} -- {dot_quote(target)} [label={dot_quote(edge_type)}];')
+    lines.append('}')
+    st.graphviz_chart('\n'.join(lines))
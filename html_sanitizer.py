@@ -0,0 +1,201 @@
+import re
+import html
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+
+# --- Allowlist (what the Quill editor produces) ---
+
+ALLOWED_TAGS = {
+    'p': (), 'br': (), 'strong': (), 'em': (), 'u': (), 's': (), 'sub': (), 'sup': (),
+    'h1': (), 'h2': (), 'h3': (), 'h4': (), 'h5': (), 'h6': (),
+    'blockquote': (), 'ol': (), 'ul': (), 'li': (), 'span': (), 'code': (),
+    'pre': ('spellcheck',),
+    'a': ('href', 'target', 'rel'),
+    'img': ('src', 'alt', 'width', 'height'),
+    'iframe': ('src', 'frameborder', 'allowfullscreen'),
+}
+# Attributes allowed on every tag above
+GLOBAL_ATTRIBUTES = ('class', 'style')
+VOID_TAGS = {'br', 'img'}
+# Opening one of these closes an open tag of the same kind, like browsers do
+SELF_CLOSING_SIBLINGS = {'li', 'p'}
+CLOSE_TAGS = {tag: f'</{tag}>' for tag in ALLOWED_TAGS}
+# Dropped together with everything inside them
+DROP_CONTENT_TAGS = {'script', 'style', 'textarea', 'title', 'noscript', 'template', 'xmp'}
+
+CLASS_RE = re.compile(r'^(ql-[a-z0-9-]+|hljs(-[a-z0-9_-]+)?)$')
+STYLE_PROPERTIES = {'color', 'background-color'}
+STYLE_VALUE_RE = re.compile(r'^(#[0-9a-fA-F]{3,8}|rgba?\([\d\s.,%]+\)|[a-zA-Z]+)$')
+SAFE_URL_RE = re.compile(r'^(https?:|mailto:|[^:]*$)', re.IGNORECASE)
+SAFE_IMAGE_DATA_RE = re.compile(r'^data:image/(png|jpe?g|gif|webp);base64,[a-zA-Z0-9+/=\s]+$', re.IGNORECASE)
+PLAIN_VALUE_RE = re.compile(r'^[\w\s.%-]*$')
+
+# One scan over the input: comments, tags and the text between them
+TOKEN_RE = re.compile(r'''
+    (?P<comment><!--.*?(?:-->|$))
+  | <(?P<close>/)?(?P<tag>[a-zA-Z][a-zA-Z0-9]*)
+     (?P<attrs>(?:\s+[^\s"'>/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'>]+))?)*)
+     \s*/?>
+  | (?P<text>[^<]+|<)
+''', re.VERBOSE | re.DOTALL)
+ATTR_RE = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?''')
+BARE_AMPERSAND_RE = re.compile(r'&(?!#?[a-zA-Z0-9]+;)')
+
+
+def _clean_text(text):
+    # Keep entities Quill already produced, escape everything else that matters
+    return BARE_AMPERSAND_RE.sub('&amp;', text).replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _clean_style(value):
+    kept = []
+    for declaration in value.split(';'):
+        name, _, declared = declaration.partition(':')
+        name, declared = name.strip().lower(), declared.strip()
+        if name in STYLE_PROPERTIES and STYLE_VALUE_RE.match(declared):
+            kept.append(f"{name}: {declared}")
+    return '; '.join(kept)
+
+
+def _clean_attribute(tag, name, value):
+    """Returns the cleaned attribute value, or None to drop the attribute."""
+    if name == 'class':
+        classes = [c for c in value.split() if CLASS_RE.match(c)]
+        return ' '.join(classes) or None
+    if name == 'style':
+        return _clean_style(value) or None
+    if name in ('href', 'src'):
+        url = value.strip()
+        compact = re.sub(r'[\s\x00-\x1f]', '', url)  # Browsers ignore these inside schemes
+        if tag == 'img' and SAFE_IMAGE_DATA_RE.match(compact):
+            return url
+        if tag == 'iframe' and not compact.lower().startswith('https:'):
+            return None
+        return url if SAFE_URL_RE.match(compact) else None
+    if name == 'target':
+        return '_blank' if value == '_blank' else None
+    if name == 'rel':
+        return None  # Set by _clean_attributes for links that open a new tab
+    if name == 'alt':
+        return value
+    return value if PLAIN_VALUE_RE.match(value) else None
+
+
+OPEN_TAG_CACHE_SIZE = 4096
+OPEN_TAG_CACHE_MAX_ATTRS = 256  # Longer attribute text (image data, long links) is one-off and not cached
+
+
+def _open_tag(tag, attrs):
+    if len(attrs) > OPEN_TAG_CACHE_MAX_ATTRS:
+        return f'<{tag}{_clean_attributes(tag, attrs)}>'
+    return _cached_open_tag(tag, attrs)
+
+
+@lru_cache(maxsize=OPEN_TAG_CACHE_SIZE)
+def _cached_open_tag(tag, attrs):
+    # Cached: editor output repeats the same few opening tags over and over
+    return f'<{tag}{_clean_attributes(tag, attrs)}>'
+
+
+def _clean_attributes(tag, attrs):
+    allowed = ALLOWED_TAGS[tag]
+    cleaned = []
+    for match in ATTR_RE.finditer(attrs):
+        name = match.group(1).lower()
+        if name not in allowed and name not in GLOBAL_ATTRIBUTES:
+            continue
+        raw = match.group(2)
+        if raw is None:
+            raw = match.group(3) if match.group(3) is not None else (match.group(4) or '')
+        value = _clean_attribute(tag, name, html.unescape(raw))
+        if value is not None:
+            cleaned.append(f' {name}="{html.escape(value, quote=True)}"')
+    if tag == 'a' and ' target="_blank"' in cleaned:
+        cleaned.append(' rel="noopener noreferrer"')
+    return ''.join(cleaned)
+
+
+def sanitize_html(markup):
+    """
+    Allowlist HTML sanitizer for note content.
+
+    Keeps the tags, classes and inline styles Quill produces, drops every other
+    tag (and the content of script-like ones), strips unsafe URLs, escapes
+    stray markup in text and closes whatever was left open, so the result is
+    always well-formed. The input is scanned once with a precompiled tokenizer.
+    """
+    out = []
+    append = out.append
+    open_tags = []
+    dropping = None  # Name of the script-like tag whose content is being skipped
+    for _, closing, tag, attrs, text in TOKEN_RE.findall(markup):
+        if not tag:
+            if text and dropping is None:
+                if '&' in text or '<' in text or '>' in text:
+                    text = _clean_text(text)
+                append(text)
+            continue  # Comments are always dropped
+        tag = tag.lower()
+
+        if dropping is not None:
+            if closing and tag == dropping:
+                dropping = None
+            continue
+        if tag not in ALLOWED_TAGS:
+            if tag in DROP_CONTENT_TAGS and not closing:
+                dropping = tag
+            continue
+
+        if closing:
+            if open_tags and open_tags[-1] == tag:
+                append(CLOSE_TAGS[open_tags.pop()])
+            elif tag in open_tags:
+                # Close anything left open inside this tag
+                while True:
+                    top = open_tags.pop()
+                    append(CLOSE_TAGS[top])
+                    if top == tag:
+                        break
+            continue
+
+        if tag in SELF_CLOSING_SIBLINGS and open_tags and open_tags[-1] == tag:
+            append(CLOSE_TAGS[open_tags.pop()])
+        append(_open_tag(tag, attrs))
+        if tag not in VOID_TAGS:
+            open_tags.append(tag)
+
+    out.extend(CLOSE_TAGS[tag] for tag in reversed(open_tags))
+    return ''.join(out)
+
+
+class SanitizerCache:
+    """
+    Bounded LRU of sanitized results keyed by a digest of the input, so
+    re-saving or duplicating a note skips the sanitizer entirely. Only the
+    16-byte digest is kept, not the input itself.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sanitize(self, markup):
+        key = hashlib.blake2b(markup.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+        cleaned = sanitize_html(markup)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = cleaned
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return cleaned
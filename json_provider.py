@@ -0,0 +1,116 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib json module
+    orjson = None
+
+# Notes encoded per chunk when streaming a JSON array
+STREAM_CHUNK_ITEMS = 64
+
+# NDJSON: one JSON document per line, for bulk import and export
+NDJSON_MIMETYPE = 'application/x-ndjson'
+NDJSON_READ_BYTES = 64 * 1024
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes with orjson when it is installed and
+    behaves exactly like Flask's default provider otherwise. Types orjson
+    doesn't handle the way Flask does (datetimes, dataclasses, objects with
+    __html__) are passed to the same `default` function as before. Unlike the
+    stdlib encoder, non-ASCII text is written as UTF-8 rather than \\u escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        encoded = self._dumps_bytes(obj, **kwargs)
+        if encoded is None:
+            return super().dumps(obj, **kwargs)
+        return encoded.decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Same output as DefaultJSONProvider.response, but orjson's bytes go
+        # into the response without a decode/encode round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        encoded = self._dumps_bytes(obj, indent=indent)
+        if encoded is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(encoded + b'\n', mimetype=self.mimetype)
+
+    def dumps_items(self, items):
+        """Encodes a list as the comma-separated items, without the brackets, as bytes."""
+        encoded = self._dumps_bytes(items)
+        if encoded is None:
+            encoded = super().dumps(items, separators=(',', ':')).encode('utf-8')
+        return encoded[1:-1]
+
+    def dumps_lines(self, items):
+        """Encodes each of `items` as one line of JSON (NDJSON), as bytes."""
+        lines = []
+        for item in items:
+            encoded = self._dumps_bytes(item)
+            if encoded is None:
+                encoded = super().dumps(item, separators=(',', ':')).encode('utf-8')
+            lines.append(encoded)
+            lines.append(b'\n')
+        return b''.join(lines)
+
+    def _dumps_bytes(self, obj, indent=None, **kwargs):
+        # Compact orjson encoding, or None when orjson is missing or the
+        # caller asked for json.dumps options orjson has no equivalent for
+        if orjson is None:
+            return None
+        default = kwargs.pop('default', self.default)
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        if kwargs.pop('separators', (',', ':')) != (',', ':') or indent not in (None, 2) or kwargs:
+            return None
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+
+
+def stream_json_array(provider, items, chunk_items=STREAM_CHUNK_ITEMS):
+    """
+    Yields `items` as one JSON array in chunks of `chunk_items` encoded items,
+    so a long list is never held in memory as a single string.
+    """
+    yield b'['
+    for start in range(0, len(items), chunk_items):
+        chunk = provider.dumps_items(items[start:start + chunk_items])
+        yield b',' + chunk if start else chunk
+    yield b']\n'
+
+
+def read_lines(stream, max_line_bytes, read_bytes=NDJSON_READ_BYTES):
+    """
+    Yields the lines of a binary stream (without line endings) as they are
+    read, `read_bytes` at a time, so memory use is bounded by `max_line_bytes`
+    however long the stream is. Longer lines are skipped and yielded as None.
+    """
+    buffer, too_long = b'', False
+    while True:
+        chunk = stream.read(read_bytes)
+        if not chunk:
+            break
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            yield None if too_long or end - start > max_line_bytes else buffer[start:end].rstrip(b'\r')
+            start, too_long = end + 1, False
+        buffer = buffer[start:]
+        if len(buffer) > max_line_bytes:
+            buffer, too_long = b'', True  # Drop the rest of this line as it arrives
+    if buffer or too_long:
+        yield None if too_long else buffer.rstrip(b'\r')
@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+
+from flask import request
+
+# Upper bounds of the histogram buckets (+Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Where the after_request hook leaves the matched endpoint for the middleware
+ENDPOINT_ENVIRON_KEY = 'quicknote.endpoint'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+def _histogram_lines(name, labelnames, labels, buckets, counts, total):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets + ('+Inf',), counts):
+        cumulative += count
+        le = f'le="{bound}"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+    label_text = _format_labels(labelnames, labels)
+    lines.append(f"{name}_sum{label_text} {_format_value(total)}")
+    lines.append(f"{name}_count{label_text} {cumulative}")
+    return lines
+
+
+class Gauge:
+    """Gauge read from `func` at scrape time."""
+
+    def __init__(self, name, help_text, func):
+        self.name = name
+        self.help = help_text
+        self.func = func
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(self.func())}"]
+
+
+class MetricsRegistry:
+    """Holds the app's metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self.prefix + name, help_text, labelnames))
+
+    def gauge(self, name, help_text, func):
+        return self._register(Gauge(self.prefix + name, help_text, func))
+
+    def register(self, metric):
+        """Adds any object with a render() method returning exposition lines."""
+        return self._register(metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+class RequestMetrics:
+    """
+    Latency, request/response size histograms and status code counts per
+    (endpoint, method). One record() call per request updates all of them
+    under a single lock acquisition.
+    """
+
+    labelnames = ('endpoint', 'method')
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._series = {}  # (endpoint, method) -> _RequestSeries
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, method, seconds, request_bytes, response_bytes, status):
+        latency_index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        request_index = bisect.bisect_left(SIZE_BUCKETS, request_bytes)
+        response_index = bisect.bisect_left(SIZE_BUCKETS, response_bytes) if response_bytes is not None else None
+        with self._lock:
+            series = self._series.get((endpoint, method))
+            if series is None:
+                series = self._series[(endpoint, method)] = _RequestSeries()
+            series.latency[latency_index] += 1
+            series.latency_sum += seconds
+            series.request_size[request_index] += 1
+            series.request_size_sum += request_bytes
+            if response_index is not None:
+                series.response_size[response_index] += 1
+                series.response_size_sum += response_bytes
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def render(self):
+        with self._lock:
+            items = sorted(((labels, series.copy()) for labels, series in self._series.items()),
+                           key=lambda item: item[0])
+        families = [
+            ('http_request_duration_seconds', "Time spent handling a request (to the first byte for streams).",
+             LATENCY_BUCKETS, 'latency'),
+            ('http_request_size_bytes', "Size of request bodies.", SIZE_BUCKETS, 'request_size'),
+            ('http_response_size_bytes', "Size of response bodies (not recorded for streams).",
+             SIZE_BUCKETS, 'response_size'),
+        ]
+        lines = []
+        for name, help_text, buckets, field in families:
+            name = self.prefix + name
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for labels, series in items:
+                lines += _histogram_lines(name, self.labelnames, labels, buckets,
+                                          getattr(series, field), getattr(series, field + '_sum'))
+        name = self.prefix + 'http_responses_total'
+        lines += [f"# HELP {name} Responses by status code.", f"# TYPE {name} counter"]
+        for labels, series in items:
+            for status, count in sorted(series.statuses.items()):
+                lines.append(f"{name}{_format_labels(self.labelnames + ('status',), labels + (status,))} {count}")
+        return lines
+
+
+class _RequestSeries:
+    __slots__ = ('latency', 'latency_sum', 'request_size', 'request_size_sum',
+                 'response_size', 'response_size_sum', 'statuses')
+
+    def __init__(self):
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.request_size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.request_size_sum = 0
+        self.response_size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.response_size_sum = 0
+        self.statuses = {}
+
+    def copy(self):
+        other = _RequestSeries()
+        for field in self.__slots__:
+            value = getattr(self, field)
+            setattr(other, field, value.copy() if isinstance(value, (list, dict)) else value)
+        return other
+
+
+class _MetricsMiddleware:
+    # Times the whole WSGI call and reads sizes and status from the environ
+    # and start_response, so the only per-request work inside Flask is the
+    # endpoint lookup in the after_request hook.
+
+    def __init__(self, wsgi_app, request_metrics):
+        self.wsgi_app = wsgi_app
+        self.request_metrics = request_metrics
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        captured = []
+
+        def capturing_start_response(status, headers, exc_info=None):
+            captured.append((status, headers))
+            return start_response(status, headers, exc_info)
+
+        body = self.wsgi_app(environ, capturing_start_response)
+        elapsed = time.perf_counter() - started
+        if captured:
+            status, headers = captured[-1]
+            response_bytes = None
+            for name, value in headers:
+                if name == 'Content-Length':
+                    response_bytes = int(value)
+                    break
+            self.request_metrics.record(
+                environ.get(ENDPOINT_ENVIRON_KEY) or 'unmatched', environ.get('REQUEST_METHOD', ''),
+                elapsed, int(environ.get('CONTENT_LENGTH') or 0), response_bytes, int(status[:3]))
+        return body
+
+
+def instrument_app(app, registry):
+    """
+    Records latency, request/response sizes and status codes for every request
+    handled by `app`, labelled by Flask endpoint (so paths with IDs don't
+    create new series). Streamed responses count only the time to the first
+    byte and no response size.
+    """
+    request_metrics = registry.register(RequestMetrics(registry.prefix))
+    app.wsgi_app = _MetricsMiddleware(app.wsgi_app, request_metrics)
+
+    @app.after_request
+    def remember_endpoint(response):
+        current = request._get_current_object()
+        current.environ[ENDPOINT_ENVIRON_KEY] = current.endpoint
+        return response
@@ -0,0 +1,997 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import bisect
+import logging
+import sqlite3
+import threading
+import contextlib
+import collections
+from datetime import datetime, timedelta, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# --- Compact Records ---
+
+NOTE_FIELDS = ('id', 'title', 'content', 'timestamp')
+COMPRESS_MIN_CHARS = 1024  # Shorter content is kept as a plain string
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def pack_id(note_id):
+    """The 16 bytes of a canonical (lowercase, hyphenated) UUID string; any other id is kept as is."""
+    if not isinstance(note_id, str) or len(note_id) != 36:
+        return note_id
+    try:
+        packed = bytes.fromhex(note_id.replace('-', ''))
+    except ValueError:
+        return note_id
+    return packed if unpack_id(packed) == note_id else note_id
+
+
+def unpack_id(packed):
+    if not isinstance(packed, bytes):
+        return packed
+    h = packed.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def pack_timestamp(timestamp):
+    """Epoch microseconds of a UTC isoformat() timestamp; any other value is kept as is."""
+    try:
+        micros = (datetime.fromisoformat(timestamp) - _EPOCH) // _MICROSECOND
+    except (ValueError, TypeError):  # Not ISO, or naive
+        return timestamp
+    return micros if unpack_timestamp(micros) == timestamp else timestamp
+
+
+def unpack_timestamp(packed):
+    return (_EPOCH + timedelta(microseconds=packed)).isoformat() if isinstance(packed, int) else packed
+
+
+class NoteRecord:
+    """
+    Compact in-memory form of a note: a slotted object holding the id as 16
+    UUID bytes, the timestamp as epoch microseconds and content of
+    COMPRESS_MIN_CHARS or more zlib-compressed. Values that wouldn't come
+    back as the exact same string (non-UUID ids, non-UTC timestamps) are kept
+    as strings. Fields unpack on access; to_dict() gives back the note.
+    """
+
+    __slots__ = ('_id', 'title', '_content', '_timestamp')
+
+    def __init__(self, note):
+        self._id = pack_id(note['id'])
+        self.title = note['title']
+        self._timestamp = pack_timestamp(note['timestamp'])
+        content = note['content']
+        if isinstance(content, str) and len(content) >= COMPRESS_MIN_CHARS:
+            compressed = zlib.compress(content.encode('utf-8'))
+            if len(compressed) < len(content):
+                content = compressed
+        self._content = content
+
+    @property
+    def id(self):
+        return unpack_id(self._id)
+
+    @property
+    def timestamp(self):
+        return unpack_timestamp(self._timestamp)
+
+    @property
+    def content(self):
+        content = self._content
+        return zlib.decompress(content).decode('utf-8') if isinstance(content, bytes) else content
+
+    def __getitem__(self, field):
+        if field not in NOTE_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def to_dict(self):
+        return {"id": self.id, "title": self.title, "content": self.content, "timestamp": self.timestamp}
+
+
+def note_sort_key(note):
+    return note['timestamp'], note['id']
+
+
+# --- Ordered Index ---
+
+
+class TimestampIndex:
+    """
+    Values kept in ascending (timestamp, id) order as they are inserted.
+
+    Notes almost always arrive with the newest timestamp, so inserts are an
+    O(1) append; out-of-order keys fall back to a binary-search insert.
+    Removing the oldest entry only advances a head offset (O(1)); the consumed
+    prefix is dropped once it makes up half of the list. Keys are computed
+    from the values by `key` while searching rather than stored, and ordered
+    reads are plain slices. Not thread-safe: the stores call it under their lock.
+    """
+
+    def __init__(self, key=note_sort_key):
+        self._key = key
+        self._values = []
+        self._head = 0
+
+    def __len__(self):
+        return len(self._values) - self._head
+
+    def insert(self, value):
+        key = self._key(value)
+        if len(self) == 0 or key >= self._key(self._values[-1]):
+            self._values.append(value)
+        else:
+            pos = bisect.bisect_right(self._values, key, lo=self._head, key=self._key)
+            self._values.insert(pos, value)
+
+    def oldest(self):
+        return self._values[self._head] if len(self) else None
+
+    def pop_oldest(self):
+        if not len(self):
+            return None
+        value = self._values[self._head]
+        self._values[self._head] = None  # Release the reference
+        self._head += 1
+        if self._head > 1024 and self._head * 2 > len(self._values):
+            del self._values[:self._head]
+            self._head = 0
+        return value
+
+    def remove(self, timestamp, note_id):
+        key = (timestamp, note_id)
+        if len(self) and key == self._key(self._values[self._head]):
+            return self.pop_oldest()
+        pos = bisect.bisect_left(self._values, key, lo=self._head, key=self._key)
+        if pos < len(self._values) and self._key(self._values[pos]) == key:
+            return self._values.pop(pos)
+        return None
+
+    def oldest_first(self):
+        return self._values[self._head:]
+
+    def newest_before(self, timestamp, note_id, limit):
+        """Up to `limit` values with keys strictly before (timestamp, note_id), newest first."""
+        end = bisect.bisect_left(self._values, (timestamp, note_id), lo=self._head, key=self._key)
+        start = max(self._head, end - limit)
+        return self._values[start:end][::-1]
+
+    def newest(self, limit):
+        start = max(self._head, len(self._values) - limit)
+        return self._values[start:][::-1]
+
+    def newest_first(self):
+        stop = self._head - 1 if self._head else None
+        return self._values[:stop:-1]
+
+
+# --- Storage Backends ---
+
+
+class MemoryNoteStore:
+    """
+    Process-local note store. Data is lost when the worker restarts.
+
+    Every change gets the next sequence number (`version`) and is kept in a
+    bounded change log, so clients can fetch just the changes since the version
+    they last saw. `generation` is unique per store instance; sequence numbers
+    from another generation mean nothing here. Listeners registered with
+    `add_listener` are called with each change record as it is made.
+
+    Writes hold a lock, so the note limit of `add` and `remove_oldest` is
+    checked and applied atomically across threads (but not processes). Reads
+    of the index take it too, since eviction rewrites the index in place;
+    they only copy references under it and unpack the notes after.
+
+    Notes are held as NoteRecords (`compact_records=False` keeps the dicts as
+    given) and turned back into dicts when they are read.
+    """
+
+    def __init__(self, change_log_size=10000, compact_records=True):
+        self._lock = threading.Lock()
+        self.compact_records = compact_records
+        self._notes = {}  # id (packed when compact) -> stored note
+        self._index = TimestampIndex()
+        self._changes = collections.deque(maxlen=change_log_size)
+        self._listeners = []
+        self.generation = uuid.uuid4().hex[:12]
+        self.version = 0
+
+    def __len__(self):
+        return len(self._notes)
+
+    def add(self, note, limit=None):
+        """Store `note`. Returns None (and stores nothing) if `limit` notes are already stored."""
+        with self._lock:
+            if limit is not None and len(self._notes) >= limit:
+                return None
+            stored = self._pack(note)
+            self._record({'op': 'add', 'note': note}, stored)
+            self._insert(note['id'], stored)
+            self._after_change()
+            return note
+
+    def add_many(self, notes, limit=None):
+        """
+        Store `notes` in one write (for the log backend, one fsync). Notes that
+        would take the store past `limit` are not stored; returns the stored ones.
+        """
+        with self._lock:
+            if limit is not None:
+                notes = notes[:max(limit - len(self._notes), 0)]
+            if not notes:
+                return []
+            stored_notes = [self._pack(note) for note in notes]
+            self._record_batch([{'op': 'add', 'note': note} for note in notes], stored_notes)
+            for note, stored in zip(notes, stored_notes):
+                self._insert(note['id'], stored)
+            self._after_change()
+            return notes
+
+    def get(self, note_id):
+        stored = self._notes.get(self._id_key(note_id))
+        return self._unpack(stored) if stored is not None else None
+
+    def newest_first(self):
+        with self._lock:
+            stored_notes = self._index.newest_first()
+        return self._unpack_all(stored_notes)
+
+    def page(self, limit, before=None):
+        """
+        Keyset page of up to `limit` notes, newest first.
+        `before` is the (timestamp, id) of the last note of the previous page.
+        """
+        with self._lock:
+            if before is None:
+                stored_notes = self._index.newest(limit)
+            else:
+                stored_notes = self._index.newest_before(before[0], before[1], limit)
+        return self._unpack_all(stored_notes)
+
+    def oldest(self):
+        with self._lock:
+            stored = self._index.oldest()
+        return self._unpack(stored) if stored is not None else None
+
+    def remove_oldest(self, min_count=1):
+        """Delete and return the oldest note, or None if fewer than `min_count` notes are stored."""
+        with self._lock:
+            oldest = self._index.oldest()
+            if oldest is None or len(self._notes) < min_count:
+                return None
+            note_id = oldest['id']
+            self._record({'op': 'delete', 'id': note_id})
+            deleted = self._delete(note_id)
+            self._after_change()
+            return self._unpack(deleted)
+
+    def changes_since(self, since):
+        """
+        Change records with a sequence number above `since`, oldest first.
+        Additions carry the full note, deletions are tombstones with just the id.
+        Returns None when those changes are no longer in the change log, or
+        when `since` is ahead of the store (a version it never had).
+        """
+        with self._lock:  # Writers append to the change log
+            floor = self._changes[0][0] - 1 if self._changes else self.version
+            if since < floor or since > self.version:
+                return None
+            records = []
+            for record in reversed(self._changes):
+                if record[0] <= since:
+                    break
+                records.append(record)
+        changes = []
+        for seq, op, payload in reversed(records):
+            if op == 'add':
+                changes.append({'op': 'add', 'note': self._unpack(payload), 'seq': seq})
+            else:
+                changes.append({'op': 'delete', 'id': payload, 'seq': seq})
+        return changes
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def close(self):
+        pass  # Nothing to release; the notes go with the store
+
+    def _record(self, change, stored=None):
+        # The change log keeps (seq, op, stored note or id) tuples; an added
+        # note is shared with the index rather than kept a second time
+        self.version += 1
+        change['seq'] = self.version
+        self._changes.append((self.version, change['op'], stored if change['op'] == 'add' else change['id']))
+        for callback in self._listeners:
+            callback(change)
+
+    def _record_batch(self, changes, stored_notes):
+        for change, stored in zip(changes, stored_notes):
+            self._record(change, stored)
+
+    def _after_change(self):
+        pass
+
+    def _pack(self, note):
+        # Notes with fields other than the usual four are kept as they are
+        if self.compact_records and len(note) == len(NOTE_FIELDS) and all(field in note for field in NOTE_FIELDS):
+            return NoteRecord(note)
+        return note
+
+    def _unpack(self, stored):
+        return stored.to_dict() if isinstance(stored, NoteRecord) else stored
+
+    def _unpack_all(self, stored_notes):
+        return [self._unpack(stored) for stored in stored_notes] if self.compact_records else stored_notes
+
+    def _id_key(self, note_id):
+        return pack_id(note_id) if self.compact_records else note_id
+
+    def _insert(self, note_id, stored):
+        key = self._id_key(note_id)
+        previous = self._notes.get(key)
+        if previous is not None:
+            self._index.remove(previous['timestamp'], note_id)
+        self._notes[key] = stored
+        self._index.insert(stored)
+
+    def _delete(self, note_id):
+        stored = self._notes.pop(self._id_key(note_id), None)
+        if stored is not None:
+            self._index.remove(stored['timestamp'], note_id)
+        return stored
+
+    # Used by durable backends to rebuild state without logging it again
+    def _apply(self, record):
+        if record['op'] == 'add':
+            self._insert(record['note']['id'], self._pack(record['note']))
+        elif record['op'] == 'delete':
+            self._delete(record['id'])
+
+
+class LogNoteStore(MemoryNoteStore):
+    """
+    Durable note store backed by an append-only write-ahead log.
+
+    Every change record is appended to `notes.log` as one JSON line and
+    fsync'd before it is applied (a batch from `add_many` with one fsync); a
+    write that fails part way is cut off again. Every `compact_every` records the full state
+    is written to `notes.snapshot` (atomically, via rename) and the log is
+    truncated, so startup only replays the snapshot plus the short log tail.
+    The record sequence numbers double as the store version and survive
+    restarts; records already covered by the snapshot are skipped on replay,
+    which makes a crash between writing the snapshot and truncating the log
+    harmless.
+    """
+
+    LOG_NAME = "notes.log"
+    SNAPSHOT_NAME = "notes.snapshot"
+
+    def __init__(self, data_dir, compact_every=1000, fsync=True, change_log_size=10000, compact_records=True):
+        super().__init__(change_log_size=change_log_size, compact_records=compact_records)
+        self.data_dir = data_dir
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._log_records = 0
+        os.makedirs(data_dir, exist_ok=True)
+        self._log_path = os.path.join(data_dir, self.LOG_NAME)
+        self._snapshot_path = os.path.join(data_dir, self.SNAPSHOT_NAME)
+        self._replay()
+        # Unbuffered, so a failed write leaves nothing behind to be flushed later
+        self._log = open(self._log_path, 'ab', buffering=0)
+
+    def compact(self):
+        """Write a snapshot of the current state and truncate the log."""
+        with self._lock:
+            self._compact()
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+
+    # --- Internals ---
+
+    def _record(self, change, stored=None):
+        self._append([dict(change, seq=self.version + 1)])
+        super()._record(change, stored)
+
+    def _record_batch(self, changes, stored_notes):
+        # One write and one fsync for the whole batch
+        self._append([dict(change, seq=self.version + n) for n, change in enumerate(changes, 1)])
+        for change, stored in zip(changes, stored_notes):
+            super()._record(change, stored)
+
+    def _append(self, records):
+        data = memoryview(b''.join(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+                                   for record in records))
+        start = self._log.tell()
+        try:
+            written = 0
+            while written < len(data):
+                written += self._log.write(data[written:])
+            if self.fsync:
+                os.fsync(self._log.fileno())
+        except BaseException:
+            # Cut off a partial write (disk full, I/O error) so later records
+            # don't follow a broken line
+            self._log.truncate(start)
+            self._log.seek(start)
+            raise
+        self._log_records += len(records)
+
+    def _after_change(self):
+        if self.compact_every and self._log_records >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self._snapshot_path + '.tmp'
+        # Written oldest first so loading it rebuilds the index with plain
+        # appends, one note at a time so no second copy of every note is built
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f'{{"seq":{self.version},"notes":[')
+            for position, stored in enumerate(self._index.oldest_first()):
+                if position:
+                    f.write(',')
+                f.write(json.dumps(self._unpack(stored), separators=(',', ':')))
+            f.write(']}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        self._fsync_dir()
+        self._log.truncate(0)
+        self._log.seek(0)
+        self._log_records = 0
+
+    def _fsync_dir(self):
+        if not hasattr(os, 'O_DIRECTORY'):
+            return  # Not supported on Windows
+        fd = os.open(self.data_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _replay(self):
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.version = snapshot['seq']
+            for note in snapshot['notes']:
+                self._insert(note['id'], self._pack(note))
+
+        if not os.path.exists(self._log_path):
+            return
+        valid_bytes = 0
+        with open(self._log_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Torn write from a crash mid-append
+                valid_bytes += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A complete but unreadable line: skip it rather than lose the records after it
+                    logging.getLogger(__name__).warning(f"Skipping an unreadable record in {self._log_path}")
+                    continue
+                self._log_records += 1
+                if record['seq'] <= self.version:
+                    continue  # Already part of the snapshot
+                self.version = record['seq']
+                self._apply(record)
+        # Drop any partial tail so new appends start on a clean line
+        if valid_bytes != os.path.getsize(self._log_path):
+            with open(self._log_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+
+class SqliteNoteStore:
+    """
+    Note store shared by every worker process, kept in a SQLite database in WAL
+    mode (readers never block the single writer).
+
+    Writes run in `BEGIN IMMEDIATE` transactions, which take SQLite's write
+    lock up front, so the note-count check and the insert or eviction that
+    depends on it are atomic across processes. Each change is also written to
+    a `changes` table whose autoincrement key is the store version; one watcher
+    thread per process tails that table of every open store with listeners
+    and calls them, so changes made by other workers reach this worker's
+    event streams and search index too.
+    """
+
+    FILE_NAME = "notes.sqlite3"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS notes (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS notes_by_time ON notes (timestamp, id);
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL,
+            note_id TEXT NOT NULL,
+            note TEXT
+        );
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('note_count', 0);
+    """
+    NOTE_COLUMNS = "id, title, content, timestamp"
+    POLL_INTERVAL = 0.2  # Seconds between the watcher's checks for new changes
+
+    # The watcher thread and the stores it watches, shared by all instances
+    _watched = set()
+    _watcher_lock = threading.Lock()
+    _watcher_pid = None
+
+    def __init__(self, data_dir, change_log_size=10000, busy_timeout=10.0, idle_connections=1):
+        os.makedirs(data_dir, exist_ok=True)
+        self.path = os.path.join(data_dir, self.FILE_NAME)
+        self.change_log_size = change_log_size
+        self.busy_timeout = busy_timeout
+        self.idle_connections = idle_connections
+        self._idle = []  # Open connections not in use, at most idle_connections
+        self._pool_lock = threading.Lock()
+        self._pool_pid = os.getpid()
+        self._closed = False
+        self._listeners = []
+        self._notify_lock = threading.Lock()
+
+        with self._db() as db:
+            db.executescript(self.SCHEMA)
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', ?)", (uuid.uuid4().hex[:12],))
+            db.execute("COMMIT")
+            self.generation = db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+        self._notified = self.version
+
+    def __len__(self):
+        with self._db() as db:
+            return self._count(db)
+
+    @property
+    def version(self):
+        with self._db() as db:
+            return db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def add(self, note, limit=None):
+        """Store `note`. Returns None (and stores nothing) if `limit` notes are already stored."""
+        with self._write() as db:
+            if limit is not None and self._count(db) >= limit:
+                return None
+            db.execute(f"INSERT INTO notes ({self.NOTE_COLUMNS}) VALUES (?, ?, ?, ?)",
+                       (note['id'], note['title'], note['content'], note['timestamp']))
+            db.execute("UPDATE meta SET value = value + 1 WHERE key = 'note_count'")
+            db.execute("INSERT INTO changes (op, note_id, note) VALUES ('add', ?, ?)",
+                       (note['id'], json.dumps(note, separators=(',', ':'))))
+        self._notify()
+        return note
+
+    def add_many(self, notes, limit=None):
+        """
+        Store `notes` in one transaction. Notes that would take the store past
+        `limit` are not stored; returns the stored ones.
+        """
+        with self._write() as db:
+            if limit is not None:
+                notes = notes[:max(limit - self._count(db), 0)]
+            db.executemany(f"INSERT INTO notes ({self.NOTE_COLUMNS}) VALUES (?, ?, ?, ?)",
+                           [(note['id'], note['title'], note['content'], note['timestamp']) for note in notes])
+            db.execute("UPDATE meta SET value = value + ? WHERE key = 'note_count'", (len(notes),))
+            db.executemany("INSERT INTO changes (op, note_id, note) VALUES ('add', ?, ?)",
+                           [(note['id'], json.dumps(note, separators=(',', ':'))) for note in notes])
+        self._notify()
+        return notes
+
+    def get(self, note_id):
+        with self._db() as db:
+            row = db.execute(f"SELECT {self.NOTE_COLUMNS} FROM notes WHERE id = ?", (note_id,)).fetchone()
+        return self._note(row) if row else None
+
+    def newest_first(self):
+        with self._db() as db:
+            rows = db.execute(f"SELECT {self.NOTE_COLUMNS} FROM notes ORDER BY timestamp DESC, id DESC").fetchall()
+        return [self._note(row) for row in rows]
+
+    def page(self, limit, before=None):
+        """
+        Keyset page of up to `limit` notes, newest first.
+        `before` is the (timestamp, id) of the last note of the previous page.
+        """
+        with self._db() as db:
+            if before is None:
+                rows = db.execute(
+                    f"SELECT {self.NOTE_COLUMNS} FROM notes ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (limit,)).fetchall()
+            else:
+                rows = db.execute(
+                    f"SELECT {self.NOTE_COLUMNS} FROM notes WHERE (timestamp, id) < (?, ?) "
+                    "ORDER BY timestamp DESC, id DESC LIMIT ?", (before[0], before[1], limit)).fetchall()
+        return [self._note(row) for row in rows]
+
+    def oldest(self):
+        with self._db() as db:
+            row = db.execute(
+                f"SELECT {self.NOTE_COLUMNS} FROM notes ORDER BY timestamp, id LIMIT 1").fetchone()
+        return self._note(row) if row else None
+
+    def remove_oldest(self, min_count=1):
+        """Delete and return the oldest note, or None if fewer than `min_count` notes are stored."""
+        with self._write() as db:
+            if self._count(db) < max(min_count, 1):
+                return None
+            row = db.execute(f"SELECT {self.NOTE_COLUMNS} FROM notes ORDER BY timestamp, id LIMIT 1").fetchone()
+            db.execute("DELETE FROM notes WHERE id = ?", (row[0],))
+            db.execute("UPDATE meta SET value = value - 1 WHERE key = 'note_count'")
+            db.execute("INSERT INTO changes (op, note_id) VALUES ('delete', ?)", (row[0],))
+        self._notify()
+        return self._note(row)
+
+    def changes_since(self, since):
+        """
+        Change records with a sequence number above `since`, oldest first.
+        Additions carry the full note, deletions are tombstones with just the id.
+        Returns None when those changes are no longer in the change log, or
+        when `since` is ahead of the store (a version it never had).
+        """
+        with self._db() as db:
+            db.execute("BEGIN")  # One consistent snapshot for both queries
+            try:
+                first, last = db.execute("SELECT MIN(seq), COALESCE(MAX(seq), 0) FROM changes").fetchone()
+                floor = first - 1 if first is not None else last
+                if since < floor or since > last:
+                    return None
+                rows = db.execute("SELECT seq, op, note_id, note FROM changes WHERE seq > ? ORDER BY seq",
+                                  (since,)).fetchall()
+            finally:
+                db.execute("COMMIT")
+        return [self._change(row) for row in rows]
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+        self._ensure_watcher()
+
+    def close(self):
+        """Stop watching for changes and close the idle connections; ones in use are closed when returned."""
+        with SqliteNoteStore._watcher_lock:
+            SqliteNoteStore._watched.discard(self)
+        with self._notify_lock, self._pool_lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            if self._pool_pid != os.getpid():
+                idle = []  # The parent process's; must not be touched
+        for db in idle:
+            db.close()
+
+    # --- Internals ---
+
+    @contextlib.contextmanager
+    def _db(self):
+        # A connection is borrowed for one operation, and at most
+        # idle_connections are kept open between operations, so the files a
+        # store holds open don't grow with the number of threads using it.
+        # Connections from before a fork are dropped unused (they must not be
+        # shared with the parent process).
+        forked = False
+        with self._pool_lock:
+            if self._pool_pid != os.getpid():
+                self._idle, self._pool_pid, forked = [], os.getpid(), True
+            db = self._idle.pop() if self._idle else None
+        if forked:
+            self._ensure_watcher()
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                 isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=FULL")
+        try:
+            yield db
+        finally:
+            with self._pool_lock:
+                if (not self._closed and not db.in_transaction and self._pool_pid == os.getpid()
+                        and len(self._idle) < self.idle_connections):
+                    self._idle.append(db)
+                    db = None
+            if db is not None:
+                db.close()
+
+    @contextlib.contextmanager
+    def _write(self):
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                # Keep the change log bounded
+                db.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?",
+                           (self.change_log_size,))
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _count(self, db):
+        return db.execute("SELECT value FROM meta WHERE key = 'note_count'").fetchone()[0]
+
+    def _note(self, row):
+        return {"id": row[0], "title": row[1], "content": row[2], "timestamp": row[3]}
+
+    def _change(self, row):
+        seq, op, note_id, note = row
+        if op == 'add':
+            return {'op': 'add', 'note': json.loads(note), 'seq': seq}
+        return {'op': 'delete', 'id': note_id, 'seq': seq}
+
+    def _notify(self):
+        """Call the listeners for every change committed since the last call, in order."""
+        if not self._listeners:
+            return
+        with self._notify_lock:
+            if self._closed:
+                return
+            with self._db() as db:
+                rows = db.execute("SELECT seq, op, note_id, note FROM changes WHERE seq > ? ORDER BY seq",
+                                  (self._notified,)).fetchall()
+            for row in rows:
+                change = self._change(row)
+                for callback in self._listeners:
+                    callback(change)
+                self._notified = change['seq']
+
+    def _ensure_watcher(self):
+        # Threads don't survive a fork, so each process starts its own watcher
+        if not self._listeners:
+            return
+        cls = SqliteNoteStore
+        with cls._watcher_lock:
+            cls._watched.add(self)
+            if cls._watcher_pid != os.getpid():
+                cls._watcher_pid = os.getpid()
+                threading.Thread(target=cls._watch, name='note-store-watcher', daemon=True).start()
+
+    @classmethod
+    def _watch(cls):
+        while True:
+            time.sleep(cls.POLL_INTERVAL)
+            with cls._watcher_lock:
+                stores = list(cls._watched)
+            for store in stores:
+                try:
+                    store._notify()
+                except sqlite3.Error as e:
+                    logging.getLogger(__name__).warning(f"Note store watcher: {e}")
+
+
+# --- Partitions ---
+
+
+class EmptyNoteStore:
+    """
+    Read-only view of a partition that has no notes and no files yet.
+    Writes must go through a real store, opened with `acquire(key, create=True)`.
+    """
+
+    generation = 'empty'
+    version = 0
+
+    def __len__(self):
+        return 0
+
+    def add(self, note, limit=None):
+        raise TypeError("EmptyNoteStore is read-only")
+
+    def add_many(self, notes, limit=None):
+        raise TypeError("EmptyNoteStore is read-only")
+
+    def get(self, note_id):
+        return None
+
+    def newest_first(self):
+        return []
+
+    def page(self, limit, before=None):
+        return []
+
+    def oldest(self):
+        return None
+
+    def remove_oldest(self, min_count=1):
+        return None
+
+    def changes_since(self, since):
+        return [] if since == 0 else None
+
+    def add_listener(self, callback):
+        pass  # Nothing ever changes
+
+    def close(self):
+        pass
+
+
+EMPTY_NOTES = EmptyNoteStore()
+
+
+class _OpenPartition:
+    __slots__ = ('store', 'pins')
+
+    def __init__(self, store):
+        self.store = store
+        self.pins = 0
+
+
+class PartitionedNoteStore:
+    """
+    Notes split by user key into separate stores, made by
+    `make_partition(key)` when first needed.
+
+    Each partition has its own lock, note limit and eviction, so every
+    operation costs what it would on that user's notes alone and writes for
+    different users never wait for each other. The partition table is split
+    into `shard_count` shards, each with its own lock.
+
+    `acquire(key)` returns a partition's store pinned open until `release`.
+    A partition that isn't open and for which `exists(key)` is false is
+    served as EMPTY_NOTES instead of being created, unless `create` is set
+    (for writes), so requests that only read make no files. At most
+    `max_open` partitions (None: no limit) are kept open: the least recently
+    used ones are passed to `close_partition(key, store)`, once they are
+    no longer pinned.
+    """
+
+    def __init__(self, make_partition, exists=None, close_partition=None, max_open=None, shard_count=64):
+        self.make_partition = make_partition
+        self.exists = exists
+        self.close_partition = close_partition or (lambda key, store: store.close())
+        if max_open:
+            shard_count = min(shard_count, max_open)  # Every shard holds at least one, and all at most max_open
+        self._shard_max = max_open and max_open // shard_count
+        self._shards = [collections.OrderedDict() for _ in range(shard_count)]  # key -> _OpenPartition, LRU first
+        self._evicted = [{} for _ in range(shard_count)]  # Closed on their last release
+        self._shard_locks = [threading.Lock() for _ in range(shard_count)]
+
+    def acquire(self, key, create=False):
+        shard_no = hash(key) % len(self._shards)
+        shard, evicted = self._shards[shard_no], self._evicted[shard_no]
+        with self._shard_locks[shard_no]:
+            entry = shard.get(key)
+            if entry is not None:
+                shard.move_to_end(key)
+            else:
+                # An evicted partition still in use is taken back, so no key
+                # ever has two stores open on the same files
+                entry = evicted.pop(key, None)
+                if entry is None:
+                    if not create and not (self.exists and self.exists(key)):
+                        return EMPTY_NOTES
+                    entry = _OpenPartition(self.make_partition(key))
+                shard[key] = entry
+                while self._shard_max and len(shard) > self._shard_max:
+                    old_key, old_entry = shard.popitem(last=False)
+                    if old_entry.pins:
+                        evicted[old_key] = old_entry
+                    else:
+                        self.close_partition(old_key, old_entry.store)
+            entry.pins += 1
+            return entry.store
+
+    def release(self, key, store):
+        """Unpin a store returned by `acquire`."""
+        if store is EMPTY_NOTES:
+            return
+        shard_no = hash(key) % len(self._shards)
+        evicted = self._evicted[shard_no]
+        with self._shard_locks[shard_no]:
+            entry = self._shards[shard_no].get(key) or evicted.get(key)
+            if entry is None or entry.store is not store:
+                return
+            entry.pins -= 1
+            if not entry.pins and evicted.get(key) is entry:
+                del evicted[key]
+                self.close_partition(key, store)
+
+    @contextlib.contextmanager
+    def partition(self, key, create=False):
+        """`acquire` and `release` around a block."""
+        store = self.acquire(key, create)
+        try:
+            yield store
+        finally:
+            self.release(key, store)
+
+
+STORE_BACKENDS = {
+    'memory': MemoryNoteStore,
+    'log': LogNoteStore,
+    'sqlite': SqliteNoteStore,
+}
+PARTITIONS_DIR = 'users'
+# Files an open store keeps open: the log, or the database, -wal and -shm
+# files of an idle sqlite connection
+STORE_OPEN_FILES = {'memory': 0, 'log': 1, 'sqlite': 3}
+# Files of the single store kept at the top of NOTES_DATA_DIR before partitioning
+UNPARTITIONED_FILES = (LogNoteStore.LOG_NAME, LogNoteStore.SNAPSHOT_NAME, SqliteNoteStore.FILE_NAME,
+                       SqliteNoteStore.FILE_NAME + '-wal', SqliteNoteStore.FILE_NAME + '-shm')
+MIGRATION_MARKER = 'partitioned'
+
+
+def note_store_backend(backend=None):
+    """`backend`, or the NOTES_STORE_BACKEND env var ('log' if unset)."""
+    backend = backend or os.getenv('NOTES_STORE_BACKEND', 'log')
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown note store backend '{backend}'. Choose one of: {', '.join(STORE_BACKENDS)}")
+    return backend
+
+
+def open_partitions_max(backend=None, cap=1024, share=0.5):
+    """
+    How many partitions of `backend` can be open at once within `share` of
+    the process's open-file limit (the rest is left for sockets and the
+    files of requests in flight), at most `cap`. None for no limit.
+    """
+    files = STORE_OPEN_FILES[note_store_backend(backend)]
+    if not files:
+        return None
+    soft_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0] if resource else 512  # The C runtime's default
+    if soft_limit < 0:  # RLIM_INFINITY
+        return cap
+    return max(1, min(cap, int(soft_limit * share) // files))
+
+
+def partition_dir(partition, data_dir=None):
+    """Where the log and sqlite backends keep a partition's files."""
+    return os.path.join(data_dir or os.getenv('NOTES_DATA_DIR', 'data'), PARTITIONS_DIR, partition)
+
+
+def partition_exists(partition, data_dir=None):
+    return os.path.isdir(partition_dir(partition, data_dir))
+
+
+def create_note_store(backend=None, partition=None, **options):
+    """
+    Build the configured note store.
+    Backend defaults to the NOTES_STORE_BACKEND env var ('log' if unset); the
+    log and sqlite backends keep their files in NOTES_DATA_DIR (default: ./data),
+    under users/<partition>/ for a partition's store.
+    Only 'sqlite' can be shared by several worker processes.
+    """
+    backend = note_store_backend(backend)
+    if backend in ('log', 'sqlite'):
+        options.setdefault('data_dir', os.getenv('NOTES_DATA_DIR', 'data'))
+        if partition is not None:
+            options['data_dir'] = partition_dir(partition, options['data_dir'])
+    return STORE_BACKENDS[backend](**options)
+
+
+def migrate_unpartitioned_notes(data_dir=None):
+    """
+    Move the store kept at the top of `data_dir` (NOTES_DATA_DIR) by versions
+    before partitioning into a partition of its own with a new key, once.
+    Returns the key, or None if there was nothing to move or another process
+    is moving it.
+    """
+    data_dir = data_dir or os.getenv('NOTES_DATA_DIR', 'data')
+    names = [name for name in UNPARTITIONED_FILES if os.path.exists(os.path.join(data_dir, name))]
+    if not names:
+        return None
+    key = uuid.uuid4().hex
+    try:
+        # Only the first worker to create the marker moves the files
+        with open(os.path.join(data_dir, MIGRATION_MARKER), 'x', encoding='utf-8') as f:
+            f.write(key)
+    except FileExistsError:
+        return None
+    target = partition_dir(key, data_dir)
+    os.makedirs(target)
+    for name in names:
+        os.replace(os.path.join(data_dir, name), os.path.join(target, name))
+    return key
@@ -1,42 +1,71 @@
+import math
+
 import streamlit as st
-import pandas as pd
+
+from dashboard_data import CRS_PATH, CURRENT_USER, data_version, filter_crs, filter_options, format_date, load_crs
+from graph_view import current_graph, show_graph, show_linked_content
+from timeline_view import current_timeline, show_timeline
+
+LINKED_KINDS = ["Confluence", "Outlook", "JIRA", "CRs"]
+PAGE_SIZE = 20
+
+
+def show_details(cr):
+    """The sections of an opened CR tile; skipped for closed ones."""
+    graph = current_graph()
+
+    st.subheader("AI Summary")
+    st.info(f"This is an AI-generated summary for {cr['ID']}.")
+
+    st.subheader("Linked Content")
+    show_linked_content(graph, f"CRs:{cr['ID']}", LINKED_KINDS)
+
+    st.subheader("Timeline")
+    show_timeline(current_timeline(), graph, f"CRs:{cr['ID']}")
+
+    st.subheader("Graph View")
+    show_graph(graph, f"CRs:{cr['ID']}")
+
 
 def show():
     st.header("Team Dashboard")
 
+    version = data_version(CRS_PATH)
+    crs = load_crs(CRS_PATH, version)
+
     # Filters
     with st.sidebar:
         st.subheader("Filters")
-        sprint = st.selectbox("Sprint", ["Sprint 1", "Sprint 2"])
-        team = st.selectbox("Team", ["Team Alpha", "Team Beta"])
+        sprint = st.selectbox("Sprint", filter_options(crs, "Sprint"))
+        team = st.selectbox("Team", filter_options(crs, "Team"))
         task_view = st.radio("View", ["My Tasks", "Team Tasks"])
 
-    # Sample data
-    data = [
-        {"ID": "CR-123", "Title": "Fix API", "Status": "In Review", "Owner": "Alice", "Scheduled Date": "2024-06-01"},
-        {"ID": "CR-124", "Title": "Migrate DB", "Status": "Pending", "Owner": "Bob", "Scheduled Date": "2024-06-02"},
-        {"ID": "CR-125", "Title": "Implement OAuth", "Status": "Approved", "Owner": "Charlie", "Scheduled Date": "2024-06-03"},
-    ]
+    owner = None
+    if task_view == "My Tasks":
+        if CURRENT_USER:
+            owner = CURRENT_USER
+        else:
+            st.caption("Showing all team tasks: set GRAPHRAG_USER to your name in the Owner column to see only yours.")
+    selected = filter_crs(CRS_PATH, version, sprint, team, owner)
+    if selected.empty:
+        st.write("No CRs match these filters.")
+        return
+
+    # One page of tiles per rerun; the page resets when the filters change
+    pages = math.ceil(len(selected) / PAGE_SIZE)
+    page = 1
+    if pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=pages, key=f"page:{sprint}:{team}:{task_view}")
+    start = (page - 1) * PAGE_SIZE
+    shown = selected.iloc[start:start + PAGE_SIZE]
+    st.caption(f"CRs {start + 1}-{start + len(shown)} of {len(selected)}")
 
     # Display expandable tiles
-    for cr in data:
-        with st.expander(f"{cr['ID']} — {cr['Title']}", expanded=False):
+    for row, cr in zip(shown.index, shown.to_dict('records')):
+        tile = st.expander(f"{cr['ID']} — {cr['Title']}", key=f"cr:{row}", on_change="rerun")
+        with tile:
             st.markdown(f"**Status:** {cr['Status']}")
             st.markdown(f"**Owner:** {cr['Owner']}")
-            st.markdown(f"**Scheduled Date:** {cr['Scheduled Date']}")
-
-            st.subheader("AI Summary")
-            st.info(f"This is an AI-generated summary for {cr['ID']}.")
-
-            st.subheader("Linked Content")
-            sub_tabs = st.tabs(["Confluence", "Outlook", "JIRA", "CRs"])
-            for tab in sub_tabs:
-                with tab:
-                    st.markdown(f"**Linked items from {tab.label}**")
-                    st.write("...")
-
-            st.subheader("Timeline")
-            st.write("Timeline for this CR would appear here.")
-
-            st.subheader("Graph View")
-            st.write("Graph of linked entities.")
\ No newline at end of file
+            st.markdown(f"**Scheduled Date:** {format_date(cr['Scheduled Date'])}")
+            if tile.open:
+                show_details(cr)
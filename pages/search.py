@@ -1,27 +1,96 @@
+import os
+
 import streamlit as st
 
+from graph_view import current_graph, find_node, show_graph
+from retrieval import DEFAULT_INDEX_DIR, META_NAME, SOURCES, HybridIndex
+from timeline_view import current_timeline, show_timeline
+
+INDEX_DIR = os.environ.get('GRAPHRAG_INDEX_DIR', DEFAULT_INDEX_DIR)
+RESULTS_PER_TAB = 10
+SNIPPET_CHARS = 300
+
+
+def index_version(index_dir):
+    """Changes whenever the index is rebuilt (None: not built yet); part of every cache key below."""
+    try:
+        return os.stat(os.path.join(index_dir, META_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(max_entries=1)
+def load_index(index_dir, version):
+    # Opening only maps the files, and the one instance is shared by every session
+    return HybridIndex(index_dir)
+
+
+@st.cache_data(max_entries=1000, ttl=3600, show_spinner=False)
+def search(index_dir, version, query, source, team, k=RESULTS_PER_TAB):
+    return load_index(index_dir, version).search(query, k, source=source, team=team)
+
+
+def show_results(results):
+    if not results:
+        st.write("No matches.")
+    for result in results:
+        title = result.get('title') or result.get('id', 'Untitled')
+        st.markdown(f"**[{title}]({result['url']})**" if result.get('url') else f"**{title}**")
+        st.caption(" · ".join(filter(None, (result.get('source'), result.get('team')))))
+        text = result.get('text', '')
+        st.write(text[:SNIPPET_CHARS] + ("..." if len(text) > SNIPPET_CHARS else ""))
+
+
+def graph_node(graph, query, results):
+    """The entity to draw: the one the query names, else the best result's."""
+    node = find_node(graph, query)
+    if node is None:
+        names = (f"{result.get('source')}:{result.get('id')}" for result in results)
+        node = next((name for name in names if graph.node_id(name) is not None), None)
+    return node
+
+
 def show():
     st.header("Search")
 
+    version = index_version(INDEX_DIR)
+    index = None if version is None else load_index(INDEX_DIR, version)
+
     col1, col2 = st.columns([4, 1])
     with col1:
         query = st.text_input("Search", placeholder="Enter CR/JIRA/Keyword")
     with col2:
         search_mode = st.selectbox("Search Scope", ["Global", "Team"])
+    team = None
+    if search_mode == "Team":
+        team = st.selectbox("Team", index.teams if index else [])
 
     if query:
         st.subheader("AI Summary")
         st.info(f"This is an AI-generated summary for: {query}")
 
         st.subheader("Linked Content")
-        sub_tabs = st.tabs(["All", "Confluence", "Outlook", "JIRA", "CRs"])
-        for sub_tab in sub_tabs:
-            with sub_tab:
-                st.markdown(f"**Results from {sub_tab.label}**")
-                st.write("...")
+        results = []
+        if index is None:
+            st.info(f"No search index in {INDEX_DIR} yet. Build one with: "
+                    f"python retrieval.py build chunks.jsonl --index-dir {INDEX_DIR}")
+        else:
+            labels = ["All", *SOURCES]
+            for label, sub_tab in zip(labels, st.tabs(labels)):
+                with sub_tab:
+                    st.markdown(f"**Results from {label}**")
+                    show_results(search(INDEX_DIR, version, query, None if label == "All" else label, team))
+            results = search(INDEX_DIR, version, query, None, team)
+
+        graph = current_graph()
+        node = graph and graph_node(graph, query, results)
 
         st.subheader("Timeline")
-        st.write("Interactive timeline would appear here.")
+        show_timeline(current_timeline(), graph, node)
 
         st.subheader("Graph View")
-        st.write("Graph visualization component goes here.")
\ No newline at end of file
+        if node:
+            st.caption(f"Entities linked to {node}")
+            show_graph(graph, node)
+        else:
+            st.write("No linked entities.")
@@ -0,0 +1,423 @@
+"""
+Hybrid retrieval for the GraphRAG Search page: BM25 over an inverted index plus dense-vector similarity.
+
+Build an index from a JSONL file of chunks, one {"id", "source", "team",
+"title", "text", "url"} object per line (source is one of SOURCES):
+    python retrieval.py build chunks.jsonl [--index-dir data/search_index] [--dim 128]
+    python retrieval.py search "query" [--source JIRA] [--team "Team Alpha"]
+
+Everything is written once to a directory of .npy files and opened with
+memory maps, so opening an index costs milliseconds whatever its size and
+the corpus is paged in by the OS rather than loaded into the heap:
+  - rows (chunks) are ordered by (team, source), so every source and
+    Global/Team filter is a few contiguous row ranges that both indexes
+    scan directly, instead of filtering the results afterwards
+  - BM25 postings are CSR arrays (per-term offsets into doc and weight
+    arrays, docs ascending) under a sorted, binary-searched vocabulary; the
+    weight is the BM25 term-frequency part, computed at build time, so a
+    query only multiplies it by each term's idf
+  - embeddings are an (n, dim) float32 matrix of unit vectors, scored a
+    block of rows at a time with one matrix product per block
+Results of the two are combined by reciprocal rank fusion.
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from search_index import B, K1, tokenize
+
+SOURCES = ('Confluence', 'Outlook', 'JIRA', 'CRs')
+DEFAULT_INDEX_DIR = os.path.join('data', 'search_index')
+DEFAULT_DIM = 128
+MAX_TERM_BYTES = 32  # Longer terms are cut to this many bytes (the vocabulary is fixed width)
+HASHES_PER_TERM = 2
+BUILD_BATCH = 65536  # Chunks tokenized and embedded at a time while building
+SCAN_BLOCK_ROWS = 65536  # Embedding rows per matrix product
+DENSE_SCAN_RATIO = 8  # BM25 picks from every row in range once postings matched reach 1/8 of them
+CANDIDATES = 100  # Results taken from each index before fusing
+RRF_K = 60
+OPENAI_BATCH = 1000  # Texts per embeddings request
+
+META_NAME = 'meta.json'
+CHUNKS_NAME = 'chunks.jsonl'
+ARRAY_NAMES = ('vocabulary', 'term_offsets', 'posting_docs', 'posting_weights', 'embeddings', 'cell_offsets',
+               'chunk_offsets')
+
+
+def index_terms(text):
+    """Terms of `text` as they are stored in the vocabulary (UTF-8, at most MAX_TERM_BYTES)."""
+    return [token.encode('utf-8')[:MAX_TERM_BYTES] for token in tokenize(text)]
+
+
+def chunk_text(chunk):
+    return f"{chunk.get('title', '')} {chunk.get('text', '')}"
+
+
+def top_k(scores, k):
+    """Positions of the `k` largest scores, largest first."""
+    if len(scores) > k:
+        positions = np.argpartition(scores, -k)[-k:]
+    else:
+        positions = np.arange(len(scores))
+    return positions[np.argsort(-scores[positions], kind='stable')]
+
+
+# --- Embedders ---
+
+
+class HashingEmbedder:
+    """
+    Embeds text by feature hashing: every term adds +-1 to HASHES_PER_TERM of
+    the `dim` coordinates, picked by a hash of the term, and the sums are
+    scaled to unit length. It needs no model or network, so indexes can be
+    built offline; texts that share terms end up close, synonyms don't (use
+    OpenAIEmbedder for that).
+    """
+
+    def __init__(self, dim=DEFAULT_DIM):
+        self.dim = dim
+        self.spec = {"kind": "hashing", "dim": dim}
+        self._lock = threading.Lock()
+        self._term_ids = {}
+        # Term id -> its coordinates and signs; grown by doubling, and a row
+        # is written before its term id is published
+        self._coordinates = np.empty((1024, HASHES_PER_TERM), dtype=np.int64)
+        self._signs = np.empty((1024, HASHES_PER_TERM), dtype=np.float32)
+
+    def embed(self, texts):
+        return self.embed_terms([index_terms(text) for text in texts])
+
+    def embed_terms(self, term_lists):
+        """Like `embed`, for texts already split by `index_terms` (saves tokenizing twice while building)."""
+        lengths, ids = [], []
+        for terms in term_lists:
+            lengths.append(len(terms))
+            ids.extend(map(self._term_id, terms))
+        coordinates, signs = self._coordinates[ids], self._signs[ids]
+        rows = np.repeat(np.arange(len(term_lists)), lengths)
+        flat = (rows[:, None] * self.dim + coordinates).ravel()
+        vectors = np.bincount(flat, weights=signs.ravel(), minlength=len(term_lists) * self.dim)
+        return normalize(vectors.reshape(len(term_lists), self.dim).astype(np.float32))
+
+    def _term_id(self, term):
+        term_id = self._term_ids.get(term)
+        if term_id is not None:
+            return term_id
+        digest = int.from_bytes(hashlib.blake2b(term, digest_size=8).digest(), 'little')
+        with self._lock:
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = len(self._term_ids)
+                if term_id == len(self._coordinates):
+                    self._coordinates = np.concatenate([self._coordinates, np.empty_like(self._coordinates)])
+                    self._signs = np.concatenate([self._signs, np.empty_like(self._signs)])
+                for n in range(HASHES_PER_TERM):
+                    bits = digest >> (20 * n)
+                    self._coordinates[term_id, n] = (bits >> 1) % self.dim
+                    self._signs[term_id, n] = 1.0 if bits & 1 else -1.0
+                self._term_ids[term] = term_id
+        return term_id
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API (needs OPENAI_API_KEY)."""
+
+    def __init__(self, model='text-embedding-3-small', dim=256):
+        import openai  # Only when used: importing it takes a noticeable part of a second
+        self.client = openai.OpenAI()
+        self.model = model
+        self.dim = dim
+        self.spec = {"kind": "openai", "model": model, "dim": dim}
+
+    def embed(self, texts):
+        texts = list(texts)
+        vectors = []
+        for start in range(0, len(texts), OPENAI_BATCH):
+            response = self.client.embeddings.create(model=self.model, input=texts[start:start + OPENAI_BATCH],
+                                                     dimensions=self.dim)
+            vectors.extend(item.embedding for item in response.data)
+        return normalize(np.array(vectors, dtype=np.float32).reshape(len(texts), self.dim))
+
+
+def embedder_from_spec(spec):
+    if spec['kind'] == 'openai':
+        return OpenAIEmbedder(spec['model'], spec['dim'])
+    return HashingEmbedder(spec['dim'])
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# --- Building ---
+
+
+def build_index(index_dir, chunks, embedder=None):
+    """
+    Indexes `chunks` (a sequence of dicts) into `index_dir`. The files are
+    written to a new directory that then replaces the old one, so processes
+    that still have the old index open keep reading it undisturbed.
+    """
+    embedder = embedder or HashingEmbedder()
+    count = len(chunks)
+    if not count:
+        raise ValueError("No chunks to index")
+    source_numbers = {source: number for number, source in enumerate(SOURCES)}
+    chunk_teams, chunk_sources = [], np.empty(count, dtype=np.int64)
+    for position, chunk in enumerate(chunks):
+        if chunk.get('source') not in source_numbers:
+            raise ValueError(f"Chunk {chunk.get('id')!r} has source {chunk.get('source')!r}; "
+                             f"expected one of: {', '.join(SOURCES)}")
+        chunk_teams.append(chunk.get('team') or '')
+        chunk_sources[position] = source_numbers[chunk['source']]
+    teams, team_numbers = np.unique(np.array(chunk_teams, dtype=object), return_inverse=True)
+    teams = teams.tolist()
+    cells = team_numbers.astype(np.int64) * len(SOURCES) + chunk_sources
+    order = np.argsort(cells, kind='stable')  # Row -> position in `chunks`
+    cell_offsets = np.searchsorted(cells[order], np.arange(len(teams) * len(SOURCES) + 1))
+
+    build_dir = index_dir.rstrip(os.sep) + '.building'
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    embeddings = np.lib.format.open_memmap(os.path.join(build_dir, 'embeddings.npy'), mode='w+',
+                                           dtype=np.float32, shape=(count, embedder.dim))
+    doc_lengths = np.empty(count, dtype=np.uint32)
+    chunk_offsets = np.empty(count + 1, dtype=np.int64)
+    term_numbers = {}  # term -> id in order of first appearance; sorted at the end
+    postings = []  # (docs, term ids, term frequencies) per batch, docs ascending
+    offset = 0
+    with open(os.path.join(build_dir, CHUNKS_NAME), 'wb') as chunk_file:
+        for start in range(0, count, BUILD_BATCH):
+            rows = range(start, min(start + BUILD_BATCH, count))
+            batch = [chunks[position] for position in order[rows.start:rows.stop]]
+            texts = [chunk_text(chunk) for chunk in batch]
+            term_lists = [index_terms(text) for text in texts]
+            term_ids = []
+            for row, terms in zip(rows, term_lists):
+                doc_lengths[row] = len(terms)
+                term_ids.extend(term_numbers.setdefault(term, len(term_numbers)) for term in terms)
+            docs = np.repeat(np.arange(rows.start, rows.stop, dtype=np.int64), doc_lengths[rows.start:rows.stop])
+            keys, tfs = np.unique(docs * (1 << 32) + np.array(term_ids, dtype=np.int64), return_counts=True)
+            postings.append((keys >> 32, keys & 0xffffffff, tfs))
+            if hasattr(embedder, 'embed_terms'):
+                embeddings[rows.start:rows.stop] = embedder.embed_terms(term_lists)
+            else:
+                embeddings[rows.start:rows.stop] = embedder.embed(texts)
+            for row, chunk in zip(rows, batch):
+                line = json.dumps(chunk, separators=(',', ':')).encode('utf-8') + b'\n'
+                chunk_file.write(line)
+                chunk_offsets[row] = offset
+                offset += len(line)
+    chunk_offsets[count] = offset
+    embeddings.flush()
+    del embeddings
+
+    # Number the terms in sorted order, then group the postings by term
+    terms = np.array(list(term_numbers), dtype=f'S{MAX_TERM_BYTES}')
+    term_order = np.argsort(terms, kind='stable')
+    renumber = np.empty(len(terms), dtype=np.int64)
+    renumber[term_order] = np.arange(len(terms))
+    posting_docs = np.concatenate([docs for docs, _, _ in postings])
+    posting_terms = renumber[np.concatenate([term_ids for _, term_ids, _ in postings])]
+    posting_tfs = np.concatenate([tfs for _, _, tfs in postings]).astype(np.float32)
+    average_length = float(doc_lengths.mean())
+    length_norm = K1 * (1 - B + B * doc_lengths[posting_docs] / average_length)
+    posting_weights = posting_tfs * (K1 + 1) / (posting_tfs + length_norm)
+    by_term = np.argsort(posting_terms, kind='stable')  # Stable: docs stay ascending within a term
+    arrays = {
+        'vocabulary': terms[term_order],
+        'term_offsets': np.searchsorted(posting_terms[by_term], np.arange(len(terms) + 1)),
+        'posting_docs': posting_docs[by_term].astype(np.uint32),
+        'posting_weights': posting_weights[by_term].astype(np.float32),
+        'cell_offsets': cell_offsets,
+        'chunk_offsets': chunk_offsets,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(build_dir, f'{name}.npy'), array)
+    with open(os.path.join(build_dir, META_NAME), 'w') as f:
+        json.dump({"count": count, "sources": SOURCES, "teams": teams, "embedder": embedder.spec,
+                   "average_length": average_length, "built_at": time.time()}, f, indent=2)
+
+    old_dir = index_dir.rstrip(os.sep) + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(index_dir):
+        os.replace(index_dir, old_dir)
+    os.replace(build_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# --- Searching ---
+
+
+class HybridIndex:
+    """A built index, memory-mapped from `index_dir`. Safe to share between threads."""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, embedder=None):
+        with open(os.path.join(index_dir, META_NAME)) as f:
+            meta = json.load(f)
+        self.index_dir = index_dir
+        self.count = meta['count']
+        self.teams = meta['teams']
+        self.built_at = meta['built_at']
+        self.embedder = embedder or embedder_from_spec(meta['embedder'])
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r'))
+        with open(os.path.join(index_dir, CHUNKS_NAME), 'rb') as f:
+            self._chunks = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.count
+
+    def search(self, query, k=10, source=None, team=None, candidates=CANDIDATES):
+        """
+        Top `k` chunks for `query`, best first, as the stored chunk dicts plus
+        "score" and the chunk's rank in each index ("bm25_rank",
+        "vector_rank"; None where it wasn't a candidate). `source` limits the
+        search to one of SOURCES and `team` to one team's chunks.
+        """
+        ranges = self.row_ranges(source, team)
+        if not tokenize(query) or not ranges:
+            return []
+        bm25_rows, _ = self.bm25_top_k(query, ranges, candidates)
+        vector_rows, vector_scores = self.vector_top_k(self.embedder.embed([query]), ranges, candidates)
+        vector_rows = vector_rows[0][vector_scores[0] > 0]  # Nothing in common with the query
+        fused = {}
+        for index_name, rows in (('bm25_rank', bm25_rows), ('vector_rank', vector_rows)):
+            for rank, row in enumerate(rows.tolist(), 1):
+                entry = fused.setdefault(row, {"score": 0.0, "bm25_rank": None, "vector_rank": None})
+                entry["score"] += 1 / (RRF_K + rank)
+                entry[index_name] = rank
+        best = heapq.nlargest(k, fused.items(), key=lambda item: item[1]["score"])
+        return [dict(self.chunk(row), **entry) for row, entry in best]
+
+    def row_ranges(self, source=None, team=None):
+        """The (start, stop) row ranges holding the chunks of `source` and `team` (None: all)."""
+        if source is not None and source not in SOURCES:
+            raise ValueError(f"Unknown source {source!r}; expected one of: {', '.join(SOURCES)}")
+        if team is None:
+            team_numbers = range(len(self.teams))
+        else:
+            team_numbers = [self.teams.index(team)] if team in self.teams else []
+        source_numbers = range(len(SOURCES)) if source is None else [SOURCES.index(source)]
+        ranges = []
+        for team_number in team_numbers:
+            for source_number in source_numbers:
+                cell = team_number * len(SOURCES) + source_number
+                start, stop = int(self.cell_offsets[cell]), int(self.cell_offsets[cell + 1])
+                if start == stop:
+                    continue
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], stop)
+                else:
+                    ranges.append((start, stop))
+        return ranges
+
+    def bm25_top_k(self, query, ranges, k):
+        """(rows, scores) of the `k` best BM25 matches for `query` within `ranges`."""
+        scores = np.zeros(self.count, dtype=np.float32)
+        matched = []
+        for term_id in self._term_ids(index_terms(query)):
+            start, stop = int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+            docs = self.posting_docs[start:stop]
+            idf = math.log(1 + (self.count - (stop - start) + 0.5) / (stop - start + 0.5))
+            for low, high in ranges:
+                first, last = np.searchsorted(docs, (low, high))
+                if first == last:
+                    continue
+                rows = docs[first:last]
+                scores[rows] += idf * self.posting_weights[start + first:start + last]
+                matched.append(rows)
+        if not matched:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(matched) == 1:  # One term's rows are distinct already
+            rows = matched[0].astype(np.int64)
+        elif sum(map(len, matched)) * DENSE_SCAN_RATIO < sum(high - low for low, high in ranges):
+            rows = np.unique(np.concatenate(matched)).astype(np.int64)
+        else:  # Common terms: deduplicating would cost more than scanning every row in range
+            rows = np.concatenate([np.arange(low, high) for low, high in ranges])
+        best = top_k(scores[rows], k)
+        best = best[scores[rows[best]] > 0]
+        return rows[best], scores[rows[best]]
+
+    def vector_top_k(self, vectors, ranges, k):
+        """
+        (rows, scores), each of shape (len(vectors), <= k): the chunks most
+        similar to each query vector within `ranges`, best first.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        found_rows, found_scores = [], []
+        for low, high in ranges:
+            for start in range(low, high, SCAN_BLOCK_ROWS):
+                scores = vectors @ self.embeddings[start:min(start + SCAN_BLOCK_ROWS, high)].T
+                if scores.shape[1] > k:
+                    best = np.argpartition(scores, -k, axis=1)[:, -k:]
+                    scores = np.take_along_axis(scores, best, axis=1)
+                else:
+                    best = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+                found_rows.append(best + start)
+                found_scores.append(scores)
+        if not found_rows:
+            empty = np.empty((len(vectors), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        rows, scores = np.concatenate(found_rows, axis=1), np.concatenate(found_scores, axis=1)
+        best = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(rows, best, axis=1), np.take_along_axis(scores, best, axis=1)
+
+    def chunk(self, row):
+        start, stop = int(self.chunk_offsets[row]), int(self.chunk_offsets[row + 1])
+        return json.loads(self._chunks[start:stop])
+
+    def _term_ids(self, terms):
+        if not terms or not len(self.vocabulary):
+            return []
+        wanted = np.unique(np.array(terms, dtype=f'S{MAX_TERM_BYTES}'))
+        positions = np.minimum(np.searchsorted(self.vocabulary, wanted), len(self.vocabulary) - 1)
+        return positions[self.vocabulary[positions] == wanted].tolist()
+
+
+def read_chunks(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="index a JSONL file of chunks")
+    build.add_argument('chunks')
+    build.add_argument('--index-dir', default=DEFAULT_INDEX_DIR)
+    build.add_argument('--dim', type=int, default=DEFAULT_DIM)
+    build.add_argument('--openai-model', help="embed with this OpenAI model instead of feature hashing")
+    search = commands.add_parser('search', help="query a built index")
+    search.add_argument('query')
+    search.add_argument('--index-dir', default=DEFAULT_INDEX_DIR)
+    search.add_argument('--source', choices=SOURCES)
+    search.add_argument('--team')
+    search.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        embedder = OpenAIEmbedder(args.openai_model, args.dim) if args.openai_model else HashingEmbedder(args.dim)
+        started = time.perf_counter()
+        chunks = read_chunks(args.chunks)
+        build_index(args.index_dir, chunks, embedder)
+        print(f"Indexed {len(chunks)} chunks into {args.index_dir} in {time.perf_counter() - started:.1f} s")
+    else:
+        index = HybridIndex(args.index_dir)
+        for hit in index.search(args.query, args.k, args.source, args.team):
+            print(f"{hit['score']:.4f}  [{hit['source']}] {hit.get('title', '')}  "
+                  f"(bm25 #{hit['bm25_rank']}, vector #{hit['vector_rank']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# scripts/code_units.py
+
+import ast
+import textwrap
+from collections import namedtuple
+
+# kind is 'function', 'class', 'class-outline' or 'method'; parent is the
+# enclosing class name for methods. signature is what the docs display,
+# e.g. "load(path: str) -> dict" or "Store(Base)".
+CodeUnit = namedtuple('CodeUnit', 'kind name signature source parent')
+
+# Classes longer than this are documented as an outline plus one unit per method
+MAX_UNIT_CHARS = 12000
+# Module-level code sent along for the file overview
+MAX_OVERVIEW_CHARS = 6000
+TRUNCATION_MARKER = "\n# [REST OF THIS BLOCK TRUNCATED DUE TO LENGTH]"
+
+
+def display_signature(node):
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(base) for base in node.bases + node.keywords]
+        return f"{node.name}({', '.join(bases)})" if bases else node.name
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{node.name}({ast.unparse(node.args)}){returns}"
+
+
+def split_into_units(source):
+    """
+    Splits Python source into documentation units: one per top-level function
+    and class (large classes become an outline plus one unit per method).
+    Returns (overview_source, units), where overview_source is the module
+    docstring, the module-level code outside those definitions and a list of
+    the symbols, for the file overview. Raises SyntaxError for unparseable source.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    units = []
+    module_code = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            units.append(CodeUnit('function', node.name, display_signature(node),
+                                  _limit(_node_source(lines, node), MAX_UNIT_CHARS), None))
+        elif isinstance(node, ast.ClassDef):
+            units.extend(_class_units(lines, node))
+        else:
+            module_code.append(_node_source(lines, node))
+
+    symbols = [f"# {unit.kind} {unit.signature}" for unit in units if unit.kind != 'method']
+    overview_source = "\n".join(module_code + [""] + symbols).strip()
+    return _limit(overview_source, MAX_OVERVIEW_CHARS), units
+
+
+def _class_units(lines, node):
+    source = _node_source(lines, node)
+    if len(source) <= MAX_UNIT_CHARS:
+        return [CodeUnit('class', node.name, display_signature(node), source, None)]
+
+    # Too big for one request: the class body with method bodies left out,
+    # then each method on its own
+    # The decorators and the whole header, however many lines it takes
+    outline = lines[_first_line(node) - 1:max(_first_line(node.body[0]) - 1, node.lineno)]
+    methods = []
+    for child in node.body:
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            prefix = 'async def' if isinstance(child, ast.AsyncFunctionDef) else 'def'
+            outline.extend(f"    @{ast.unparse(decorator)}" for decorator in child.decorator_list)
+            outline.append(f"    {prefix} {display_signature(child)}: ...")
+            methods.append(CodeUnit('method', child.name, display_signature(child),
+                                    _limit(textwrap.dedent(_node_source(lines, child)), MAX_UNIT_CHARS),
+                                    node.name))
+        else:
+            outline.append(_node_source(lines, child))
+    outline_unit = CodeUnit('class-outline', node.name, display_signature(node),
+                            _limit("\n".join(outline), MAX_UNIT_CHARS), None)
+    return [outline_unit] + methods
+
+
+def _first_line(node):
+    # Decorators belong to the definition
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', ())])
+
+
+def _node_source(lines, node):
+    return "\n".join(lines[_first_line(node) - 1:node.end_lineno])
+
+
+def _limit(text, max_chars):
+    return text if len(text) <= max_chars else text[:max_chars] + TRUNCATION_MARKER
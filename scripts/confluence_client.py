@@ -0,0 +1,229 @@
+# scripts/confluence_client.py
+
+import time
+import hashlib
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from doc_pipeline import parse_retry_after, backoff_delay
+
+# Content property holding the fingerprint of the last published body
+FINGERPRINT_PROPERTY = "doc-fingerprint"
+SEARCH_PAGE_SIZE = 100
+MAX_ATTEMPTS = 5
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def fingerprint(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ConfluenceClient:
+    """
+    Confluence REST client for publishing generated pages.
+
+    All calls go through one pooled requests.Session (connections and TLS
+    sessions are reused), are paced by an optional rate limiter and retried on
+    429/5xx after the server's Retry-After. load_children() resolves the IDs,
+    versions and fingerprints of every page under a parent with a few paginated
+    CQL searches, after which publish() needs no lookups and skips the update
+    entirely when the page's fingerprint property matches.
+    """
+
+    def __init__(self, base_url, auth, space_key, limiter=None, pool_size=10, timeout=20):
+        self.base_url = base_url.rstrip('/')
+        self.space_key = space_key
+        self.limiter = limiter
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.headers.update({"Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._pages = {}  # title -> {'id', 'version', 'fingerprint', 'property_version'}
+        self._pages_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def request(self, method, path, **kwargs):
+        """Rate-limited, retried request against `path` under the base URL. Raises for HTTP errors."""
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(MAX_ATTEMPTS):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code not in RETRYABLE_STATUS or attempt == MAX_ATTEMPTS - 1:
+                response.raise_for_status()
+                return response
+            delay = backoff_delay(attempt, parse_retry_after(response.headers.get('Retry-After')))
+            print(f"Confluence returned {response.status_code} for {method} {path}, retrying in {delay:.1f}s")
+            if self.limiter is not None:
+                self.limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+    # --- Page lookups ---
+
+    def load_children(self, parent_id):
+        """Caches every page below `parent_id` (paginated CQL search). Returns the number found."""
+        params = {
+            "cql": f'ancestor = {parent_id} and type = page and space = "{self.space_key}"',
+            "expand": f"version,metadata.properties.{FINGERPRINT_PROPERTY}",
+            "limit": SEARCH_PAGE_SIZE,
+            "start": 0,
+        }
+        found = 0
+        while True:
+            data = self.request('GET', "/rest/api/content/search", params=params).json()
+            results = data.get('results', [])
+            for page in results:
+                self._remember(page)
+            found += len(results)
+            if not results or 'next' not in data.get('_links', {}):
+                return found
+            params["start"] += len(results)
+
+    def find_page(self, title):
+        """Cached page info for `title`, looking it up if it was not loaded in bulk. None if missing."""
+        with self._pages_lock:
+            page = self._pages.get(title)
+        if page is not None:
+            return page
+        data = self.request('GET', "/rest/api/content", params={
+            "spaceKey": self.space_key, "title": title, "limit": 1,
+            "expand": f"version,metadata.properties.{FINGERPRINT_PROPERTY}",
+        }).json()
+        results = data.get('results', [])
+        return self._remember(results[0]) if results else None
+
+    # --- Publishing ---
+
+    def publish(self, title, storage_html, parent_id=None, content_fingerprint=None):
+        """
+        Creates or updates the page `title` with `storage_html`. Returns
+        (page, action): the cached page info ('id', 'version', 'webui', ...)
+        and one of 'created', 'updated' or 'unchanged'.
+        `content_fingerprint` defaults to a hash of `storage_html`; pass one
+        computed without volatile parts (such as timestamps) so they alone
+        don't cause a new page version.
+        """
+        if content_fingerprint is None:
+            content_fingerprint = fingerprint(storage_html)
+        page = self.find_page(title)
+        if page is not None and page['fingerprint'] == content_fingerprint:
+            return page, 'unchanged'
+
+        page_data = {
+            "type": "page",
+            "title": title,
+            "space": {"key": self.space_key},
+            "body": {"storage": {"value": storage_html, "representation": "storage"}},
+        }
+        if parent_id:
+            page_data["ancestors"] = [{"id": str(parent_id)}]
+        if page is None:
+            # New pages get the fingerprint property in the same request
+            page_data["metadata"] = {"properties": {FINGERPRINT_PROPERTY: {"value": {"sha256": content_fingerprint}}}}
+            page = self._remember(self.request('POST', "/rest/api/content", json=page_data).json())
+            with self._pages_lock:
+                page['fingerprint'] = content_fingerprint
+                page['property_version'] = 1
+            return page, 'created'
+
+        page_data["id"] = page['id']
+        page_data["version"] = {"number": page['version'] + 1}
+        response = self.request('PUT', f"/rest/api/content/{page['id']}", json=page_data)
+        page = self._remember(response.json(), keep_properties_of=page)
+        self._set_fingerprint(page, content_fingerprint)
+        return page, 'updated'
+
+    def get_body(self, page_id):
+        """Current storage-format HTML of a page."""
+        data = self.request('GET', f"/rest/api/content/{page_id}", params={"expand": "body.storage"}).json()
+        return data.get('body', {}).get('storage', {}).get('value', '')
+
+    def rename_page(self, old_title, new_title, storage_html):
+        """Moves the page `old_title` to `new_title` in place (same ID and history). Returns the page or None."""
+        page = self.find_page(old_title)
+        if page is None:
+            return None
+        page_data = {
+            "id": page['id'],
+            "type": "page",
+            "title": new_title,
+            "space": {"key": self.space_key},
+            "version": {"number": page['version'] + 1},
+            "body": {"storage": {"value": storage_html, "representation": "storage"}},
+        }
+        response = self.request('PUT', f"/rest/api/content/{page['id']}", json=page_data)
+        with self._pages_lock:
+            self._pages.pop(old_title, None)
+        return self._remember(response.json(), keep_properties_of=page)
+
+    def archive_page(self, title):
+        """Archives the page `title`. Returns False if there is no such page."""
+        page = self.find_page(title)
+        if page is None:
+            return False
+        self.request('POST', "/rest/api/content/archive", json={"pages": [{"id": int(page['id'])}]})
+        with self._pages_lock:
+            self._pages.pop(title, None)
+        return True
+
+    # --- Content properties ---
+
+    def get_property(self, page_id, key):
+        """(value, version) of a content property, or (None, None) if it is not set."""
+        try:
+            data = self.request('GET', f"/rest/api/content/{page_id}/property/{key}").json()
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None, None
+            raise
+        return data.get('value'), data.get('version', {}).get('number', 1)
+
+    def set_property(self, page_id, key, value, version=None):
+        """Creates the property (version None) or updates it from `version`. Returns the new version."""
+        prop = {"key": key, "value": value}
+        if version is None:
+            response = self.request('POST', f"/rest/api/content/{page_id}/property", json=prop)
+        else:
+            prop["version"] = {"number": version + 1}
+            response = self.request('PUT', f"/rest/api/content/{page_id}/property/{key}", json=prop)
+        return response.json().get('version', {}).get('number', 1)
+
+    # --- Internals ---
+
+    def _set_fingerprint(self, page, content_fingerprint):
+        property_version = self.set_property(
+            page['id'], FINGERPRINT_PROPERTY, {"sha256": content_fingerprint}, page['property_version'])
+        with self._pages_lock:
+            page['fingerprint'] = content_fingerprint
+            page['property_version'] = property_version
+
+    def _remember(self, content, keep_properties_of=None):
+        prop = content.get('metadata', {}).get('properties', {}).get(FINGERPRINT_PROPERTY)
+        if prop:
+            value = prop.get('value') or {}
+            stored_fingerprint = value.get('sha256') if isinstance(value, dict) else None
+            property_version = prop.get('version', {}).get('number', 1)
+        elif keep_properties_of is not None:
+            stored_fingerprint = keep_properties_of['fingerprint']
+            property_version = keep_properties_of['property_version']
+        else:
+            stored_fingerprint, property_version = None, None
+        page = {
+            'id': str(content['id']),
+            'version': content.get('version', {}).get('number', 1),
+            'fingerprint': stored_fingerprint,
+            'property_version': property_version,
+            'webui': content.get('_links', {}).get('webui', ''),
+        }
+        with self._pages_lock:
+            self._pages[content['title']] = page
+        return page
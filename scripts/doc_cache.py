@@ -0,0 +1,77 @@
+# scripts/doc_cache.py
+
+import os
+import json
+import hashlib
+
+
+class DocCache:
+    """
+    On-disk cache of generated documentation, one Markdown file per entry.
+
+    Entries are keyed by a hash of everything that determines the OpenAI output
+    (the file content, the rendered prompt, the model and its settings), so an
+    unchanged file under an unchanged prompt never triggers a new request.
+    A hit refreshes the entry's modification time; `prune()` evicts the least
+    recently used entries until the cache fits in `max_bytes`.
+    The directory can be saved and restored between CI runs as a cache artifact.
+    """
+
+    def __init__(self, cache_dir, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(**parts):
+        """Stable key for the given request parameters (all must be JSON-serializable)."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)  # Mark as recently used
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits in max_bytes. Returns the number evicted."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.md'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        evicted = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.md")
@@ -1,11 +1,13 @@
 # scripts/doc_generator.py
 
 import os
+import re
 import sys
 import json
 import time
 import html
 import uuid  # For potential future use, not strictly needed for HTML conversion method
+from concurrent.futures import ThreadPoolExecutor
 
 # Attempt to import necessary libraries
 try:
@@ -27,10 +29,16 @@ except ImportError:
     print("markdown2 library not found. Please install it: pip install markdown2")
     sys.exit(1)
 
+from doc_cache import DocCache
+from doc_pipeline import TokenBucket, parse_retry_after, backoff_delay, run_pipeline
+from confluence_client import ConfluenceClient, fingerprint
+from code_units import split_into_units
+import git_changes
+
 # --- Configuration for Ignored Items ---
 IGNORED_FOLDERS = {
     "venv", "antenv", ".git", ".github", "__pycache__", "node_modules",
-    "build", "dist", "static", "templates", "scripts",
+    "build", "dist", "static", "templates", "scripts", "benchmarks", "data", ".doc_cache",
 }
 IGNORED_FILES = {
     ".gitignore", "LICENSE", "README.md", "requirements.txt", "Pipfile",
@@ -38,6 +46,110 @@ IGNORED_FILES = {
 }
 TARGET_EXTENSIONS = {".py", }
 
+# --- OpenAI Request Settings ---
+# Everything here is part of the documentation cache key: changing any of it
+# regenerates the docs for every file on the next run.
+OPENAI_MODEL = "gpt-3.5-turbo-0125"
+OPENAI_TEMPERATURE = 0.2
+OPENAI_MAX_TOKENS = 2500
+SYSTEM_PROMPT = "You are an expert technical writer generating structured Markdown documentation for Python code, adhering strictly to the provided format."
+PROMPT_TEMPLATE = (
+    "Generate technical documentation for the Python code file named '{file_name}'. "
+    "The documentation should be in Markdown format and strictly follow this structure:\n\n"
+    "**File Overview:**\n[A brief, one or two-sentence overview of the file's purpose.]\n\n"
+    "**Functions:** (Only if functions are present)\n"
+    "**Function:** `function_name(param1: type, param2: type) -> return_type`\n"
+    "**Purpose:** [Brief description of what the function does.]\n"
+    "**Parameters:** (Only if parameters are present)\n"
+    "- `param_name` (type): [Description of the parameter.]\n"
+    "**Returns:** (Only if it returns something other than None)\n"
+    "- (type): [Description of the return value.]\n"
+    "[Repeat for each function, separated by a blank line]\n\n"
+    "**Classes:** (Only if classes are present)\n"
+    "**Class:** `ClassName`\n"
+    "**Purpose:** [Brief description of the class.]\n"
+    "**Methods:** (Only if methods are present)\n"
+    "**Method:** `method_name(self, param1: type) -> return_type`\n"
+    "**Purpose:** [Description.]\n"
+    "[Repeat for each class and method, separated by a blank line]\n\n"
+    "Ensure all code signatures, parameter names, and class names are enclosed in backticks (`).\n"
+    "Use simple Markdown: ** for bold, newlines for separation. Do not use HTML tags.\n"
+    "File Content:\n```python\n{content}\n```"
+)
+# Files are documented one class/function at a time (see code_units.py) and
+# the fragments merged into the structure above; PROMPT_TEMPLATE is only used
+# for files that don't parse. Each fragment is cached on its own, so editing
+# one function only regenerates that function's section.
+FRAGMENT_FORMAT_RULES = (
+    "Reply with exactly this Markdown and nothing else. "
+    "Ensure all code signatures, parameter names, and class names are enclosed in backticks (`). "
+    "Use simple Markdown: ** for bold, newlines for separation. Do not use HTML tags.\n\n"
+)
+FRAGMENT_PROMPT_TEMPLATES = {
+    "overview": (
+        "Write the overview for the Python code file named '{file_name}', based on its "
+        "module-level code and the functions and classes it defines (listed at the end). "
+        + FRAGMENT_FORMAT_RULES +
+        "**File Overview:**\n[A brief, one or two-sentence overview of the file's purpose.]\n\n"
+        "Module-level code:\n```python\n{content}\n```"
+    ),
+    "function": (
+        "Document the function `{name}` from the Python code file named '{file_name}'. "
+        + FRAGMENT_FORMAT_RULES +
+        "**Function:** `{signature}`\n"
+        "**Purpose:** [Brief description of what the function does.]\n"
+        "**Parameters:** (Only if parameters are present)\n"
+        "- `param_name` (type): [Description of the parameter.]\n"
+        "**Returns:** (Only if it returns something other than None)\n"
+        "- (type): [Description of the return value.]\n\n"
+        "Function source:\n```python\n{content}\n```"
+    ),
+    "class": (
+        "Document the class `{name}` from the Python code file named '{file_name}'. "
+        + FRAGMENT_FORMAT_RULES +
+        "**Class:** `{signature}`\n"
+        "**Purpose:** [Brief description of the class.]\n"
+        "**Methods:** (Only if methods are present)\n"
+        "**Method:** `method_name(self, param1: type) -> return_type`\n"
+        "**Purpose:** [Description.]\n"
+        "[Repeat for each method, separated by a blank line]\n\n"
+        "Class source:\n```python\n{content}\n```"
+    ),
+    "class-outline": (
+        "Describe the class `{name}` from the Python code file named '{file_name}', given its "
+        "outline (method bodies are omitted and documented separately). "
+        + FRAGMENT_FORMAT_RULES +
+        "**Class:** `{signature}`\n"
+        "**Purpose:** [Brief description of the class.]\n\n"
+        "Class outline:\n```python\n{content}\n```"
+    ),
+    "method": (
+        "Document the method `{name}` of the class `{parent}` from the Python code file named '{file_name}'. "
+        + FRAGMENT_FORMAT_RULES +
+        "**Method:** `{signature}`\n"
+        "**Purpose:** [Description.]\n\n"
+        "Method source:\n```python\n{content}\n```"
+    ),
+}
+
+# --- Concurrency and Rate Limits ---
+# Requests are paced by token buckets instead of a fixed sleep per file;
+# 429/5xx responses are retried after the server's Retry-After.
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "60"))
+CONFLUENCE_REQUESTS_PER_SECOND = float(os.getenv("CONFLUENCE_REQUESTS_PER_SECOND", "5"))
+GENERATE_WORKERS = int(os.getenv("DOC_GENERATE_WORKERS", "4"))
+FRAGMENT_WORKERS = int(os.getenv("DOC_FRAGMENT_WORKERS", "4"))  # Per file being generated
+PUBLISH_WORKERS = int(os.getenv("DOC_PUBLISH_WORKERS", "2"))
+MAX_ATTEMPTS = 5
+
+# --- Incremental Runs ---
+# The root page remembers the last commit that was fully documented; the next
+# run only handles the files changed since then (set DOC_FULL_REBUILD=1 to
+# document everything again).
+REVISION_PROPERTY = "doc-revision"
+FILE_LIST_HEADING = "### Files Documented:"
+FILE_LIST_ITEM_RE = re.compile(r'<li>\s*<code>(.*?)</code>\s*</li>', re.DOTALL)
+
 # --- Helper Functions for Ignoring Items (No change) ---
 
 
@@ -55,6 +167,14 @@ def has_target_extension(file_name):
     _, ext = os.path.splitext(file_name)
     return ext.lower() in TARGET_EXTENSIONS
 
+
+def is_documented_path(relative_path):
+    """Applies the ignore rules above to a path relative to the code root."""
+    parts = relative_path.replace('\\', '/').split('/')
+    if any(should_ignore_dir(d) for d in parts[:-1]):
+        return False
+    return not should_ignore_file(parts[-1]) and has_target_extension(parts[-1])
+
 # --- Core Logic Functions ---
 
 
@@ -77,82 +197,144 @@ def find_files_to_document(code_root_path):
     return files_for_documentation
 
 
-def generate_documentation_for_file(file_path, openai_client):
-    # ... (No change to the OpenAI prompt or call from previous version,
-    # as it generates the structured Markdown we want) ...
+def doc_page_title(relative_file_path):
+    return f"Doc: {relative_file_path.replace(os.sep, ' - ')}"
+
+
+def root_page_file_list_markdown(relative_paths):
+    return (
+        f"{FILE_LIST_HEADING}\n" +  # Using ### for H3 in Markdown
+        "\n".join([f"- `{path}`" for path in relative_paths])
+    )
+
+
+def patch_file_list(storage_html, changes):
+    """
+    The root page's file list with `changes` (git_changes.FileChanges) applied:
+    deleted files removed, renamed ones replaced where they were, added ones
+    appended. Everything else stays as it is on the page.
+    """
+    documented = [html.unescape(path) for path in FILE_LIST_ITEM_RE.findall(storage_html)]
+    renamed = {os.path.normpath(old): os.path.normpath(new) for old, new, _ in changes.renamed}
+    deleted = {os.path.normpath(path) for path in changes.deleted}
+    patched = [renamed.get(path, path) for path in documented if path not in deleted]
+    patched.extend(os.path.normpath(path) for path in changes.added + changes.modified
+                   if os.path.normpath(path) not in patched)
+    patched.extend(path for path in renamed.values() if path not in patched)
+    return patched
+
+
+def request_completion(openai_client, messages, limiter=None):
+    """OpenAI chat completion, paced by `limiter` and retried on rate limits and server errors."""
+    for attempt in range(MAX_ATTEMPTS):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return openai_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=messages,
+                temperature=OPENAI_TEMPERATURE, max_tokens=OPENAI_MAX_TOKENS
+            )
+        except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            response = getattr(e, 'response', None)
+            retry_after = parse_retry_after(response.headers.get('retry-after')) if response is not None else None
+            delay = backoff_delay(attempt, retry_after)
+            print(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            if limiter is not None:
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+
+def generate_fragment(openai_client, prompt, label, doc_cache=None, limiter=None):
+    """Markdown for one prompt, from the cache when the exact same request was made before."""
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    cache_key = None
+    if doc_cache is not None:
+        cache_key = doc_cache.make_key(
+            messages=messages, model=OPENAI_MODEL,
+            temperature=OPENAI_TEMPERATURE, max_tokens=OPENAI_MAX_TOKENS)
+        cached = doc_cache.get(cache_key)
+        if cached is not None:
+            print(f"Using cached documentation for {label}")
+            return cached
+    print(f"Sending {label} to OpenAI...")
+    response = request_completion(openai_client, messages, limiter)
+    documentation = response.choices[0].message.content
+    print(f"Received documentation from OpenAI for {label}")
+    if cache_key is not None and documentation:
+        doc_cache.put(cache_key, documentation)
+    return documentation or ""
+
+
+def merge_fragments(overview, units, fragments):
+    """Assembles per-unit fragments into the File Overview / Functions / Classes structure."""
+    functions, classes = [], []
+    previous_kind = None
+    for unit, fragment in zip(units, fragments):
+        fragment = fragment.strip()
+        if unit.kind == 'function':
+            functions.append(fragment)
+        elif unit.kind == 'method':
+            # Methods of a split class follow its outline
+            separator = "\n**Methods:**\n" if previous_kind == 'class-outline' else "\n\n"
+            classes[-1] += separator + fragment
+        else:
+            classes.append(fragment)
+        previous_kind = unit.kind
+    sections = [overview.strip()]
+    if functions:
+        sections.append("**Functions:**\n" + "\n\n".join(functions))
+    if classes:
+        sections.append("**Classes:**\n" + "\n\n".join(classes))
+    return "\n\n".join(sections) + "\n"
+
+
+def generate_documentation_for_file(file_path, openai_client, doc_cache=None, limiter=None):
     print(f"\n--- Attempting to generate documentation for: {file_path} ---")
+    file_name = os.path.basename(file_path)
     try:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
         if not content.strip():
             print(f"File {file_path} is empty. Skipping OpenAI call.")
-            return (f"**File Overview:**\n\nThis file (`{os.path.basename(file_path)}`) "
+            return (f"**File Overview:**\n\nThis file (`{file_name}`) "
                     f"is empty or contains only whitespace.\n")
-        max_chars_for_openai = 80000
-        if len(content) > max_chars_for_openai:
-            print(
-                f"Warning: File {file_path} is very large ({len(content)} chars). Truncating for OpenAI processing.")
-            content = content[:max_chars_for_openai] + \
-                "\n\n[CONTENT TRUNCATED DUE TO LENGTH]"
-        prompt = (
-            f"Generate technical documentation for the Python code file named '{os.path.basename(file_path)}'. "
-            "The documentation should be in Markdown format and strictly follow this structure:\n\n"
-            "**File Overview:**\n[A brief, one or two-sentence overview of the file's purpose.]\n\n"
-            "**Functions:** (Only if functions are present)\n"
-            "**Function:** `function_name(param1: type, param2: type) -> return_type`\n"
-            "**Purpose:** [Brief description of what the function does.]\n"
-            "**Parameters:** (Only if parameters are present)\n"
-            "- `param_name` (type): [Description of the parameter.]\n"
-            "**Returns:** (Only if it returns something other than None)\n"
-            "- (type): [Description of the return value.]\n"
-            "[Repeat for each function, separated by a blank line]\n\n"
-            "**Classes:** (Only if classes are present)\n"
-            "**Class:** `ClassName`\n"
-            "**Purpose:** [Brief description of the class.]\n"
-            "**Methods:** (Only if methods are present)\n"
-            "**Method:** `method_name(self, param1: type) -> return_type`\n"
-            "**Purpose:** [Description.]\n"
-            "[Repeat for each class and method, separated by a blank line]\n\n"
-            "Ensure all code signatures, parameter names, and class names are enclosed in backticks (`).\n"
-            "Use simple Markdown: ** for bold, newlines for separation. Do not use HTML tags.\n"
-            f"File Content:\n```python\n{content}\n```"
-        )
-        print(f"Sending content of {os.path.basename(file_path)} to OpenAI...")
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo-0125",
-            messages=[
-                {"role": "system", "content": "You are an expert technical writer generating structured Markdown documentation for Python code, adhering strictly to the provided format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2, max_tokens=2500
-        )
-        documentation = response.choices[0].message.content
-        print(
-            f"Received documentation from OpenAI for {os.path.basename(file_path)}")
-        return documentation
+        try:
+            overview_source, units = split_into_units(content)
+        except SyntaxError as e:
+            # Not parseable: document the whole file in one request, as before
+            print(f"Warning: Could not parse {file_path} ({e}). Documenting it as a whole.")
+            max_chars_for_openai = 80000
+            if len(content) > max_chars_for_openai:
+                print(
+                    f"Warning: File {file_path} is very large ({len(content)} chars). Truncating for OpenAI processing.")
+                content = content[:max_chars_for_openai] + \
+                    "\n\n[CONTENT TRUNCATED DUE TO LENGTH]"
+            prompt = PROMPT_TEMPLATE.format(file_name=file_name, content=content)
+            return generate_fragment(openai_client, prompt, file_name, doc_cache, limiter)
+
+        def document(kind, name, signature, source, parent):
+            prompt = FRAGMENT_PROMPT_TEMPLATES[kind].format(
+                file_name=file_name, name=name, signature=signature, content=source, parent=parent)
+            label = f"{file_name}: {parent + '.' if parent else ''}{name or kind}"
+            return generate_fragment(openai_client, prompt, label, doc_cache, limiter)
+
+        with ThreadPoolExecutor(FRAGMENT_WORKERS, thread_name_prefix='fragment') as executor:
+            overview = executor.submit(document, "overview", None, None, overview_source, None)
+            fragments = [executor.submit(document, *unit) for unit in units]
+            return merge_fragments(overview.result(), units, [f.result() for f in fragments])
     except openai.APIError as e:
         print(f"OpenAI API Error processing file {file_path}: {e}")
-        return f"**Error:**\n\nOpenAI API Error processing file `{os.path.basename(file_path)}`: {e}\n"
+        return f"**Error:**\n\nOpenAI API Error processing file `{file_name}`: {e}\n"
     except Exception as e:
         print(f"Unexpected error processing file {file_path}: {e}")
-        return f"**Error:**\n\nUnexpected error processing file `{os.path.basename(file_path)}`: {e}\n"
-
-
-def get_confluence_page_id(confluence_url, auth, space_key, title):
-    # ... (No change from previous version) ...
-    search_url = f"{confluence_url.rstrip('/')}/rest/api/content"
-    params = {"spaceKey": space_key, "title": title,
-              "expand": "version", "limit": 1}
-    try:
-        response = requests.get(search_url, auth=auth, params=params, headers={
-                                "Accept": "application/json"}, timeout=10)
-        response.raise_for_status()
-        results = response.json().get('results', [])
-        if results:
-            return results[0]['id'], results[0]['version']['number']
-    except requests.exceptions.RequestException as e:
-        print(f"Error searching for Confluence page '{title}': {e}")
-    return None, None
+        return f"**Error:**\n\nUnexpected error processing file `{file_name}`: {e}\n"
 
 
 def markdown_to_confluence_html(markdown_text):
@@ -184,52 +366,29 @@ def markdown_to_confluence_html(markdown_text):
     return html_output
 
 
-def create_or_update_confluence_page(confluence_url, auth, space_key, title, markdown_body_content, parent_id=None):
-    page_id, current_version = get_confluence_page_id(
-        confluence_url, auth, space_key, title)
-    rest_url = f"{confluence_url.rstrip('/')}/rest/api/content"
-
+def create_or_update_confluence_page(confluence_client, title, markdown_body_content, parent_id=None,
+                                     header_markdown=""):
+    """
+    Publishes `header_markdown` + `markdown_body_content` as the page `title`.
+    Only the body is fingerprinted, so a header that changes on every run
+    (like a "Last updated" line) does not by itself create a new page version.
+    Returns the page ID, or None on error.
+    """
     # --- KEY CHANGE: Convert Markdown to HTML ---
-    html_content_for_storage = markdown_to_confluence_html(
-        markdown_body_content)
+    html_body_for_storage = markdown_to_confluence_html(markdown_body_content)
+    html_content_for_storage = markdown_to_confluence_html(header_markdown) + html_body_for_storage
     # --- END OF KEY CHANGE ---
 
-    page_data = {
-        "type": "page",
-        "title": title,
-        "space": {"key": space_key},
-        "body": {
-            "storage": {
-                "value": html_content_for_storage,  # Send HTML content
-                # Indicate it's storage format (XHTML)
-                "representation": "storage"
-            }
-        }
-    }
-    if parent_id:
-        page_data["ancestors"] = [{"id": str(parent_id)}]
-
     try:
-        http_method = requests.put if page_id else requests.post
-        full_url = f"{rest_url}/{page_id}" if page_id else rest_url
-        action_word = "Updating" if page_id else "Creating"
-
-        if page_id:
-            page_data["id"] = str(page_id)
-            page_data["version"] = {"number": current_version + 1}
-
-        print(f"{action_word} Confluence page: '{title}'" +
-              (f" (ID: {page_id})" if page_id else ""))
-        response = http_method(full_url, auth=auth, json=page_data, headers={
-                               "Content-Type": "application/json", "Accept": "application/json"}, timeout=20)
-        response.raise_for_status()
-
-        base_url = confluence_url.rstrip('/')
-        page_web_ui_path = response.json().get('_links', {}).get('webui', '')
-        full_page_link = f"{base_url}{page_web_ui_path}" if page_web_ui_path else "N/A"
-        print(
-            f"Successfully {action_word.lower().replace('ing', 'ed')} page '{title}'. Link: {full_page_link}")
-        return response.json().get('id')
+        page, action = confluence_client.publish(
+            title, html_content_for_storage, parent_id=parent_id,
+            content_fingerprint=fingerprint(html_body_for_storage))
+        if action == 'unchanged':
+            print(f"Confluence page '{title}' is up to date (ID: {page['id']}), skipping update.")
+        else:
+            full_page_link = f"{confluence_client.base_url}{page['webui']}" if page['webui'] else "N/A"
+            print(f"Successfully {action} page '{title}'. Link: {full_page_link}")
+        return page['id']
 
     except requests.exceptions.HTTPError as e:
         print(
@@ -259,6 +418,8 @@ if __name__ == "__main__":
     confluence_space_key = os.getenv("CONFLUENCE_SPACE_KEY")
     root_doc_title_env = os.getenv("ROOT_DOC_TITLE", "Project Documentation")
     code_root_path_env = os.getenv("CODE_ROOT_PATH", ".")
+    doc_cache_dir_env = os.getenv("DOC_CACHE_DIR", ".doc_cache")
+    doc_cache_max_mb_env = float(os.getenv("DOC_CACHE_MAX_MB", "50"))
 
     required_vars = {"OPENAI_API_KEY": openai_api_key, "CONFLUENCE_URL": confluence_url,
                      "CONFLUENCE_EMAIL": confluence_email, "CONFLUENCE_API_TOKEN": confluence_api_token,
@@ -270,7 +431,8 @@ if __name__ == "__main__":
         sys.exit(1)
 
     try:
-        openai_client = openai.OpenAI(api_key=openai_api_key)
+        # Retries are handled by request_completion so they share the rate limiter
+        openai_client = openai.OpenAI(api_key=openai_api_key, max_retries=0)
         confluence_auth = HTTPBasicAuth(confluence_email, confluence_api_token)
         print("OpenAI client initialized.")
         print(
@@ -279,62 +441,162 @@ if __name__ == "__main__":
         print(f"Error initializing API clients: {e}")
         sys.exit(1)
 
+    openai_limiter = TokenBucket(OPENAI_REQUESTS_PER_MINUTE / 60.0, capacity=GENERATE_WORKERS)
+    confluence_client = ConfluenceClient(
+        confluence_url, confluence_auth, confluence_space_key,
+        limiter=TokenBucket(CONFLUENCE_REQUESTS_PER_SECOND), pool_size=PUBLISH_WORKERS + 1)
+
+    doc_cache = DocCache(doc_cache_dir_env, max_bytes=int(doc_cache_max_mb_env * 1024 * 1024))
+    print(f"Documentation cache: {os.path.abspath(doc_cache_dir_env)}")
+
     abs_code_root_path = os.path.abspath(code_root_path_env)
-    files_to_process = find_files_to_document(abs_code_root_path)
+    head_revision = os.getenv("GITHUB_SHA") or git_changes.head_revision(abs_code_root_path)
+    full_rebuild = os.getenv("DOC_FULL_REBUILD", "").lower() in ("1", "true", "yes")
 
-    if not files_to_process:
-        print("No files found to document. Exiting.")
-        sys.exit(0)
+    # --- Incremental Mode: only the files changed since the last documented commit ---
+    changes = None
+    stored_revision, revision_property_version = None, None
+    try:
+        root_page = confluence_client.find_page(root_doc_title_env)
+        if root_page is not None:
+            stored_revision, revision_property_version = confluence_client.get_property(
+                root_page['id'], REVISION_PROPERTY)
+            base_revision = os.getenv("DOC_BASE_REVISION") or (
+                stored_revision.get('sha') if isinstance(stored_revision, dict) else None)
+            if base_revision and head_revision and not full_rebuild:
+                changes = git_changes.changed_files(
+                    base_revision, head_revision, abs_code_root_path, include=is_documented_path)
+                if changes is None:
+                    print(f"Could not diff {base_revision}..{head_revision}; documenting every file.")
+                else:
+                    print(f"Incremental run: changes since {base_revision[:12]}")
+    except requests.exceptions.RequestException as e:
+        print(f"Error reading the root page '{root_doc_title_env}': {e}")
+        sys.exit(1)
+
+    if changes is None:
+        files_to_process = find_files_to_document(abs_code_root_path)
+        if not files_to_process:
+            print("No files found to document. Exiting.")
+            sys.exit(0)
+        documented_files = [os.path.relpath(f, abs_code_root_path) for f in files_to_process]
+    else:
+        regenerate = changes.added + changes.modified + [new for _, new, changed in changes.renamed if changed]
+        files_to_process = [os.path.join(abs_code_root_path, os.path.normpath(path)) for path in regenerate]
+        documented_files = patch_file_list(confluence_client.get_body(root_page['id']), changes)
+        print(f"{len(changes.added)} added, {len(changes.modified)} modified, "
+              f"{len(changes.renamed)} renamed, {len(changes.deleted)} deleted")
 
     print(f"\nFound {len(files_to_process)} files to document:")
     for f_path in files_to_process:
         print(f"  - {os.path.relpath(f_path, abs_code_root_path)}")
 
     # --- Root Page Content (still Markdown, converted to HTML by the function) ---
-    root_page_markdown_content = (
+    # Only the file list is fingerprinted, so the page is updated only when it changes
+    root_page_header_markdown = (
         f"This page serves as the root for automatically generated documentation for the project.\n\n"
         f"Last updated: {time.strftime('%Y-%m-%d %H:%M:%S %Z')}\n\n"
-        f"### Files Documented:\n" +  # Using ### for H3 in Markdown
-        "\n".join(
-            [f"- `{os.path.relpath(f, abs_code_root_path)}`" for f in files_to_process])
     )
+    root_page_markdown_content = root_page_file_list_markdown(documented_files)
     project_root_page_id = create_or_update_confluence_page(
-        confluence_url, confluence_auth, confluence_space_key,
+        confluence_client,
         # Pass Markdown, function will convert
-        root_doc_title_env, root_page_markdown_content
+        root_doc_title_env, root_page_markdown_content, header_markdown=root_page_header_markdown
     )
     if not project_root_page_id:
         print("Error: Could not create or find the project root page in Confluence. Aborting child page creation.")
         sys.exit(1)
     print(f"Project root page ID: {project_root_page_id}")
+    # IDs, versions and fingerprints of all existing doc pages in a few requests
+    existing_page_count = confluence_client.load_children(project_root_page_id)
+    print(f"Found {existing_page_count} existing documentation pages under the root page.")
+
+    failures = []  # The revision is only recorded when nothing failed
+
+    # --- Deleted and Renamed Files: archive or move their pages, no regeneration ---
+    if changes is not None:
+        for path in changes.deleted:
+            title = doc_page_title(os.path.normpath(path))
+            try:
+                if confluence_client.archive_page(title):
+                    print(f"Archived '{title}' ({path} was deleted)")
+            except requests.exceptions.RequestException as e:
+                print(f"Error archiving '{title}': {e}")
+                failures.append(path)
+        for old_path, new_path, _ in changes.renamed:
+            old_path, new_path = os.path.normpath(old_path), os.path.normpath(new_path)
+            try:
+                page = confluence_client.find_page(doc_page_title(old_path))
+                if page is None:
+                    continue  # Never documented: it is regenerated instead
+                body = confluence_client.get_body(page['id']).replace(
+                    f"<code>{html.escape(old_path, quote=False)}</code>",
+                    f"<code>{html.escape(new_path, quote=False)}</code>")
+                confluence_client.rename_page(doc_page_title(old_path), doc_page_title(new_path), body)
+                print(f"Moved '{doc_page_title(old_path)}' to '{doc_page_title(new_path)}'")
+            except requests.exceptions.RequestException as e:
+                print(f"Error moving the page for {old_path}: {e}")
+                failures.append(new_path)
+        # Renamed files that were never documented still need a page
+        for _, new_path, changed in changes.renamed:
+            new_file = os.path.join(abs_code_root_path, os.path.normpath(new_path))
+            if not changed and new_file not in files_to_process and \
+                    confluence_client.find_page(doc_page_title(os.path.normpath(new_path))) is None:
+                files_to_process.append(new_file)
 
     # --- Individual File Page Content (Markdown from AI, converted to HTML by the function) ---
-    for file_path in files_to_process:
+    # Files are generated on one thread pool and uploaded on another, so the
+    # OpenAI call for the next file overlaps the Confluence upload of the last.
+    def generate_page(file_path):
         relative_file_path = os.path.relpath(file_path, abs_code_root_path)
-        print(f"\nProcessing file: {relative_file_path}")
-
         documentation_markdown_from_ai = generate_documentation_for_file(
-            file_path, openai_client)
+            file_path, openai_client, doc_cache, limiter=openai_limiter)
 
         if "**Error:**" in documentation_markdown_from_ai or \
            ("is empty" in documentation_markdown_from_ai and f"`{os.path.basename(file_path)}`" in documentation_markdown_from_ai):
             print(
                 f"Skipping Confluence update for {relative_file_path} due to generation issue or empty content.")
-            continue
+            if "**Error:**" in documentation_markdown_from_ai:
+                failures.append(relative_file_path)
+            return None
+        return documentation_markdown_from_ai
 
+    def publish_page(file_path, documentation_markdown_from_ai):
+        relative_file_path = os.path.relpath(file_path, abs_code_root_path)
         preamble_markdown = (
             f"*Automatically generated documentation for `{relative_file_path}`.*\n\n"
             f"*Last updated: {time.strftime('%Y-%m-%d %H:%M:%S %Z')}*\n\n"
             f"---\n\n"  # This will become <hr />
         )
-        final_markdown_for_page = preamble_markdown + documentation_markdown_from_ai
 
-        page_title = f"Doc: {relative_file_path.replace(os.sep, ' - ')}"
-        create_or_update_confluence_page(
-            confluence_url, confluence_auth, confluence_space_key,
-            page_title, final_markdown_for_page,  # Pass Markdown, function will convert
-            parent_id=project_root_page_id
+        page_id = create_or_update_confluence_page(
+            confluence_client,
+            doc_page_title(relative_file_path), documentation_markdown_from_ai,  # Pass Markdown, function will convert
+            parent_id=project_root_page_id, header_markdown=preamble_markdown
         )
-        time.sleep(3)
-
+        if not page_id:
+            failures.append(relative_file_path)
+        return page_id
+
+    started = time.monotonic()
+    published_count = run_pipeline(files_to_process, generate_page, publish_page,
+                                   generate_workers=GENERATE_WORKERS, publish_workers=PUBLISH_WORKERS)
+    print(f"\nPublished {published_count} of {len(files_to_process)} pages "
+          f"in {time.monotonic() - started:.1f}s")
+
+    already_recorded = isinstance(stored_revision, dict) and stored_revision.get('sha') == head_revision
+    if head_revision and not failures and not already_recorded:
+        try:
+            confluence_client.set_property(
+                project_root_page_id, REVISION_PROPERTY, {"sha": head_revision}, revision_property_version)
+            print(f"Recorded {head_revision[:12]} as the last documented revision.")
+        except requests.exceptions.RequestException as e:
+            print(f"Error recording the documented revision: {e}")
+    elif failures:
+        print(f"{len(failures)} files failed; the next run will pick them up again.")
+
+    confluence_client.close()
+    evicted = doc_cache.prune()
+    print(f"\nDocumentation cache: {doc_cache.summary()}"
+          + (f", evicted {evicted} old entries" if evicted else ""))
     print("\nDoc Generator Script Finished.")
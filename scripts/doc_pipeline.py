@@ -0,0 +1,97 @@
+# scripts/doc_pipeline.py
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`.
+
+    acquire() blocks until a token is available. pause() stops every caller
+    for a while, which is how a Retry-After from one request slows down all
+    the workers sharing the same quota instead of just the one that hit it.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return
+                    wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0  # No burst right after the pause
+            self._updated = self._paused_until
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None, base=1.0, cap=60.0):
+    """The server's Retry-After if it sent one, otherwise capped exponential backoff with jitter."""
+    if retry_after is not None:
+        return min(retry_after, cap)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def run_pipeline(items, generate, publish, generate_workers=4, publish_workers=2):
+    """
+    Runs generate(item) for every item on one thread pool and, as each result
+    comes in, publish(item, result) on a second one, so generating the next
+    files overlaps with uploading the previous ones. Returns the number of
+    items whose publish step returned a truthy value.
+    """
+    published = 0
+    with ThreadPoolExecutor(generate_workers, thread_name_prefix='generate') as generators, \
+            ThreadPoolExecutor(publish_workers, thread_name_prefix='publish') as publishers:
+        generating = {generators.submit(generate, item): item for item in items}
+        publishing = []
+        for future in as_completed(generating):
+            item = generating[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Generation failed for {item}: {e}")
+                continue
+            if result is not None:
+                publishing.append(publishers.submit(publish, item, result))
+        for future in as_completed(publishing):
+            try:
+                if future.result():
+                    published += 1
+            except Exception as e:
+                print(f"Publishing failed: {e}")
+    return published
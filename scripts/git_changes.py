@@ -0,0 +1,61 @@
+# scripts/git_changes.py
+
+import subprocess
+from collections import namedtuple
+
+# Paths are relative to the directory git ran in. renamed holds
+# (old path, new path, content_changed) tuples.
+FileChanges = namedtuple('FileChanges', 'added modified deleted renamed')
+
+
+def _git(args, cwd):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def head_revision(cwd):
+    """Commit hash of HEAD, or None outside a git checkout."""
+    try:
+        return _git(['rev-parse', 'HEAD'], cwd).strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def changed_files(base, head, cwd, include=lambda path: True):
+    """
+    Files under `cwd` that changed between commits `base` and `head`, limited
+    to paths for which include(path) is true. A rename whose old or new path
+    is excluded counts as a delete or an add. Returns None when the range
+    can't be diffed (e.g. `base` is missing from a shallow clone).
+    """
+    try:
+        output = _git(['diff', '--name-status', '-z', '-M', '--relative', base, head], cwd)
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+    changes = FileChanges([], [], [], [])
+    fields = output.split('\0')
+    i = 0
+    while i < len(fields) - 1:
+        status = fields[i]
+        if status[0] in 'RC':
+            old_path, new_path = fields[i + 1], fields[i + 2]
+            i += 3
+            if status[0] == 'C' or not include(old_path):
+                if include(new_path):
+                    changes.added.append(new_path)
+            elif not include(new_path):
+                changes.deleted.append(old_path)
+            else:
+                changes.renamed.append((old_path, new_path, status != 'R100'))
+            continue
+        path = fields[i + 1]
+        i += 2
+        if not include(path):
+            continue
+        if status == 'A':
+            changes.added.append(path)
+        elif status == 'D':
+            changes.deleted.append(path)
+        else:  # M, T (type change)
+            changes.modified.append(path)
+    return changes
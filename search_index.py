@@ -0,0 +1,225 @@
+import re
+import html
+import math
+import heapq
+import bisect
+import threading
+
+TAG_RE = re.compile(r'<[^>]*>')
+TOKEN_RE = re.compile(r'\w+')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+MIN_PREFIX_LENGTH = 2  # Shorter prefixes would expand to most of the vocabulary
+MAX_PREFIX_EXPANSIONS = 32
+# Terms in more notes than this also keep impact-ordered postings
+IMPACT_MIN_DF = 64
+
+
+def note_text(note):
+    """Plain text of a note: its title plus the Quill HTML with tags stripped."""
+    content = TAG_RE.sub(' ', note.get('content', ''))
+    return html.unescape(note.get('title', '')) + ' ' + html.unescape(content)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def _bucket_contributions(idf, tf, bucket, norm, norm_per_len):
+    # Bucket is sorted by length, so contributions come out largest first
+    weight = idf * tf * (K1 + 1)
+    for length, doc in bucket:
+        yield weight / (tf + norm + norm_per_len * length), doc
+
+
+class SearchIndex:
+    """
+    Incrementally maintained inverted index over note titles and content.
+
+    Notes are added and removed one at a time (no rebuilds). Queries are ranked
+    with BM25; the last query term also matches as a prefix so results show up
+    while the user is still typing.
+
+    Top-k uses the threshold algorithm: each term's postings are read in order
+    of decreasing score contribution, every newly seen note is scored exactly
+    through the per-term posting dicts, and the scan stops as soon as the k-th
+    best score beats what any unseen note could still reach. Common terms keep
+    their postings bucketed by term frequency and sorted by document length,
+    which is exactly contribution order for any average length, so they can be
+    read in that order without scoring every note that contains them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}   # term -> {doc: term frequency}
+        self._impacts = {}    # common term -> {term frequency: sorted [(doc length, doc)]}
+        self._doc_terms = {}  # doc -> terms in it, for removal
+        self._doc_len = {}    # doc -> number of tokens
+        self._total_len = 0
+        self._doc_ids = {}    # note id -> doc
+        self._note_ids = {}   # doc -> note id
+        self._next_doc = 0
+        self._vocabulary = []  # Sorted terms, for prefix lookups
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def add(self, note):
+        tokens = tokenize(note_text(note))
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        with self._lock:
+            self._remove(note['id'])
+            doc = self._next_doc
+            self._next_doc += 1
+            self._doc_ids[note['id']] = doc
+            self._note_ids[doc] = note['id']
+            self._doc_terms[doc] = tuple(frequencies)
+            self._doc_len[doc] = len(tokens)
+            self._total_len += len(tokens)
+            for term, tf in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._vocabulary, term)
+                postings[doc] = tf
+                impacts = self._impacts.get(term)
+                if impacts is not None:
+                    bisect.insort(impacts.setdefault(tf, []), (len(tokens), doc))
+                elif len(postings) > IMPACT_MIN_DF:
+                    self._build_impacts(term)
+
+    def remove(self, note_id):
+        with self._lock:
+            self._remove(note_id)
+
+    def search(self, query, k=10):
+        """Top `k` (note id, score) pairs for `query`, best first."""
+        terms = tokenize(query)
+        if not terms or k < 1:
+            return []
+        with self._lock:
+            return self._search(terms, k)
+
+    # --- Internals ---
+
+    def _remove(self, note_id):
+        doc = self._doc_ids.pop(note_id, None)
+        if doc is None:
+            return
+        del self._note_ids[doc]
+        length = self._doc_len.pop(doc)
+        self._total_len -= length
+        for term in self._doc_terms.pop(doc):
+            postings = self._postings[term]
+            tf = postings.pop(doc)
+            impacts = self._impacts.get(term)
+            if impacts is not None:
+                bucket = impacts[tf]
+                del bucket[bisect.bisect_left(bucket, (length, doc))]
+                if not bucket:
+                    del impacts[tf]
+            if not postings:
+                del self._postings[term]
+                self._impacts.pop(term, None)
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+
+    def _build_impacts(self, term):
+        impacts = {}
+        for doc, tf in self._postings[term].items():
+            impacts.setdefault(tf, []).append((self._doc_len[doc], doc))
+        for bucket in impacts.values():
+            bucket.sort()
+        self._impacts[term] = impacts
+
+    def _expand_prefix(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\U0010ffff', lo=start)
+        matches = self._vocabulary[start:end]
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            # Keep the most common completions
+            matches = heapq.nlargest(MAX_PREFIX_EXPANSIONS, matches, key=lambda t: len(self._postings[t]))
+        return matches
+
+    def _search(self, terms, k):
+        query_terms = set(terms[:-1])
+        last = terms[-1]
+        if len(last) >= MIN_PREFIX_LENGTH:
+            query_terms.update(self._expand_prefix(last))
+        else:
+            query_terms.add(last)
+
+        doc_count = len(self._doc_len)
+        if not doc_count:
+            return []
+        doc_len = self._doc_len
+        norm = K1 * (1 - B)
+        norm_per_len = K1 * B * doc_count / self._total_len if self._total_len else 0.0
+
+        scored_terms = []  # (idf, postings, contributions in decreasing order)
+        for term in query_terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            impacts = self._impacts.get(term)
+            if impacts is None:
+                ordered = iter(sorted(
+                    ((idf * tf * (K1 + 1) / (tf + norm + norm_per_len * doc_len[doc]), doc)
+                     for doc, tf in postings.items()), reverse=True))
+            else:
+                ordered = heapq.merge(*(
+                    _bucket_contributions(idf, tf, bucket, norm, norm_per_len)
+                    for tf, bucket in impacts.items()), reverse=True)
+            scored_terms.append((idf, postings, ordered))
+        if not scored_terms:
+            return []
+
+        def score(doc):
+            total = 0.0
+            length_norm = norm + norm_per_len * doc_len[doc]
+            for idf, postings, _ in scored_terms:
+                tf = postings.get(doc)
+                if tf:
+                    total += idf * tf * (K1 + 1) / (tf + length_norm)
+            return total
+
+        # Always advance the term whose next contribution is largest: that
+        # lowers the bound for unseen notes (the sum of those contributions)
+        # the fastest. Ties are broken by position to keep heap entries comparable.
+        frontier = [idf * (K1 + 1) for idf, _, _ in scored_terms]
+        bound = sum(frontier)
+        pending = [(-contribution, position) for position, contribution in enumerate(frontier)]
+        heapq.heapify(pending)
+        top = []  # Min-heap of (score, doc), at most k entries
+        seen = set()
+        while pending:
+            # The running bound can drift by float rounding; confirm with an exact sum
+            if len(top) == k and top[0][0] >= bound and top[0][0] >= sum(frontier):
+                break
+            _, position = heapq.heappop(pending)
+            entry = next(scored_terms[position][2], None)
+            if entry is None:
+                bound -= frontier[position]
+                frontier[position] = 0.0
+                continue
+            contribution, doc = entry
+            bound += contribution - frontier[position]
+            frontier[position] = contribution
+            heapq.heappush(pending, (-contribution, position))
+            if doc in seen:
+                continue
+            seen.add(doc)
+            item = (score(doc), doc)
+            if len(top) < k:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+
+        top.sort(reverse=True)
+        return [(self._note_ids[doc], doc_score) for doc_score, doc in top]
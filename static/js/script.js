@@ -8,7 +8,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const formErrorEl = document.getElementById('formError');
     const notesInfoEl = document.getElementById('notesInfo');
     const charCountEl = document.getElementById('charCount');
+    const notesSentinel = document.getElementById('notesSentinel');
     const MAX_CONTENT_LENGTH = 20000; // Same as backend
+    const NOTES_PAGE_SIZE = 10;
+    const EMPTY_NOTES_MESSAGE = 'No notes yet. Add your first note above!';
 
     // --- Initialize Quill Editor ---
     // Define the toolbar options
@@ -123,28 +126,178 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
     // --- Load and Display Notes ---
+    // Notes are loaded one page at a time; the next page is only requested
+    // when the sentinel below the list scrolls into view.
+    let nextCursor = null;
+    let loadingPage = false;
+    let pageObserver = null;
+    // Rendered note cards by id, and the store version they reflect
+    const noteElements = new Map();
+    let syncGeneration = null;
+    let syncVersion = null;
+
+    // Re-observing makes the observer report the sentinel's current state,
+    // so a short page that leaves it on screen still triggers the next load.
+    function recheckSentinel() {
+        if (pageObserver && nextCursor) {
+            pageObserver.unobserve(notesSentinel);
+            pageObserver.observe(notesSentinel);
+        }
+    }
+
+    async function fetchNotesPage(cursor) {
+        let url = `/api/notes?limit=${NOTES_PAGE_SIZE}`;
+        if (cursor) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
+        return apiRequest(url);
+    }
+
     async function fetchAndDisplayNotes() {
         clearNotesInfo();
+        loadingPage = true;
         try {
-            const notes = await apiRequest('/api/notes');
+            const page = await fetchNotesPage(null);
             notesContainer.innerHTML = ''; // Clear existing notes
-            if (notes && notes.length > 0) {
-                notes.forEach(note => {
-                    const noteElement = createNoteElement(note);
-                    notesContainer.appendChild(noteElement);
-                });
-            } else {
-                showNotesInfo('No notes yet. Add your first note above!');
+            noteElements.clear();
+            page.notes.forEach(appendNote);
+            updateEmptyState();
+            nextCursor = page.next_cursor;
+            syncGeneration = page.generation;
+            syncVersion = page.version;
+        } catch (error) {
+            showNotesInfo(`Error fetching notes: ${error.message}`, 'error');
+        } finally {
+            loadingPage = false;
+        }
+        recheckSentinel();
+    }
+
+    async function loadNextPage() {
+        if (!nextCursor || loadingPage) {
+            return;
+        }
+        loadingPage = true;
+        try {
+            const page = await fetchNotesPage(nextCursor);
+            page.notes.forEach(appendNote);
+            nextCursor = page.next_cursor;
+        } catch (error) {
+            showNotesInfo(`Error fetching notes: ${error.message}`, 'error');
+        } finally {
+            loadingPage = false;
+        }
+        recheckSentinel();
+    }
+
+    // --- Delta Sync ---
+    // Fetch only the changes since the last seen version and patch the list in
+    // place. Falls back to a full reload when the server asks for a reset.
+    async function syncChanges() {
+        if (syncVersion === null) {
+            return fetchAndDisplayNotes();
+        }
+        try {
+            const delta = await apiRequest(
+                `/api/notes/changes?since=${syncVersion}&generation=${encodeURIComponent(syncGeneration)}`);
+            if (delta.reset) {
+                return fetchAndDisplayNotes();
             }
+            delta.changes.forEach(applyChange);
+            syncVersion = delta.version;
+            updateEmptyState();
         } catch (error) {
             showNotesInfo(`Error fetching notes: ${error.message}`, 'error');
         }
     }
 
+    function applyChange(change) {
+        if (change.op === 'add') {
+            insertNote(change.note);
+        } else if (change.op === 'delete') {
+            removeNote(change.id);
+        }
+    }
+
+    function appendNote(note) {
+        if (noteElements.has(note.id)) {
+            return;
+        }
+        const element = createNoteElement(note);
+        noteElements.set(note.id, element);
+        notesContainer.appendChild(element);
+    }
+
+    // Place a note by timestamp (newest first). New notes almost always go on
+    // top, so the scan usually stops at the first card.
+    function insertNote(note) {
+        removeNote(note.id);
+        let next = notesContainer.firstElementChild;
+        while (next && next.dataset.timestamp > note.timestamp) {
+            next = next.nextElementSibling;
+        }
+        if (!next && nextCursor) {
+            return; // Older than everything loaded; it will arrive with a later page
+        }
+        const element = createNoteElement(note);
+        noteElements.set(note.id, element);
+        notesContainer.insertBefore(element, next);
+    }
+
+    function removeNote(noteId) {
+        const element = noteElements.get(noteId);
+        if (element) {
+            element.remove();
+            noteElements.delete(noteId);
+        }
+    }
+
+    function updateEmptyState() {
+        if (noteElements.size === 0) {
+            showNotesInfo(EMPTY_NOTES_MESSAGE);
+        } else if (notesInfoEl.textContent === EMPTY_NOTES_MESSAGE) {
+            clearNotesInfo();
+        }
+    }
+
+    // --- Live Updates ---
+    // Events pushed by the server are applied directly when they are the next
+    // change in sequence; anything else (a gap, another generation, or a
+    // server-side overflow) falls back to a delta sync.
+    function handleLiveChange(event) {
+        const change = JSON.parse(event.data);
+        if (syncVersion === null || change.generation !== syncGeneration) {
+            syncChanges();
+        } else if (change.seq === syncVersion + 1) {
+            applyChange(change);
+            syncVersion = change.seq;
+            updateEmptyState();
+        } else if (change.seq > syncVersion) {
+            syncChanges();
+        }
+    }
+
+    if ('EventSource' in window) {
+        const events = new EventSource('/api/notes/events');
+        events.addEventListener('note-created', handleLiveChange);
+        events.addEventListener('note-deleted', handleLiveChange);
+        events.addEventListener('resync', () => syncChanges());
+    }
+
+    if (notesSentinel && 'IntersectionObserver' in window) {
+        pageObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage();
+            }
+        }, { rootMargin: '200px' });
+        pageObserver.observe(notesSentinel);
+    }
+
     function createNoteElement(note) {
         const div = document.createElement('div');
         div.className = 'note-card';
         div.dataset.id = note.id;
+        div.dataset.timestamp = note.timestamp;
 
         const titleEl = document.createElement('h3');
         titleEl.textContent = note.title; // Use textContent for title to prevent XSS
@@ -152,8 +305,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const contentEl = document.createElement('div');
         contentEl.className = 'note-card-content';
         // The content from Quill is HTML, so we set innerHTML.
-        // This is generally safe as Quill is designed to produce sanitized HTML.
-        // Backend also does a basic check.
+        // The backend runs it through an allowlist sanitizer before storing it.
         contentEl.innerHTML = note.content;
 
         const timestampEl = document.createElement('p');
@@ -204,7 +356,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 noteTitleInput.value = '';
                 quill.setContents([]); // Clear Quill editor
                 charCountEl.textContent = `Characters: 0 / ${MAX_CONTENT_LENGTH}`; // Reset char count
-                fetchAndDisplayNotes(); // Refresh notes list
+                syncChanges(); // Patch in the new note
                 showNotesInfo('Note added successfully!', 'success');
                 setTimeout(clearNotesInfo, 3000); // Clear after 3s
             } catch (error) {
@@ -221,7 +373,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const result = await apiRequest('/api/notes/premium-upgrade', 'POST');
                 showNotesInfo(result.message, result.deleted ? 'success' : 'info');
                 if (result.deleted) {
-                    fetchAndDisplayNotes(); // Refresh notes if one was deleted
+                    syncChanges(); // Drop the deleted note from the list
                 }
                 // No need to clear this message immediately, let user read it.
             } catch (error) {
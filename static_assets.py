@@ -0,0 +1,178 @@
+"""
+Fingerprinted, precompressed static assets and cached page HTML.
+
+Build step (run before deploying; the app works without it):
+    python static_assets.py [--static-dir static] [--build-dir static/dist]
+
+Every file under static/ is copied to the build directory under a name that
+contains a hash of its content (css/style.css -> css/style.<hash>.css), with
+.br and .gz variants for compressible types, and listed in manifest.json.
+Templates link assets through asset_url('css/style.css'), which resolves to
+/assets/<hashed name> when the manifest exists and to the plain static URL
+otherwise. Hashed URLs never change content, so they are served with
+one-year immutable cache headers.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import abort, render_template, request, send_from_directory, url_for
+
+from compression import COMPRESSIBLE_MIMETYPES, MIN_COMPRESS_BYTES, brotli, compress, supported_encodings
+
+BUILD_DIR_NAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSETS_URL_PREFIX = '/assets'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VARIANT_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+def build_assets(static_dir, build_dir):
+    """
+    Writes fingerprinted copies (plus .br/.gz variants) of every file in
+    `static_dir` to `build_dir` and returns the manifest:
+    {source path: {"path": hashed path, "encodings": [...]}}.
+    """
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    manifest = {}
+    build_dir_abs = os.path.abspath(build_dir)
+    for dirpath, dirnames, filenames in os.walk(static_dir):
+        if os.path.abspath(dirpath) == build_dir_abs:
+            dirnames[:] = []
+            continue
+        dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != build_dir_abs]
+        for filename in sorted(filenames):
+            source = os.path.join(dirpath, filename)
+            relative = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            target = hashed_name(relative, content_hash(data))
+            target_path = os.path.join(build_dir, target)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as f:
+                f.write(data)
+
+            encodings = []
+            if mimetypes.guess_type(relative)[0] in COMPRESSIBLE_MIMETYPES and len(data) >= MIN_COMPRESS_BYTES:
+                # Built once, so use the slowest, smallest settings
+                variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    variants['br'] = brotli.compress(data, quality=11)
+                for encoding, compressed in variants.items():
+                    if len(compressed) < len(data):
+                        with open(target_path + VARIANT_SUFFIXES[encoding], 'wb') as f:
+                            f.write(compressed)
+                        encodings.append(encoding)
+            manifest[relative] = {"path": target, "encodings": sorted(encodings)}
+
+    os.makedirs(build_dir, exist_ok=True)
+    with open(os.path.join(build_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    """Serves the built assets of an app and caches rendered pages."""
+
+    def __init__(self, app=None, build_dir=None):
+        self.build_dir = build_dir
+        self.manifest = {}
+        self._by_hashed_path = {}
+        self._pages = {}  # template name -> {"etag", encoding -> body}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.load(self.build_dir or os.path.join(app.static_folder, BUILD_DIR_NAME))
+        app.add_template_global(self.url, 'asset_url')
+        app.add_url_rule(f'{ASSETS_URL_PREFIX}/<path:filename>', 'assets', self.serve)
+
+    def load(self, build_dir):
+        """Reads the manifest in `build_dir`; without one, assets are served from the static folder."""
+        self.build_dir = build_dir
+        try:
+            with open(os.path.join(build_dir, MANIFEST_NAME)) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        self._by_hashed_path = {entry['path']: entry for entry in self.manifest.values()}
+        self._pages.clear()
+
+    def url(self, filename):
+        entry = self.manifest.get(filename)
+        if entry is None:
+            return url_for('static', filename=filename)
+        return f"{ASSETS_URL_PREFIX}/{entry['path']}"
+
+    def serve(self, filename):
+        entry = self._by_hashed_path.get(filename)
+        if entry is None:
+            abort(404)
+        encoding = request.accept_encodings.best_match(
+            [encoding for encoding in supported_encodings() if encoding in entry['encodings']])
+        path = filename + VARIANT_SUFFIXES[encoding] if encoding else filename
+        response = send_from_directory(self.build_dir, path, mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    def page(self, template_name):
+        """
+        Response for a template that renders the same for every request,
+        rendered and compressed once per process (every time in debug mode)
+        and revalidated by ETag.
+        """
+        cached = self._pages.get(template_name)
+        if cached is None or self.app.debug:
+            body = render_template(template_name).encode('utf-8')
+            cached = {"etag": content_hash(body), None: body}
+            for encoding in supported_encodings():
+                cached[encoding] = compress(body, encoding)
+            self._pages[template_name] = cached
+
+        encoding = request.accept_encodings.best_match(supported_encodings())
+        response = self.app.response_class(cached[encoding], mimetype='text/html')
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(cached['etag'], weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('--static-dir', default=os.path.join(here, 'static'))
+    parser.add_argument('--build-dir', default=os.path.join(here, 'static', BUILD_DIR_NAME))
+    args = parser.parse_args()
+
+    manifest = build_assets(args.static_dir, args.build_dir)
+    for source, entry in sorted(manifest.items()):
+        encodings = ', '.join(entry['encodings']) or 'uncompressed'
+        print(f"{source} -> {entry['path']} ({encodings})")
+    print(f"Wrote {len(manifest)} assets to {args.build_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules live at the repo root and in scripts/, neither of which is a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'scripts')]
@@ -0,0 +1,25 @@
+from code_units import MAX_UNIT_CHARS, split_into_units
+
+
+def big_class(header):
+    methods = "\n".join(f"    def method_{n}(self):\n        return '{'x' * 200}'\n" for n in range(80))
+    source = f'{header}\n    """A class too big for one unit."""\n\n{methods}'
+    assert len(source) > MAX_UNIT_CHARS
+    return source
+
+
+def test_outline_keeps_decorators_and_header():
+    header = '@dataclass(frozen=True)\n@register("store")\nclass Store(Base):'
+    _, units = split_into_units(big_class(header))
+    assert units[0].kind == 'class-outline'
+    assert units[0].source.startswith(header + '\n    """A class too big for one unit."""')
+
+
+def test_outline_keeps_a_header_over_several_lines():
+    header = ('@register("store")\nclass Store(\n    FirstBase,\n    SecondBase,\n'
+              '    metaclass=StoreMeta,\n):')
+    _, units = split_into_units(big_class(header))
+    assert units[0].kind == 'class-outline'
+    assert units[0].source.startswith(header + '\n')
+    assert units[0].signature == 'Store(FirstBase, SecondBase, metaclass=StoreMeta)'
+    assert [unit.name for unit in units[1:3]] == ['method_0', 'method_1']
@@ -0,0 +1,17 @@
+import html_sanitizer
+from html_sanitizer import OPEN_TAG_CACHE_SIZE, sanitize_html
+
+
+def test_long_attributes_are_not_cached():
+    html_sanitizer._cached_open_tag.cache_clear()
+    for n in range(200):
+        link = f"https://example.com/{n}/{'a' * 20000}"
+        assert sanitize_html(f'<p><a href="{link}">x</a></p>') == f'<p><a href="{link}">x</a></p>'
+    assert html_sanitizer._cached_open_tag.cache_info().currsize == 1  # Just the <p>
+
+
+def test_cached_open_tags_stay_bounded():
+    html_sanitizer._cached_open_tag.cache_clear()
+    for n in range(OPEN_TAG_CACHE_SIZE + 500):
+        sanitize_html(f'<p class="ql-indent-{n}">x</p>')
+    assert html_sanitizer._cached_open_tag.cache_info().currsize == OPEN_TAG_CACHE_SIZE
@@ -0,0 +1,529 @@
+"""
+Time-sorted event index behind the GraphRAG Timeline sections: what happened to a CR, JIRA issue, Confluence page or Outlook thread, and when.
+
+Events are (entity, time, source, event) records: the entity is named like
+the graph nodes ("CRs:CR-123"), the time is in epoch seconds and the source
+("JIRA") and event ("status changed") are names. Add them from a JSONL file
+of {"entity", "time", "source", "event"} records (times as epoch seconds or
+ISO 8601):
+    python timeline_index.py add events.jsonl [--timeline-dir data/timeline]
+    python timeline_index.py show CRs:CR-123 [--start 2024-01-01] [--end 2024-07-01] [--source JIRA]
+
+The events are columns grouped by entity and sorted by time within it:
+per-entity offsets into an int64 time array and uint8 source and event code
+arrays, so a time range of an entity is two binary searches and a slice.
+Zoomed-out views count events per bucket; buckets of whole days are summed
+from per-entity daily counts per source instead of the events themselves.
+A saved index is a directory of .npy files opened with memory maps, like
+the entity graph's.
+
+Events appended after loading go to a small in-memory delta that queries
+merge in; big batches, a full delta and `save` insert them into the sorted
+arrays.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from entity_graph import name_hash
+
+DEFAULT_TIMELINE_DIR = os.path.join('data', 'timeline')
+DAY = 86400
+ENTITY_BITS = 24  # Entity ids share a uint64 sort key with the time (or day and source) when merging
+MAX_ENTITIES = 1 << ENTITY_BITS
+TIME_BITS = 40
+TIME_OFFSET = 1 << (TIME_BITS - 1)  # Times within about 17,000 years of 1970
+DAY_BITS = 24
+DAY_OFFSET = 1 << (DAY_BITS - 1)
+MAX_CODES = 256  # Distinct sources, and event names (both stored as uint8)
+MAX_BUCKETS = 100000
+DELTA_MAX_EVENTS = 65536  # Events held in the delta before they are inserted into the arrays
+
+META_NAME = 'meta.json'
+ARRAY_NAMES = ('offsets', 'times', 'sources', 'events', 'day_offsets', 'days', 'day_sources', 'day_counts',
+               'name_bytes', 'name_offsets', 'name_hashes', 'hash_entities')
+
+
+def event_keys(entities, times):
+    """Sort keys of events: entities, then times ascending."""
+    return (entities.astype(np.uint64) << np.uint64(TIME_BITS)) | (times + TIME_OFFSET).astype(np.uint64)
+
+
+def day_keys(entities, days, sources):
+    """Sort keys of daily counts: entities, then days, then sources ascending."""
+    return ((entities.astype(np.uint64) << np.uint64(DAY_BITS + 8))
+            | ((days.astype(np.int64) + DAY_OFFSET).astype(np.uint64) << np.uint64(8))
+            | sources.astype(np.uint64))
+
+
+def parse_time(value):
+    """Epoch seconds of a number or an ISO 8601 string (UTC unless it says otherwise)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return math.floor(moment.timestamp())
+
+
+class TimelineIndex:
+    """
+    The events saved in `timeline_dir` (none if nothing is saved yet), plus
+    the ones appended since. Queries may run from several threads;
+    appending and saving take a lock.
+    """
+
+    def __init__(self, timeline_dir=DEFAULT_TIMELINE_DIR):
+        self.timeline_dir = timeline_dir
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.timeline_dir, META_NAME)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = None
+        if meta:
+            # Plain ndarray views of the maps: np.memmap slices cost several times more
+            arrays = {name: np.asarray(np.load(os.path.join(self.timeline_dir, f'{name}.npy'), mmap_mode='r'))
+                      for name in ARRAY_NAMES}
+        else:
+            meta = {"sources": [], "events": [], "saved_at": None}
+            arrays = {
+                'offsets': np.zeros(1, dtype=np.int64),
+                'times': np.empty(0, dtype=np.int64),
+                'sources': np.empty(0, dtype=np.uint8),
+                'events': np.empty(0, dtype=np.uint8),
+                'day_offsets': np.zeros(1, dtype=np.int64),
+                'days': np.empty(0, dtype=np.int32),
+                'day_sources': np.empty(0, dtype=np.uint8),
+                'day_counts': np.empty(0, dtype=np.int32),
+                'name_bytes': np.empty(0, dtype=np.uint8),
+                'name_offsets': np.zeros(1, dtype=np.int64),
+                'name_hashes': np.empty(0, dtype=np.uint64),
+                'hash_entities': np.empty(0, dtype=np.int32),
+            }
+        self.sources = meta['sources']  # Source code -> name
+        self.event_names = meta['events']  # Event code -> name
+        self.saved_at = meta['saved_at']
+        self._source_codes = {name: code for code, name in enumerate(self.sources)}
+        self._event_codes = {name: code for code, name in enumerate(self.event_names)}
+        self._columns = (arrays['offsets'], arrays['times'], arrays['sources'], arrays['events'])
+        self._daily = (arrays['day_offsets'], arrays['days'], arrays['day_sources'], arrays['day_counts'])
+        self._name_bytes, self._name_offsets = arrays['name_bytes'], arrays['name_offsets']
+        self._name_hashes, self._hash_entities = arrays['name_hashes'], arrays['hash_entities']
+        self._saved_entities = len(self._hash_entities)
+        self._new_names = []  # Names of the entities added since loading, by id - _saved_entities
+        self._new_ids = {}
+        self._delta = {}  # Entity id -> [(time, source, event)] of the events not inserted yet
+        self._pending = []  # The same events as (entities, times, sources, events) arrays
+        self._pending_count = 0
+
+    @property
+    def entity_count(self):
+        return self._saved_entities + len(self._new_names)
+
+    @property
+    def event_count(self):
+        return len(self._columns[1]) + self._pending_count
+
+    # --- Appending ---
+
+    def append(self, events):
+        """Appends `events`, (entity name, time, source name, event name) tuples; times as for parse_time."""
+        events = list(events)
+        if not events:
+            return
+        with self._lock:
+            entities = self._intern([entity for entity, _, _, _ in events])
+            sources = [self._code(self._source_codes, self.sources, source, 'sources') for _, _, source, _ in events]
+            codes = [self._code(self._event_codes, self.event_names, event, 'event names') for _, _, _, event in events]
+            self._append(entities, [parse_time(moment) for _, moment, _, _ in events], sources, codes)
+
+    def append_ids(self, entities, times, sources, events):
+        """
+        Appends events given as arrays: entity ids from entity_ids(...,
+        add=True), epoch seconds, and source and event codes from codes().
+        Batches of DELTA_MAX_EVENTS events or more (and the batch that fills
+        the delta) are inserted into the arrays straight away.
+        """
+        with self._lock:
+            self._append(entities, times, sources, events)
+
+    def _append(self, entities, times, sources, events):
+        batch = (np.asarray(entities, dtype=np.int64), np.asarray(times, dtype=np.int64),
+                 np.asarray(sources, dtype=np.uint8), np.asarray(events, dtype=np.uint8))
+        if not len(batch[0]):
+            return
+        if (batch[0] < 0).any() or (batch[0] >= self.entity_count).any():
+            raise ValueError("Unknown entity id")
+        if (np.abs(batch[1]) >= TIME_OFFSET).any():
+            raise ValueError(f"Times must be within {TIME_OFFSET} seconds of 1970")
+        self._pending.append(batch)
+        self._pending_count += len(batch[0])
+        if self._pending_count >= DELTA_MAX_EVENTS:
+            self._merge()
+            return
+        delta = self._delta
+        for entity, moment, source, event in zip(*(column.tolist() for column in batch)):
+            # New lists rather than appends, so a query never sees one half-updated
+            delta[entity] = delta.get(entity, []) + [(moment, source, event)]
+
+    def entity_ids(self, names, add=False):
+        """Ids of the entities `names` (-1 for unknown ones), adding the unknown ones if `add`."""
+        if add:
+            with self._lock:
+                return self._intern(list(names))
+        return np.array([self._entity_id(name) for name in names], dtype=np.int64)
+
+    def codes(self, source_names=(), event_names=()):
+        """(source codes, event codes) of the names given, adding the ones not seen before."""
+        with self._lock:
+            return ([self._code(self._source_codes, self.sources, name, 'sources') for name in source_names],
+                    [self._code(self._event_codes, self.event_names, name, 'event names') for name in event_names])
+
+    def _intern(self, names):
+        """Entity ids of `names`, adding the names not seen before."""
+        ids = np.empty(len(names), dtype=np.int64)
+        hashes = np.fromiter(map(name_hash, names), dtype=np.uint64, count=len(names))
+        saved = np.zeros(len(names), dtype=bool)
+        if self._saved_entities:
+            positions = np.minimum(np.searchsorted(self._name_hashes, hashes), self._saved_entities - 1)
+            saved = self._name_hashes[positions] == hashes
+            ids[saved] = self._hash_entities[positions[saved]]
+        for position in np.flatnonzero(~saved).tolist():
+            name = names[position]
+            entity = self._new_ids.get(name)
+            if entity is None:
+                entity = self._saved_entities + len(self._new_names)
+                if entity >= MAX_ENTITIES:
+                    raise ValueError(f"The timeline can have at most {MAX_ENTITIES} entities")
+                self._new_ids[name] = entity
+                self._new_names.append(name)
+            ids[position] = entity
+        return ids
+
+    @staticmethod
+    def _code(codes, names, name, what):
+        code = codes.get(name)
+        if code is None:
+            if len(names) == MAX_CODES:
+                raise ValueError(f"The timeline can have at most {MAX_CODES} {what}")
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _merge(self):
+        """Inserts the delta into new arrays covering every entity, events and daily counts alike."""
+        entities, times, sources, events = (np.concatenate(column) for column in zip(*self._pending))
+        keys = event_keys(entities, times)
+        order = np.argsort(keys, kind='stable')  # Events at the same time stay in the order they came
+        keys, entities, times, sources, events = (column[order] for column in (keys, entities, times, sources, events))
+
+        offsets, saved_times, saved_sources, saved_events = self._columns
+        saved_keys = event_keys(np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)), saved_times)
+        # After the saved events at the same time; np.insert keeps the new ones in order
+        positions = np.searchsorted(saved_keys, keys, side='right')
+        merged = np.insert(saved_keys, positions, keys)
+        del saved_keys
+        columns = (self._offsets(merged >> np.uint64(TIME_BITS)),
+                   (merged & np.uint64((1 << TIME_BITS) - 1)).astype(np.int64) - TIME_OFFSET,
+                   np.insert(saved_sources, positions, sources), np.insert(saved_events, positions, events))
+        del merged
+
+        # Daily counts: add to the (entity, day, source) rows there are, insert the others
+        day_offsets, days, day_sources, day_counts = self._daily
+        keys, counts = np.unique(day_keys(entities, times // DAY, sources), return_counts=True)
+        saved_keys = day_keys(np.repeat(np.arange(len(day_offsets) - 1), np.diff(day_offsets)), days, day_sources)
+        positions = np.searchsorted(saved_keys, keys)
+        known = positions < len(saved_keys)
+        known[known] = saved_keys[positions[known]] == keys[known]
+        day_counts = np.array(day_counts)
+        day_counts[positions[known]] += counts[known].astype(np.int32)
+        positions, keys, counts = positions[~known], keys[~known], counts[~known]
+        merged = np.insert(saved_keys, positions, keys)
+        daily = (self._offsets(merged >> np.uint64(DAY_BITS + 8)),
+                 (((merged >> np.uint64(8)) & np.uint64((1 << DAY_BITS) - 1)).astype(np.int64)
+                  - DAY_OFFSET).astype(np.int32),
+                 (merged & np.uint64(0xff)).astype(np.uint8),
+                 np.insert(day_counts, positions, counts.astype(np.int32)))
+
+        self._columns, self._daily = columns, daily
+        self._delta = {}  # After the new arrays: a query in between sees events twice, never not at all
+        self._pending = []
+        self._pending_count = 0
+
+    def _offsets(self, entities):
+        """Offsets of the runs of each entity id in the sorted `entities`."""
+        offsets = np.zeros(self.entity_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(entities.astype(np.int64), minlength=self.entity_count), out=offsets[1:])
+        return offsets
+
+    def save(self):
+        """
+        Inserts the delta and writes the index to `timeline_dir`, through a
+        new directory that replaces the old one, so processes that have the
+        old index open keep reading it undisturbed.
+        """
+        with self._lock:
+            if self._pending:
+                self._merge()
+            new_names = [name.encode('utf-8') for name in self._new_names]
+            lengths = np.fromiter(map(len, new_names), dtype=np.int64, count=len(new_names))
+            hashes = np.concatenate([self._name_hashes,
+                                     np.fromiter(map(name_hash, self._new_names), dtype=np.uint64,
+                                                 count=len(new_names))])
+            hash_entities = np.concatenate([self._hash_entities,
+                                            np.arange(self._saved_entities, self.entity_count, dtype=np.int32)])
+            by_hash = np.argsort(hashes, kind='stable')
+            offsets, times, sources, events = self._columns
+            day_offsets, days, day_sources, day_counts = self._daily
+            arrays = {
+                'offsets': self._pad(offsets),
+                'times': times,
+                'sources': sources,
+                'events': events,
+                'day_offsets': self._pad(day_offsets),
+                'days': days,
+                'day_sources': day_sources,
+                'day_counts': day_counts,
+                'name_bytes': np.concatenate([self._name_bytes, np.frombuffer(b''.join(new_names), dtype=np.uint8)]),
+                'name_offsets': np.concatenate([self._name_offsets, self._name_offsets[-1] + np.cumsum(lengths)]),
+                'name_hashes': hashes[by_hash],
+                'hash_entities': hash_entities[by_hash],
+            }
+            if len(hashes) > 1 and (arrays['name_hashes'][1:] == arrays['name_hashes'][:-1]).any():
+                raise ValueError("Two entity names have the same 64-bit hash")
+
+            build_dir = self.timeline_dir.rstrip(os.sep) + '.building'
+            shutil.rmtree(build_dir, ignore_errors=True)
+            os.makedirs(build_dir)
+            for name, array in arrays.items():
+                np.save(os.path.join(build_dir, f'{name}.npy'), array)
+            with open(os.path.join(build_dir, META_NAME), 'w') as f:
+                json.dump({"entity_count": self.entity_count, "event_count": self.event_count,
+                           "sources": self.sources, "events": self.event_names, "saved_at": time.time()}, f, indent=2)
+            old_dir = self.timeline_dir.rstrip(os.sep) + '.old'
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(self.timeline_dir):
+                os.replace(self.timeline_dir, old_dir)
+            os.replace(build_dir, self.timeline_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            self._load()
+
+    def _pad(self, offsets):
+        """`offsets` covering every entity: ones added without events have none."""
+        return np.concatenate([offsets, np.full(self.entity_count + 1 - len(offsets), offsets[-1])])
+
+    # --- Queries by entity id ---
+
+    def _entity_id(self, name):
+        entity = self._new_ids.get(name)
+        if entity is None and self._saved_entities:
+            wanted = np.uint64(name_hash(name))
+            position = int(np.searchsorted(self._name_hashes, wanted))
+            if position < self._saved_entities and self._name_hashes[position] == wanted:
+                entity = int(self._hash_entities[position])
+        return -1 if entity is None else entity
+
+    def entity_name(self, entity):
+        if entity >= self._saved_entities:
+            return self._new_names[entity - self._saved_entities]
+        start, stop = int(self._name_offsets[entity]), int(self._name_offsets[entity + 1])
+        return self._name_bytes[start:stop].tobytes().decode('utf-8')
+
+    def source_codes(self, sources):
+        """Codes of the source names in `sources` (None: every source); unknown names match nothing."""
+        if sources is None:
+            return None
+        return [self._source_codes[name] for name in sources if name in self._source_codes]
+
+    def event_rows(self, entities, start=None, end=None, sources=None, latest=None):
+        """
+        (times, entity ids, source codes, event codes) of the events of the
+        ids `entities` from `start` up to `end` (epoch seconds, None: no
+        limit), of the source codes `sources` only if given, sorted by time;
+        only the `latest` most recent of them if given.
+        """
+        delta, columns = self._delta, self._columns  # Delta first: see _merge
+        allowed = self._allowed(sources)
+        parts = []
+        for entity in entities:
+            rows = self._range(entity, start, end, columns, delta)
+            if allowed is not None:
+                rows = [column[allowed[rows[1]]] for column in rows]
+            if latest is not None:
+                rows = [column[max(len(column) - latest, 0):] for column in rows]
+            parts.append((rows[0], np.full(len(rows[0]), entity), rows[1], rows[2]))
+        if not parts:
+            return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8),
+                    np.empty(0, dtype=np.uint8))
+        if len(parts) == 1:
+            return parts[0]
+        times, found, found_sources, found_events = (np.concatenate(column) for column in zip(*parts))
+        order = np.argsort(times, kind='stable')
+        if latest is not None:
+            order = order[max(len(order) - latest, 0):]
+        return times[order], found[order], found_sources[order], found_events[order]
+
+    def bucket_counts(self, entities, start, end, bucket, sources=None):
+        """
+        (bucket start times, counts): the events of the ids `entities` from
+        `start` up to `end` counted in buckets of `bucket` seconds from
+        `start`, as a (buckets, len(self.sources)) array by source code.
+        Whole-day buckets from midnight UTC are summed from the daily counts.
+        """
+        if bucket <= 0 or end <= start:
+            raise ValueError("Need a positive bucket size and end after start")
+        buckets = -(-(end - start) // bucket)
+        if buckets > MAX_BUCKETS:
+            raise ValueError(f"At most {MAX_BUCKETS} buckets")
+        delta, columns, daily = self._delta, self._columns, self._daily  # Delta first: see _merge
+        allowed = self._allowed(sources)
+        code_count = max(len(self.sources), 1)
+        counts = np.zeros(buckets * code_count, dtype=np.int64)
+        use_daily = start % DAY == 0 and end % DAY == 0 and bucket % DAY == 0
+        for entity in entities:
+            if use_daily:
+                day_offsets, days, day_sources, day_counts = daily
+                if entity < len(day_offsets) - 1:
+                    first, last = int(day_offsets[entity]), int(day_offsets[entity + 1])
+                    low, high = np.searchsorted(days[first:last], (start // DAY, end // DAY)) + first
+                    found_days, found_sources, weights = days[low:high], day_sources[low:high], day_counts[low:high]
+                    if allowed is not None:
+                        keep = allowed[found_sources]
+                        found_days, found_sources, weights = found_days[keep], found_sources[keep], weights[keep]
+                    positions = (found_days.astype(np.int64) - start // DAY) // (bucket // DAY)
+                    counts += np.bincount(positions * code_count + found_sources, weights=weights,
+                                          minlength=len(counts)).astype(np.int64)
+                found_times, found_sources, _ = self._delta_rows(entity, start, end, delta)
+            else:
+                found_times, found_sources, _ = self._range(entity, start, end, columns, delta)
+            if allowed is not None:
+                keep = allowed[found_sources]
+                found_times, found_sources = found_times[keep], found_sources[keep]
+            positions = (found_times - start) // bucket
+            counts += np.bincount(positions * code_count + found_sources, minlength=len(counts))
+        starts = start + np.arange(buckets, dtype=np.int64) * bucket
+        return starts, counts.reshape(buckets, code_count)[:, :len(self.sources)]
+
+    def time_span(self, entities):
+        """(first, last) event time of the ids `entities`, or None if they have no events."""
+        delta, columns = self._delta, self._columns
+        offsets, times = columns[0], columns[1]
+        moments = []
+        for entity in entities:
+            if entity < len(offsets) - 1 and offsets[entity] < offsets[entity + 1]:
+                moments += [int(times[offsets[entity]]), int(times[offsets[entity + 1] - 1])]
+            moments += [moment for moment, _, _ in delta.get(entity, ())]
+        return (min(moments), max(moments)) if moments else None
+
+    def _range(self, entity, start, end, columns, delta):
+        """(times, source codes, event codes) of the events of id `entity` from `start` up to `end`, by time."""
+        offsets, times, sources, events = columns
+        if 0 <= entity < len(offsets) - 1:
+            first, last = int(offsets[entity]), int(offsets[entity + 1])
+            low = first if start is None else first + int(np.searchsorted(times[first:last], start))
+            high = last if end is None else first + int(np.searchsorted(times[first:last], end))
+            rows = (times[low:high], sources[low:high], events[low:high])
+        else:
+            rows = (times[:0], sources[:0], events[:0])
+        if entity in delta:
+            extra = self._delta_rows(entity, start, end, delta)
+            order = np.argsort(extra[0], kind='stable')
+            positions = np.searchsorted(rows[0], extra[0][order], side='right')
+            rows = tuple(np.insert(column, positions, added[order]) for column, added in zip(rows, extra))
+        return rows
+
+    @staticmethod
+    def _delta_rows(entity, start, end, delta):
+        extra = [(moment, source, event) for moment, source, event in delta.get(entity, ())
+                 if (start is None or moment >= start) and (end is None or moment < end)]
+        if not extra:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.uint8)
+        times, sources, events = zip(*extra)
+        return (np.array(times, dtype=np.int64), np.array(sources, dtype=np.uint8),
+                np.array(events, dtype=np.uint8))
+
+    def _allowed(self, sources):
+        """Lookup table of the source codes `sources` (None: every source allowed)."""
+        if sources is None:
+            return None
+        allowed = np.zeros(MAX_CODES, dtype=bool)
+        allowed[list(sources)] = True
+        return allowed
+
+    # --- Queries by name ---
+
+    def events(self, names, start=None, end=None, sources=None, limit=None):
+        """
+        [(time, entity name, source, event)] of the entities `names` from
+        `start` up to `end`, newest first; at most `limit` of them.
+        """
+        ids = [entity for entity in self.entity_ids(names).tolist() if entity >= 0]
+        rows = self.event_rows(ids, start, end, self.source_codes(sources), limit)
+        times, entities, codes, events = (column[::-1].tolist() for column in rows)
+        return [(moment, self.entity_name(entity), self.sources[code], self.event_names[event])
+                for moment, entity, code, event in zip(times, entities, codes, events)]
+
+    def histogram(self, names, start, end, bucket, sources=None):
+        """(bucket start times, {source name: counts}) of the entities `names`; see bucket_counts."""
+        ids = [entity for entity in self.entity_ids(names).tolist() if entity >= 0]
+        starts, counts = self.bucket_counts(ids, start, end, bucket, self.source_codes(sources))
+        return starts, {name: counts[:, code] for code, name in enumerate(self.sources)}
+
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['entity'], record['time'], record['source'], record.get('event', 'updated')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="add the events in a JSONL file")
+    add.add_argument('events')
+    add.add_argument('--timeline-dir', default=DEFAULT_TIMELINE_DIR)
+    show = commands.add_parser('show', help="print the events of an entity, newest first")
+    show.add_argument('entity')
+    show.add_argument('--timeline-dir', default=DEFAULT_TIMELINE_DIR)
+    show.add_argument('--start', help="ISO 8601 date or time")
+    show.add_argument('--end', help="ISO 8601 date or time (excluded)")
+    show.add_argument('--source', action='append', dest='sources', help="only events from this source (repeatable)")
+    show.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    timeline = TimelineIndex(args.timeline_dir)
+    if args.command == 'add':
+        started = time.perf_counter()
+        before = timeline.event_count
+        events = read_events(args.events)
+        while True:
+            batch = [event for _, event in zip(range(DELTA_MAX_EVENTS), events)]
+            if not batch:
+                break
+            timeline.append(batch)
+        timeline.save()
+        print(f"Added {timeline.event_count - before} events ({timeline.event_count} events, "
+              f"{timeline.entity_count} entities) to {args.timeline_dir} in {time.perf_counter() - started:.1f} s")
+    else:
+        start = None if args.start is None else parse_time(args.start)
+        end = None if args.end is None else parse_time(args.end)
+        for moment, _, source, event in timeline.events([args.entity], start, end, args.sources, args.limit):
+            stamp = datetime.datetime.fromtimestamp(moment, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M')
+            print(f"{stamp}  {source:<12} {event}")
+
+
+if __name__ == '__main__':
+    main()
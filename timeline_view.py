@@ -0,0 +1,85 @@
+"""
+Timeline sections of the GraphRAG pages, drawn from the event index (timeline_index.py).
+
+An entity's timeline covers its own events and those of the entities linked
+to it in the entity graph, so a CR shows the activity on its JIRA issues,
+Confluence pages and Outlook threads as well.
+"""
+import datetime
+import os
+
+import pandas as pd
+import streamlit as st
+
+from graph_view import node_key
+from timeline_index import DAY, DEFAULT_TIMELINE_DIR, META_NAME, TimelineIndex
+
+TIMELINE_DIR = os.environ.get('GRAPHRAG_TIMELINE_DIR', DEFAULT_TIMELINE_DIR)
+TIMELINE_LINKED = 200  # Linked entities whose events are included
+TIMELINE_BUCKETS = 60  # Bars in the chart at most
+BUCKET_DAYS = [1, 7, 30, 91, 365]
+TIMELINE_EVENTS = 20  # Events listed under the chart
+
+
+def timeline_version(timeline_dir):
+    """Changes whenever the index is saved again (None: not built yet)."""
+    try:
+        return os.stat(os.path.join(timeline_dir, META_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(max_entries=1)
+def load_timeline(timeline_dir, version):
+    # Opening only maps the files, and the one instance is shared by every session
+    return TimelineIndex(timeline_dir)
+
+
+def current_timeline():
+    """The saved event index, or None if none has been built."""
+    version = timeline_version(TIMELINE_DIR)
+    return None if version is None else load_timeline(TIMELINE_DIR, version)
+
+
+def timeline_entities(graph, node):
+    """`node` and the entities linked to it directly."""
+    linked = graph.neighbours(node)[:TIMELINE_LINKED] if graph else []
+    return [node, *dict.fromkeys(name for name, _ in linked)]
+
+
+def to_date(moment):
+    return datetime.datetime.fromtimestamp(moment, datetime.timezone.utc).date()
+
+
+def to_epoch(day):
+    return int(datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def show_timeline(timeline, graph, node):
+    """Events per source over a date range for `node` and its linked entities, and the latest of them."""
+    names = timeline_entities(graph, node) if node else []
+    ids = [entity for entity in timeline.entity_ids(names).tolist() if entity >= 0] if timeline else []
+    span = timeline.time_span(ids) if ids else None
+    if span is None:
+        st.write("No events.")
+        return
+    first, last = to_date(span[0]), to_date(span[1])
+    picked = st.date_input("Dates", (first, last), min_value=first, max_value=last, key=f"timeline:{node}")
+    if len(picked) < 2:  # While the second date is being picked
+        picked = (picked[0], picked[0])
+    start, end = to_epoch(picked[0]), to_epoch(picked[1]) + DAY
+    days = (end - start) // DAY
+    bucket_days = next((size for size in BUCKET_DAYS if days / size <= TIMELINE_BUCKETS), BUCKET_DAYS[-1])
+    starts, counts = timeline.bucket_counts(ids, start, end, bucket_days * DAY)
+    chart = pd.DataFrame(counts, columns=timeline.sources, index=pd.to_datetime(starts, unit='s'))
+    st.bar_chart(chart.loc[:, chart.sum() > 0])
+    st.caption(f"Events per {'day' if bucket_days == 1 else f'{bucket_days} days'}")
+
+    latest = (column[::-1].tolist() for column in timeline.event_rows(ids, start, end, latest=TIMELINE_EVENTS))
+    for moment, entity, source, event in zip(*latest):
+        stamp = datetime.datetime.fromtimestamp(moment, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M')
+        st.markdown(f"- {stamp} · **{node_key(timeline.entity_name(entity))}** "
+                    f"{timeline.event_names[event]} ({timeline.sources[source]})")
+    total = int(counts.sum())
+    if total > TIMELINE_EVENTS:
+        st.caption(f"...and {total - TIMELINE_EVENTS} earlier events")